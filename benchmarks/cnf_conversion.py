@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+
+"""Compares the CNF conversion functions that can be given to
+``fully_cross_block`` and ``multiple_cross_block`` as ``cnf_fn``.
+
+Each of the designs run by the uniform combinatoric acceptance tests is
+encoded with every conversion. For each encoding, the script reports the
+number of clauses produced for the design's formulas, the size of the final
+CNF (including the cardinality constraints), the time taken to build it, and
+the time CryptoMiniSAT takes to solve it.
+
+Run from the root of the repository with::
+
+    $ python3 benchmarks/cnf_conversion.py [--no-solve] [DESIGN_FILE ...]
+"""
+
+
+import glob
+import os
+import sys
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sweetpea.blocks import Block
+from sweetpea.core import CNF, cnf_is_satisfiable
+from sweetpea.core.generate.utility import combine_cnf_with_requests
+from sweetpea.logic import to_cnf_plaisted_greenbaum, to_cnf_switching, to_cnf_tseitin
+
+
+DESIGN_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'sweetpea', 'tests', 'sampling_strategies', 'uc-counting-tests', '*.py')
+
+CNF_FNS = {
+    'tseitin': to_cnf_tseitin,
+    'plaisted-greenbaum': to_cnf_plaisted_greenbaum,
+    'switching': to_cnf_switching,
+}
+
+
+def load_block(filename: str) -> Block:
+    """Runs a design file, which must define a variable named ``block``."""
+    variables: Dict = {}
+    with open(filename, 'r') as f:
+        exec(f.read(), variables)
+    return variables['block']
+
+
+def encode(block: Block, cnf_fn: Callable) -> Dict:
+    """Builds the CNF for a block with the given conversion function."""
+    block.cnf_fn = cnf_fn
+    start = perf_counter()
+    backend_request = block.build_backend_request()
+    formula_clauses = len(backend_request.cnfs)
+    cnf = combine_cnf_with_requests(CNF(backend_request.get_cnfs_as_json()),
+                                    backend_request.fresh - 1,
+                                    block.variables_per_sample(),
+                                    backend_request.ll_requests.generation_request_columns())
+    build_time = perf_counter() - start
+    dimacs = cnf.as_dimacs_string()
+    header = dimacs[:dimacs.index('\n')].split()
+    return {
+        'cnf': cnf,
+        'formula clauses': formula_clauses,
+        'variables': int(header[2]),
+        'clauses': int(header[3]),
+        'build (s)': build_time,
+    }
+
+
+def solve(cnf: CNF) -> Optional[float]:
+    """Returns the time CryptoMiniSAT takes to solve a CNF formula, or
+    ``None`` if CryptoMiniSAT cannot be run.
+    """
+    start = perf_counter()
+    try:
+        cnf_is_satisfiable(cnf)
+    except Exception as e:
+        print(f"CryptoMiniSAT is unavailable, skipping solve times: {e}", file=sys.stderr)
+        return None
+    return perf_counter() - start
+
+
+def main(argv: List[str]) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--no-solve', action='store_true', help="only compare the sizes of the encodings")
+    parser.add_argument('files', nargs='*', help="design files to encode (default: the acceptance designs)")
+    args = parser.parse_args(argv)
+
+    should_solve = not args.no_solve
+    columns = ['formula clauses', 'variables', 'clauses', 'build (s)', 'solve (s)']
+    print(f"{'design':<16} {'cnf_fn':<20} " + ' '.join(f"{c:>15}" for c in columns))
+    for filename in args.files or sorted(glob.glob(DESIGN_FILES)):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        block = load_block(filename)
+        for (fn_name, cnf_fn) in CNF_FNS.items():
+            try:
+                result = encode(block, cnf_fn)
+            except Exception as e:
+                print(f"{name:<16} {fn_name:<20} failed: {type(e).__name__}: {e}")
+                continue
+            solve_time = solve(result['cnf']) if should_solve else None
+            should_solve = should_solve and solve_time is not None
+            result['solve (s)'] = solve_time
+            cells = [f"{result[c]:>15.3f}" if isinstance(result[c], float) else
+                     f"{'-':>15}" if result[c] is None else
+                     f"{result[c]:>15}"
+                     for c in columns]
+            print(f"{name:<16} {fn_name:<20} " + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+
+"""Compares the ways of constructing permutations from inversion sequences,
+which the uniform combinatoric sampler does once per sample.
+
+For each crossing size, the script unranks the same random inversion
+sequences with the former quadratic scan, with
+:func:`~sweetpea.combinatorics.construct_permutation` both as it runs for that
+size and with its Fenwick tree forced, and with the batched
+:func:`~sweetpea.combinatorics.construct_permutations`.
+
+Run from the root of the repository with::
+
+    $ python3 benchmarks/permutation_unranking.py [--samples N] [SIZE ...]
+"""
+
+
+import os
+import random
+import sys
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sweetpea import combinatorics
+from sweetpea.combinatorics import construct_permutation, construct_permutations
+
+
+def construct_permutation_by_scanning(inversion_sequence: List[int]) -> List[int]:
+    """The former implementation of ``construct_permutation``, which scans for
+    each free position.
+    """
+    length = len(inversion_sequence)
+    permutation: List = [None] * length
+    for n, b in enumerate(inversion_sequence):
+        idx = 0
+        step = -1
+        while idx < length:
+            if permutation[idx] is None:
+                step += 1
+                if step == b:
+                    break
+            idx += 1
+        permutation[idx] = n
+    return permutation
+
+
+def main(argv: List[str]) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1000, help="the number of permutations to construct")
+    parser.add_argument('sizes', type=int, nargs='*', help="the crossing sizes (default: 16 64 256 1024)")
+    args = parser.parse_args(argv)
+
+    columns = ['scan (s)', 'default (s)', 'fenwick (s)', 'batched (s)']
+    print(f"{'size':>6} " + ' '.join(f"{c:>12}" for c in columns))
+    for size in args.sizes or [16, 64, 256, 1024]:
+        sequences = [[random.randrange(size - i) for i in range(size)] for _ in range(args.samples)]
+        times = []
+
+        start = perf_counter()
+        expected = [construct_permutation_by_scanning(s) for s in sequences]
+        times.append(perf_counter() - start)
+
+        start = perf_counter()
+        assert [construct_permutation(s) for s in sequences] == expected
+        times.append(perf_counter() - start)
+
+        threshold = combinatorics.FENWICK_PERMUTATION_LENGTH
+        combinatorics.FENWICK_PERMUTATION_LENGTH = 0
+        start = perf_counter()
+        assert [construct_permutation(s) for s in sequences] == expected
+        times.append(perf_counter() - start)
+        combinatorics.FENWICK_PERMUTATION_LENGTH = threshold
+
+        start = perf_counter()
+        assert construct_permutations(sequences) == expected
+        times.append(perf_counter() - start)
+
+        print(f"{size:>6} " + ' '.join(f"{t:>12.3f}" for t in times))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+
+"""Compares sampling with Unigen over all of a block's level variables and
+over the block's independent support.
+
+For each of the designs run by the uniform combinatoric acceptance tests, the
+script reports the size of both sampling sets and, if Unigen can be run, the
+time taken to draw the samples with each of them.
+
+Run from the root of the repository with::
+
+    $ python3 benchmarks/unigen_support.py [--samples N] [DESIGN_FILE ...]
+"""
+
+
+import glob
+import os
+import sys
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sweetpea.blocks import Block
+from sweetpea.core import CNF, Var, sample_uniform
+
+from cnf_conversion import DESIGN_FILES, load_block
+
+
+def sample(block: Block, sample_count: int, sampled_variables: Optional[List[Var]]) -> Optional[float]:
+    """Returns the time Unigen takes to draw the samples, or ``None`` if
+    Unigen cannot be run.
+    """
+    backend_request = block.build_backend_request()
+    start = perf_counter()
+    try:
+        sample_uniform(sample_count,
+                       CNF(backend_request.get_cnfs_as_json()),
+                       backend_request.fresh - 1,
+                       block.variables_per_sample(),
+                       backend_request.ll_requests.generation_request_columns(),
+                       False,
+                       sampled_variables)
+    except Exception as e:
+        print(f"Unigen is unavailable, skipping sampling times: {e}", file=sys.stderr)
+        return None
+    return perf_counter() - start
+
+
+def main(argv: List[str]) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10, help="the number of samples to draw")
+    parser.add_argument('files', nargs='*', help="design files to sample (default: the acceptance designs)")
+    args = parser.parse_args(argv)
+
+    should_sample = True
+    columns = ['full support', 'reduced support', 'full (s)', 'reduced (s)']
+    print(f"{'design':<16} " + ' '.join(f"{c:>15}" for c in columns))
+    for filename in args.files or sorted(glob.glob(DESIGN_FILES)):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        block = load_block(filename)
+        support = block.independent_support()
+        result = {
+            'full support': block.variables_per_sample(),
+            'reduced support': len(support),
+            'full (s)': None,
+            'reduced (s)': None,
+        }
+        if should_sample:
+            result['full (s)'] = sample(block, args.samples, None)
+            should_sample = result['full (s)'] is not None
+        if should_sample:
+            result['reduced (s)'] = sample(block, args.samples, [Var(v) for v in support])
+        cells = [f"{result[c]:>15.3f}" if isinstance(result[c], float) else
+                 f"{'-':>15}" if result[c] is None else
+                 f"{result[c]:>15}"
+                 for c in columns]
+        print(f"{name:<16} " + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
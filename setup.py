@@ -23,6 +23,10 @@ setuptools.setup(
         'requests',
         'tqdm',
     ],
+    extras_require={
+        # Lets the guided sampling strategy keep one incremental solver loaded.
+        'pycryptosat': ['pycryptosat'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -5,7 +5,8 @@ designs.
 """
 
 from functools import reduce
-from typing import Dict, List, Optional, Tuple, cast
+from inspect import signature
+from typing import Dict, List, Optional, Tuple, Union, cast
 from itertools import product
 
 from sweetpea.derivation_processor import DerivationProcessor
@@ -15,7 +16,9 @@ from sweetpea.primitives import (
     Factor, SimpleLevel, DerivedLevel,
     DerivationWindow, WithinTrialDerivationWindow, TransitionDerivationWindow,
     get_external_level_name)
-from sweetpea.constraints import Consistency, Constraint, FullyCross, MultipleCross, MultipleCrossBlock
+from sweetpea.constraints import Consistency, Constraint, Exclude, FullyCross, MultipleCross, MultipleCrossBlock
+from sweetpea.sampling_strategies.base import ColumnarExperiments
+from sweetpea.sampling_strategies.dynamic_programming import DynamicProgrammingSamplingStrategy
 from sweetpea.sampling_strategies.non_uniform import NonUniformSamplingStrategy
 from sweetpea.sampling_strategies.unigen import UnigenSamplingStrategy
 from sweetpea.sampling_strategies.uniform_combinatoric import UniformCombinatoricSamplingStrategy
@@ -70,12 +73,14 @@ def fully_cross_block(design: List[Factor],
 
     :param cnf_fn:
         A CNF conversion function. Default is :func:`.to_cnf_tseitin`.
+        :func:`.to_cnf_plaisted_greenbaum` produces a smaller encoding.
     """
     all_constraints = cast(List[Constraint], [FullyCross(), Consistency()]) + constraints
     all_constraints = __desugar_constraints(all_constraints) #expand the constraints into a form we can process.
     block = FullyCrossBlock(design, [crossing], all_constraints, require_complete_crossing, cnf_fn)
     block.constraints += DerivationProcessor.generate_derivations(block)
-    if not constraints and not list(filter(lambda f: f.is_derived(), crossing)) and not list(filter(lambda f: f.has_complex_window, design)):
+    only_exclusions = all(isinstance(c, Exclude) for c in constraints)
+    if only_exclusions and not list(filter(lambda f: f.is_derived(), crossing)) and not list(filter(lambda f: f.has_complex_window, design)):
         block.complex_factors_or_constraints = False
     return block
 
@@ -117,11 +122,15 @@ def multiple_cross_block(design: List[Factor],
 
     :param cnf_fn:
         A CNF conversion function. Default is :func:`.to_cnf_tseitin`.
+        :func:`.to_cnf_plaisted_greenbaum` produces a smaller encoding.
     """
     all_constraints = cast(List[Constraint], [MultipleCross(), Consistency()]) + constraints
     all_constraints = __desugar_constraints(all_constraints) #expand the constraints into a form we can process.
     block = MultipleCrossBlock(design, crossings, all_constraints, require_complete_crossing, cnf_fn)
     block.constraints += DerivationProcessor.generate_derivations(block)
+    crossed = [f for c in crossings for f in c]
+    if not constraints and not list(filter(lambda f: f.is_derived(), crossed)) and not list(filter(lambda f: f.has_complex_window, design)):
+        block.complex_factors_or_constraints = not UniformCombinatoricSamplingStrategy.supports(block)
     return block
 
 
@@ -312,7 +321,11 @@ def experiment_to_csv(experiments: List[dict], file_prefix: str = "experiment"):
             print("I/O error")
 
 
-def synthesize_trials_non_uniform(block: Block, samples: int) -> List[dict]:
+def synthesize_trials_non_uniform(block: Block,
+                                  samples: int,
+                                  columnar: bool = False,
+                                  seed: Optional[int] = None
+                                  ) -> Union[List[dict], ColumnarExperiments]:
     """Synthesizes experimental trials with non-uniform sampling. See
     :func:`.synthesize_trials` for more information.
 
@@ -336,18 +349,34 @@ def synthesize_trials_non_uniform(block: Block, samples: int) -> List[dict]:
     :param samples:
         The number of trial sets to generate.
 
+    :param columnar:
+        Whether to return the trial sets as :class:`.ColumnarExperiments`.
+
+    :param seed:
+        A seed for the random choices of the sampling strategy. Sampling the
+        same block with the same seed produces the same trial sets.
+
     :returns:
         A :class:`list` of trial sets. Each set is represented as a
         :class:`dictionary <dict>` mapping each factor name to a list of
-        levels, where each such list contains to one level per trial.
+        levels, where each such list contains to one level per trial. If
+        ``columnar`` is ``True``, the trial sets are returned as
+        :class:`.ColumnarExperiments` instead.
     """
     if block.complex_factors_or_constraints:
-        return synthesize_trials(block, samples, sampling_strategy=NonUniformSamplingStrategy)
+        return synthesize_trials(block, samples, sampling_strategy=NonUniformSamplingStrategy, columnar=columnar,
+                                 seed=seed)
     else:
-        return synthesize_trials(block, samples, sampling_strategy=UniformCombinatoricSamplingStrategy)
+        return synthesize_trials(block, samples, sampling_strategy=UniformCombinatoricSamplingStrategy,
+                                 columnar=columnar, seed=seed)
 
 
-def synthesize_trials_uniform(block: Block, samples: int) -> List[dict]:
+def synthesize_trials_uniform(block: Block,
+                              samples: int,
+                              columnar: bool = False,
+                              seed: Optional[int] = None,
+                              processes: int = 1
+                              ) -> Union[List[dict], ColumnarExperiments]:
     """Synthesizes experimental trials with uniform sampling. See
     :func:`.synthesize_trials` for more information.
 
@@ -357,21 +386,40 @@ def synthesize_trials_uniform(block: Block, samples: int) -> List[dict]:
     :param samples:
         The number of trial sets to generate.
 
+    :param columnar:
+        Whether to return the trial sets as :class:`.ColumnarExperiments`.
+
+    :param seed:
+        A seed for the random choices of the sampling strategy. Sampling the
+        same block with the same seed produces the same trial sets.
+
+    :param processes:
+        The number of worker processes that construct the trial sets, for
+        strategies that support it (:class:`.UniformCombinatoricSamplingStrategy`).
+        The trial sets do not depend on the number of processes.
+
     :returns:
         A :class:`list` of trial sets. Each set is represented as a
         :class:`dictionary <dict>` mapping each factor name to a list of
-        levels, where each such list contains to one level per trial.
+        levels, where each such list contains to one level per trial. If
+        ``columnar`` is ``True``, the trial sets are returned as
+        :class:`.ColumnarExperiments` instead.
     """
     if block.complex_factors_or_constraints:
-        return synthesize_trials(block, samples, sampling_strategy=UnigenSamplingStrategy)
+        return synthesize_trials(block, samples, sampling_strategy=DynamicProgrammingSamplingStrategy,
+                                 columnar=columnar, seed=seed)
     else:
-        return synthesize_trials(block, samples, sampling_strategy=UniformCombinatoricSamplingStrategy)
+        return synthesize_trials(block, samples, sampling_strategy=UniformCombinatoricSamplingStrategy,
+                                 columnar=columnar, seed=seed, processes=processes)
 
 
 def synthesize_trials(block: Block,
                       samples: int = 10,
-                      sampling_strategy = NonUniformSamplingStrategy
-                      ) -> List[dict]:
+                      sampling_strategy = NonUniformSamplingStrategy,
+                      columnar: bool = False,
+                      seed: Optional[int] = None,
+                      processes: int = 1
+                      ) -> Union[List[dict], ColumnarExperiments]:
     """Given an experiment described with a :class:`.Block`, randomly generates
     multiple sets of trials for that experiment.
 
@@ -408,14 +456,42 @@ def synthesize_trials(block: Block,
         The strategy to use for trial generation. The default is
         :class:`.NonUniformSamplingStrategy`.
 
+    :param columnar:
+        Whether to return the trial sets as :class:`.ColumnarExperiments`.
+
+    :param seed:
+        A seed for the random choices of the sampling strategy. Sampling the
+        same block with the same seed produces the same trial sets.
+
+    :param processes:
+        The number of worker processes that construct the trial sets, for
+        strategies that support it (:class:`.UniformCombinatoricSamplingStrategy`).
+        The trial sets do not depend on the number of processes.
+
     :returns:
         A :class:`list` of trial sets. Each set is represented as a
         :class:`dictionary <dict>` mapping each factor name to a list of
-        levels, where each such list contains to one level per trial.
+        levels, where each such list contains to one level per trial. If
+        ``columnar`` is ``True``, the trial sets are returned as
+        :class:`.ColumnarExperiments` instead.
     """
     print("Sampling {} trial sequences using the {}".format(samples, sampling_strategy))
-    sampling_result = sampling_strategy.sample(block, samples)
-    return sampling_result.samples
+    # Strategies that do not take these options can still be used without them,
+    # and the number of processes is only given to the strategies that accept it.
+    options = cast(Dict[str, int], {})
+    if seed is not None:
+        options['seed'] = seed
+    if processes != 1 and 'processes' in signature(sampling_strategy.sample).parameters:
+        options['processes'] = processes
+    sampling_result = sampling_strategy.sample(block, samples, **options)
+    experiments = sampling_result.samples
+    if columnar:
+        if isinstance(experiments, ColumnarExperiments):
+            return experiments
+        return ColumnarExperiments.from_dicts(block, experiments)
+    if isinstance(experiments, ColumnarExperiments):
+        return experiments.to_dicts()
+    return experiments
 
 
 # TODO: This function isn't called anywhere, so it should be removed.
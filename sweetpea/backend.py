@@ -1,16 +1,22 @@
 """This module provides functionality for making requests to the backend."""
 
 
-from typing import List
+from __future__ import annotations
 
-from sweetpea.logic import And, cnf_to_json
+from array import array
+from typing import Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from sweetpea.logic import And, ClauseSink
 from sweetpea.core import Var
-from sweetpea.core.generate.utility import GenerationRequest, AssertionType
+from sweetpea.core.generate.utility import GenerationRequest, GenerationRequestColumns, AssertionType
 
 
 class LowLevelRequest:
     """Represents an individual low-level request to the backend."""
 
+    # In the order of AssertionType, so that the codes of LowLevelRequestBatch are also indices into it.
     comparisons = ['EQ', 'LT', 'GT']  # will we want more comparisons in the future?
 
     def __init__(self, comparison: str, k: int, variables: List[int]) -> None:
@@ -51,26 +57,169 @@ class LowLevelRequest:
         return str(self.__dict__)
 
 
+class LowLevelRequestBatch:
+    """A list-like collection of :class:`LowLevelRequests <.LowLevelRequest>`
+    stored in columns: one comparison code and one ``k`` per request, and the
+    variables of all requests in one flat array delimited by offsets.
+
+    Constraints can add many requests sharing a comparison and ``k`` at once
+    with :func:`.LowLevelRequestBatch.add_many`, and the backend reads the
+    columns directly through
+    :func:`.LowLevelRequestBatch.generation_request_columns`.
+    :class:`LowLevelRequest` objects are only created when individual requests
+    are accessed.
+    """
+
+    def __init__(self, requests: Iterable[LowLevelRequest] = ()) -> None:
+        self.__comparisons = array('b')
+        self.__ks = array('q')
+        self.__offsets = array('q', [0])
+        self.__variables = array('q')
+        self.extend(requests)
+
+    @staticmethod
+    def __comparison_code(comparison: str, k: int) -> int:
+        if comparison not in LowLevelRequest.comparisons:
+            raise ValueError('LowLevelRequest.comparison must be one of ' + str(LowLevelRequest.comparisons))
+        if not isinstance(k, (int, np.integer)):
+            raise ValueError('LowLevelRequest.k must be an integer')
+        return LowLevelRequest.comparisons.index(comparison)
+
+    def add(self, comparison: str, k: int, variables: Sequence[int]) -> None:
+        """Adds a single request."""
+        self.__comparisons.append(self.__comparison_code(comparison, k))
+        self.__ks.append(int(k))
+        self.__variables.extend(int(v) for v in variables)
+        self.__offsets.append(len(self.__variables))
+
+    def add_many(self, comparison: str, k: int, variables: Union[Sequence[Sequence[int]], np.ndarray]) -> None:
+        """Adds one request for each list of variables, all with the same
+        comparison and ``k``. A two-dimensional array of variables is added
+        without going through its rows one by one.
+        """
+        code = self.__comparison_code(comparison, k)
+        if isinstance(variables, np.ndarray) and variables.ndim == 2:
+            (count, size) = variables.shape
+            start = len(self.__variables)
+            self.__variables.frombytes(np.ascontiguousarray(variables, dtype=np.int64).tobytes())
+            self.__offsets.frombytes((start + size * np.arange(1, count + 1, dtype=np.int64)).tobytes())
+        else:
+            count = len(variables)
+            for request_variables in variables:
+                self.__variables.extend(int(v) for v in request_variables)
+                self.__offsets.append(len(self.__variables))
+        self.__comparisons.extend([code] * count)
+        self.__ks.extend([int(k)] * count)
+
+    def append(self, request: LowLevelRequest) -> None:
+        self.add(request.comparison, request.k, request.variables)
+
+    def extend(self, requests: Iterable[LowLevelRequest]) -> None:
+        if isinstance(requests, LowLevelRequestBatch):
+            start = len(self.__variables)
+            self.__comparisons.extend(requests.__comparisons)
+            self.__ks.extend(requests.__ks)
+            self.__variables.extend(requests.__variables)
+            self.__offsets.extend(offset + start for offset in requests.__offsets[1:])
+        else:
+            for request in requests:
+                self.append(request)
+
+    def __iadd__(self, requests: Iterable[LowLevelRequest]) -> LowLevelRequestBatch:
+        self.extend(requests)
+        return self
+
+    @property
+    def comparisons(self) -> np.ndarray:
+        """The comparison of each request, as an index into
+        :attr:`.LowLevelRequest.comparisons`.
+        """
+        return np.array(self.__comparisons, dtype=np.int8)
+
+    @property
+    def ks(self) -> np.ndarray:
+        """The ``k`` of each request."""
+        return np.array(self.__ks, dtype=np.int64)
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """The variables of request ``n`` are ``variables[offsets[n]:offsets[n + 1]]``."""
+        return np.array(self.__offsets, dtype=np.int64)
+
+    @property
+    def variables(self) -> np.ndarray:
+        """The variables of all requests, one request after another."""
+        return np.array(self.__variables, dtype=np.int64)
+
+    def generation_request_columns(self) -> GenerationRequestColumns:
+        """Returns the columns of this batch as
+        :class:`~sweetpea.core.generate.utility.GenerationRequestColumns`, which
+        the backend applies without creating an object per request.
+        """
+        return GenerationRequestColumns(self.__comparisons, self.__ks, self.__offsets, self.__variables)
+
+    def generation_requests(self) -> Iterator[GenerationRequest]:
+        """Produces the :class:`GenerationRequests <.GenerationRequest>` for
+        the requests in this batch, one at a time.
+        """
+        assertion_types = [AssertionType[comparison] for comparison in LowLevelRequest.comparisons]
+        variables = self.__variables
+        offsets = self.__offsets
+        for n, (code, k) in enumerate(zip(self.__comparisons, self.__ks)):
+            yield GenerationRequest(assertion_types[code], k, [Var(v) for v in variables[offsets[n]:offsets[n + 1]]])
+
+    def __len__(self) -> int:
+        return len(self.__ks)
+
+    def __getitem__(self, index: int) -> LowLevelRequest:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('LowLevelRequestBatch index out of range')
+        return LowLevelRequest(LowLevelRequest.comparisons[self.__comparisons[index]],
+                               self.__ks[index],
+                               self.__variables[self.__offsets[index]:self.__offsets[index + 1]].tolist())
+
+    def __iter__(self) -> Iterator[LowLevelRequest]:
+        return (self[n] for n in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, LowLevelRequestBatch):
+            return (self.__comparisons == other.__comparisons
+                    and self.__ks == other.__ks
+                    and self.__offsets == other.__offsets
+                    and self.__variables == other.__variables)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return str(list(self))
+
+    def __str__(self):
+        return str(list(self))
+
+
 class BackendRequest:
     """Represents a full request to the backend, including CNFs,
     LowLevelRequests, and unigen arguments.
     """
 
-    def __init__(self, fresh: int, cnfs: List[And] = [], ll_requests: List[LowLevelRequest] = []) -> None:
-        self.cnfs = list(cnfs)
-        self.ll_requests = list(ll_requests)
+    def __init__(self, fresh: int, cnfs: Iterable[And] = [], ll_requests: Iterable[LowLevelRequest] = []) -> None:
+        self.cnfs = ClauseSink(cnfs)
+        self.ll_requests = LowLevelRequestBatch(ll_requests)
         self.fresh = fresh
         self.support = -1
         self.solution_count = -1
 
     def get_cnfs_as_json(self):
-        return cnf_to_json(self.cnfs)
+        return self.cnfs.clauses()
 
     def get_requests_as_json(self):
         return list(map(lambda r: r.to_dict(), self.ll_requests))
 
     def get_requests_as_generation_requests(self):
-        return list(map(lambda r: r.to_generation_request(), self.ll_requests))
+        return list(self.ll_requests.generation_requests())
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
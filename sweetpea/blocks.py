@@ -6,16 +6,17 @@ a factorial experimental design.
 from abc import abstractmethod
 from functools import reduce
 from itertools import accumulate, combinations, product, repeat
-from typing import List, Union, Tuple, cast, Any, Dict, Set
+from typing import List, Optional, Sequence, Union, Tuple, cast, Any, Dict, Set
 from math import ceil
 
+import numpy as np
 from networkx import has_path
 
 from sweetpea.backend import BackendRequest
 from sweetpea.internal import get_all_levels
 from sweetpea.primitives import (
-    DerivedFactor, DerivedLevel, Factor, SimpleLevel,
-    get_external_level_name, get_internal_level_name)
+    DerivedFactor, DerivedLevel, Factor, Level, SimpleLevel,
+    get_external_level_name)
 from sweetpea.logic import to_cnf_tseitin
 from sweetpea.base_constraint import Constraint
 from sweetpea.design_graph import DesignGraph
@@ -44,6 +45,15 @@ class Block:
         self.require_complete_crossing = require_complete_crossing
         self.size = cast(int, None)
         self.errors = cast(Set[str], set())
+        self.__simple_level_variables = cast(Dict[Tuple[int, int], int], {})
+        # The enumerator of the block's trial sequences, and the constraints and
+        # minimum number of trials it was built for.
+        self.__solution_enumerator = cast(Any, None)
+        self.__solution_enumerator_key = cast(Optional[tuple], None)
+        # The compiled masks of the excluded combinations, and the list of
+        # exclusions and its length when they were compiled.
+        self.__excluded_masks = cast(List[int], [])
+        self.__excluded_masks_key = cast(Optional[Tuple[int, int]], None)
         self.__validate()
 
     def extract_basic_factor_names(self, level: DerivedLevel) -> set:
@@ -123,8 +133,7 @@ class Block:
 
     def variables_for_factor(self, f: Factor) -> int:
         """Indicates the number of variables needed to encode this factor."""
-        trial_list = range(1, self.trials_per_sample() + 1)
-        return reduce(lambda sum, t: sum + len(f.levels) if f.applies_to_trial(t) else sum, trial_list, 0)
+        return len(f.levels) * f.applicable_trial_count(self.trials_per_sample())
 
     def has_factor(self, factor: Factor) -> Factor:
         """Determines whether a given factor is in this block."""
@@ -153,9 +162,16 @@ class Block:
             return self.grid_variables() + offset
 
         else:
-            simple_factors = list(filter(lambda f: not f.has_complex_window, self.design))
-            simple_levels = get_all_levels(simple_factors)
-            return simple_levels.index((factor, level))
+            # The positions of the simple levels are indexed by the factor and
+            # level identifiers the first time they are needed.
+            if not self.__simple_level_variables:
+                simple_factors = list(filter(lambda f: not f.has_complex_window, self.design))
+                self.__simple_level_variables = {(f.id, l.id): variable
+                                                 for variable, (f, l) in enumerate(get_all_levels(simple_factors))}
+            variable = self.__simple_level_variables.get((factor.id, level.id))
+            if variable is None:
+                raise ValueError(f"Level {level.name} of factor {factor.name} is not in the design.")
+            return variable
 
     def factor_variables_for_trial(self, f: Factor, t: int) -> List[int]:
         """Given a factor and a trial number (1-based) this function will
@@ -165,7 +181,7 @@ class Block:
         if not f.applies_to_trial(t):
             raise ValueError('Factor does not apply to trial #' + str(t) + ' f=' + str(f))
 
-        previous_trials = sum(map(lambda trial: 1 if f.applies_to_trial(trial + 1) else 0, range(t))) - 1
+        previous_trials = f.applicable_trial_count(t) - 1
         initial_sequence = list(map(lambda l: self.first_variable_for_level(f, l),
                                     list(filter(lambda l: (f, l) not in self.exclude,
                                                 f.levels))))
@@ -228,27 +244,175 @@ class Block:
         """Given crossing and design-only variables and returns true if the
         combination meets any of the exclude contraints.
         """
-        di = {}
-        for crossed in c:
-            t = self.decode_variable(crossed)
-            di[t[0]] = t[1]
-        for design in d:
-            t = self.decode_variable(design)
-            di[t[0]] = t[1]
-
-        return any(list(map(lambda e: all(list(map(lambda ex_level: e[ex_level] == di[ex_level], e))), self.excluded_derived)))
+        combination = self.__grid_level_mask(c) | self.__grid_level_mask(d)
+        return any(combination & e == e for e in self.__excluded_derived_masks())
 
     def filter_excluded_derived_levels(self, l: List[List[List[Tuple[int, ...]]]]) -> List[List[List[Tuple[int, ...]]]]:
         """Given a list of trials, the function filters the trials invalid as
         per the exclude contraints.
         """
-        return list(filter(None,
-                           map(lambda j: list(filter(lambda li: len(li) > 1,
-                                                     map(lambda k: [k[0]]
-                                                         + list(filter(lambda c: not self.is_excluded(k[0], c),
-                                                                       k[1:])),
-                                                         j))),
-                               l)))
+        excluded_masks = self.__excluded_derived_masks()
+        # The design-only combinations are shared between all the crossings of
+        # a trial, so their masks are only computed once per combination.
+        design_masks: Dict[Tuple[int, ...], int] = {}
+
+        def design_mask(d: Tuple[int, ...]) -> int:
+            mask = design_masks.get(d)
+            if mask is None:
+                mask = self.__grid_level_mask(d)
+                design_masks[d] = mask
+            return mask
+
+        filtered = []
+        for trial in l:
+            filtered_trial = []
+            for k in trial:
+                # Only the part of each exclusion not already covered by the
+                # crossing needs to be matched against the design combinations.
+                crossing_mask = self.__grid_level_mask(k[0])
+                remainders = [e & ~crossing_mask for e in excluded_masks]
+                if 0 in remainders:
+                    continue
+                allowed = [c for c in k[1:] if not any(design_mask(c) & r == r for r in remainders)]
+                if allowed:
+                    filtered_trial.append([k[0]] + allowed)
+            if filtered_trial:
+                filtered.append(filtered_trial)
+        return filtered
+
+    def __excluded_derived_masks(self) -> List[int]:
+        """Compiles :attr:`excluded_derived` into bitmasks over the level
+        indices of a single trial, where bit ``n`` is set if the level
+        represented by the ``n``th variable of a trial is part of the excluded
+        combination.
+
+        The masks are compiled once and reused until exclusions are added.
+        """
+        key = (id(self.excluded_derived), len(self.excluded_derived))
+        if key == self.__excluded_masks_key:
+            return self.__excluded_masks
+        masks = []
+        for excluded in self.excluded_derived:
+            mask = 0
+            for factor, level in excluded.items():
+                mask |= 1 << self.first_variable_for_level(factor, level)
+            masks.append(mask)
+        self.__excluded_masks = masks
+        self.__excluded_masks_key = key
+        return masks
+
+    def __grid_level_mask(self, variables: Tuple[int, ...]) -> int:
+        """Builds a bitmask over the level indices of a single trial for the
+        given (1-based) variables. Variables outside of the grid are ignored,
+        since they can never be part of an excluded combination of basic
+        levels.
+        """
+        grid_variables = self.grid_variables()
+        trial_size = self.variables_per_trial()
+        mask = 0
+        for v in variables:
+            if v <= grid_variables:
+                mask |= 1 << ((v - 1) % trial_size)
+        return mask
+
+    def _count_exclusions(self, crossing: List[Factor]) -> int:
+        """This method is responsible for determining the number of trials that
+        should be excluded from the given crossing, based on any
+        :class:`Exclude` constraints that the user provides. A single
+        :class:`Exclude` constraint may prevent multiple crossings, depending
+        on the derivation function used.
+
+        Derived exclusions are only evaluated over the factors their
+        derivations actually depend on, so the cost grows with the width of
+        the derivation rather than with the size of the whole design.
+        """
+        from sweetpea.constraints import Exclude
+
+        excluded_crossings = cast(Set[Tuple[Level, ...]], set())
+        excluded_external_names = set()
+
+        # Get the exclude constraints.
+        exclusions = cast(List[Exclude], list(filter(lambda c: isinstance(c, Exclude), self.constraints)))
+        if not exclusions:
+            return 0
+
+        # If there are any, generate the full crossing as a list of tuples.
+        levels_lists = [list(f.levels) for f in crossing]
+        all_crossings = list(product(*levels_lists))
+
+        for constraint in exclusions:
+            if constraint.factor.has_complex_window:
+                # If the excluded factor has a complex window, then we don't need
+                # to reduce the sequence length. What if the transition being excluded
+                # is in the crossing? If it is, then they shouldn't be excluding it.
+                # We should give an error if we detect that.
+                continue
+
+            # Retrieve the derivation function that defines this exclusion.
+            excluded_level = constraint.level
+
+            if isinstance(excluded_level, SimpleLevel):
+                for c in all_crossings:
+                    if excluded_level in c:
+                        excluded_crossings.add(c)
+                continue
+
+            # For each crossing, ensure that at least one combination is
+            # possible with the design-only factors keeping in mind the
+            # exclude constraints. Only the factors that the derivation depends
+            # on can change the outcome, so the crossing is projected onto
+            # those and the design-only factors are limited to them as well.
+            dependencies = self.__derivation_dependencies(excluded_level)
+            crossed_indices = [i for i, f in enumerate(crossing) if f in dependencies]
+            design_levels = [list(f.levels) for f in self.design
+                             if f not in crossing and f in dependencies]
+            projections = cast(Dict[Tuple[Level, ...], bool], {})
+            for c in all_crossings:
+                projection = tuple(c[i] for i in crossed_indices)
+                if projection not in projections:
+                    projections[projection] = all(self.__excluded_derived(excluded_level, projection + d)
+                                                  for d in product(*design_levels))
+                if projections[projection]:
+                    excluded_crossings.add(c)
+                    excluded_external_names.add(", ".join(map(get_external_level_name, c)))
+        if self.require_complete_crossing and len(excluded_crossings) != 0:
+            er = "Complete crossing is not possible beacuse the following combinations have been excluded:"
+            for names in excluded_external_names:
+                er += "\n" + names
+            self.errors.add(er)
+        return len(excluded_crossings)
+
+    def __derivation_dependencies(self, level: DerivedLevel) -> List[Factor]:
+        """Returns every factor that the derivation of the given level depends
+        on, including the derived factors it depends on and their own
+        dependencies.
+        """
+        dependencies = cast(List[Factor], [])
+        pending = [level]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            for f in current.window.args:
+                if f not in dependencies:
+                    dependencies.append(f)
+                if f.is_derived():
+                    pending.extend(cast(List[DerivedLevel], f.levels))
+        return dependencies
+
+    def __excluded_derived(self, excluded_level: DerivedLevel, c: Tuple[Level, ...]) -> bool:
+        """Given a combination of levels and an exclude constraint returns true
+        if that combination results in the exclude level.
+        """
+        # Only WithinTrial windows get here, so each factor of the window has
+        # exactly one level in the combination.
+        args = [next(filter(lambda l: l.factor == f, c)) for f in excluded_level.window.args]
+        derived_factor = cast(DerivedFactor, excluded_level.factor)
+        if derived_factor.get_derived_level(args) != excluded_level:
+            return False
+        return all(self.__excluded_derived(cast(DerivedLevel, l), c) for l in args if isinstance(l, DerivedLevel))
 
     def build_backend_request(self) -> BackendRequest:
         """Apply all constraints to build a :class:`.BackendRequest`. Formerly
@@ -265,6 +429,145 @@ class Block:
 
         return backend_request
 
+    def independent_support(self) -> List[int]:
+        """Returns a set of variables whose values determine the values of all
+        of the :func:`.Block.variables_per_sample` variables in a solution:
+        the variables of all levels but the last of each basic factor in each
+        trial. The remaining level of a basic factor is the one chosen when
+        none of the others are (see :class:`.Consistency`), and derived
+        levels follow from the basic levels through their derivations.
+
+        Samplers only have to pick values for these variables, and
+        :func:`.Block.expand_support` recovers the rest.
+        """
+        basic_factors = [f for f in self.design if not isinstance(f, DerivedFactor)]
+        return [v for t in range(1, self.trials_per_sample() + 1)
+                for f in basic_factors
+                for v in self.factor_variables_for_trial(f, t)[:-1]]
+
+    def expand_support(self, assignments: List[List[int]]) -> List[List[int]]:
+        """Completes solutions whose values are only known for the variables
+        of the :func:`.Block.independent_support`. Each assignment is a list
+        of variables, which are negated when false; the values of variables
+        outside of the independent support are ignored.
+
+        Each solution is returned as the list of all of the
+        :func:`.Block.variables_per_sample` variables, negated when false, so
+        it can be decoded like any other solution.
+        """
+        from sweetpea.constraints import Derivation
+
+        variable_count = self.variables_per_sample()
+        in_support = np.zeros(variable_count + 1, dtype=bool)
+        in_support[self.independent_support()] = True
+        values = np.zeros((len(assignments), variable_count + 1), dtype=bool)
+        for row, assignment in zip(values, assignments):
+            variables = np.array(assignment, dtype=np.int64)
+            row[variables[(variables > 0) & (variables <= variable_count)]] = True
+        values &= in_support
+
+        # The level of a basic factor left out of the support is chosen when
+        # none of the other levels are.
+        trials = range(1, self.trials_per_sample() + 1)
+        for f in filter(lambda f: not isinstance(f, DerivedFactor), self.design):
+            levels = np.array([self.factor_variables_for_trial(f, t) for t in trials], dtype=np.int64)
+            values[:, levels[:, -1]] = ~values[:, levels[:, :-1]].any(axis=2)
+
+        # Derived levels hold when all of the dependent variables of any of
+        # their combinations do. Derivations can depend on derived levels, so
+        # they are evaluated until the values no longer change.
+        derivations = []
+        for c in filter(lambda c: isinstance(c, Derivation), self.constraints):
+            derivation = cast(Derivation, c)
+            (derived, dependent) = derivation.window_variables(self)
+            starts = np.cumsum([0] + [len(l) for l in derivation.dependent_idxs[:-1]], dtype=np.int64)
+            derivations.append((derived, dependent, starts))
+        for _ in range(len(derivations) + 1):
+            changed = False
+            for (derived, dependent, starts) in derivations:
+                if dependent.shape[1] == 0:
+                    holds = np.zeros((len(assignments), derived.size), dtype=bool)
+                else:
+                    holds = np.logical_and.reduceat(values[:, dependent], starts, axis=2).any(axis=2)
+                changed = changed or bool((values[:, derived] != holds).any())
+                values[:, derived] = holds
+            if not changed:
+                break
+
+        variables = np.arange(1, variable_count + 1, dtype=np.int64)
+        return np.where(values[:, 1:], variables, -variables).tolist()
+
+    def solution_count(self) -> int:
+        """Returns the number of distinct trial sequences that satisfy this
+        block. Each of them can be constructed from its index with
+        :func:`.Block.sample_at`.
+
+        The sequences are counted without a SAT solver, which is only possible
+        for designs that the :class:`.UniformCombinatoricSamplingStrategy` or
+        the :class:`.DynamicProgrammingSamplingStrategy` sample exactly.
+
+        :raises ValueError: If the sequences of this block cannot be counted,
+            or if the block has errors (such as exclusions that leave no
+            complete crossing).
+        """
+        return self.__enumerator().solution_count()
+
+    def sample_at(self, index: int) -> dict:
+        """Constructs the trial sequence with the given index, between ``0``
+        and :func:`.Block.solution_count`. Each index gives a different
+        sequence, and the same index always gives the same sequence, so
+        independent processes can share out the sequences without
+        coordinating (e.g., by giving participant ``i`` the sequence at
+        ``hash(i) % block.solution_count()``).
+
+        The sequence is given in the form returned by
+        :func:`.synthesize_trials`.
+
+        :raises ValueError: If the sequences of this block cannot be counted
+            (see :func:`.Block.solution_count`), or if the index is out of
+            range.
+        """
+        return self.samples_at([index])[0]
+
+    def samples_at(self, indices: Sequence[int]) -> List[dict]:
+        """Constructs the trial sequences with the given indices. See
+        :func:`.Block.sample_at`.
+        """
+        count = self.solution_count()
+        for index in indices:
+            if not 0 <= index < count:
+                raise ValueError(f"Sample index {index} is out of range for {count} solutions.")
+        enumerator = self.__enumerator()
+        if not indices:
+            return []
+        samples = enumerator.generate_samples(list(indices))
+        return samples if isinstance(samples, list) else samples.to_dicts()
+
+    def __enumerator(self) -> Any:
+        """Builds the enumerator of this block's trial sequences when it is
+        first needed, and again whenever the block's constraints or minimum
+        number of trials have changed since.
+        """
+        key = (tuple(map(id, self.constraints)), self.min_trials)
+        if key == self.__solution_enumerator_key:
+            return self.__solution_enumerator
+
+        from sweetpea.sampling_strategies.dynamic_programming import DPSolutionEnumerator
+        from sweetpea.sampling_strategies.uniform_combinatoric import (
+            UCSolutionEnumerator, UniformCombinatoricSamplingStrategy)
+
+        self.trials_per_sample()
+        errors = sorted(e for e in self.errors if "WARNING" not in e)
+        if errors:
+            raise ValueError("The sequences of this block cannot be counted:\n" + "\n".join(errors))
+        if not self.complex_factors_or_constraints and UniformCombinatoricSamplingStrategy.supports(self):
+            enumerator: Any = UCSolutionEnumerator(self)
+        else:
+            enumerator = DPSolutionEnumerator(self)
+        self.__solution_enumerator = enumerator
+        self.__solution_enumerator_key = key
+        return enumerator
+
     def get_variable(self, trial_number: int, level: Tuple[Factor, Any]) -> int:
         """Given a trial number (1-based), factor, and level, this method will
         return the SAT variable that represents that selection. Only works for
@@ -362,13 +665,7 @@ class FullyCrossBlock(Block):
 
         This is a helper for :class:`.FullyCrossBlock.trials_per_sample`.
         """
-        trial = 0
-        counter = 0
-        while counter != crossing_size:
-            trial += 1
-            if f.applies_to_trial(trial):
-                counter += 1
-        return trial
+        return f.trials_required(crossing_size)
 
     def trials_per_sample(self):
         crossing_size = self.crossing_size()
@@ -385,79 +682,14 @@ class FullyCrossBlock(Block):
     def grid_variables(self):
         return self.trials_per_sample() * self.variables_per_trial()
 
-    def __count_exclusions(self):
-        """This method is responsible for determining the number of trials that
-        should be excluded from the full crossing, based on any
-        :class:`Exclude` constraints that the user provides. A single
-        :class:`Exclude` constraint may prevent multiple crossings, depending
-        on the derivation function used.
-        """
-        from sweetpea.constraints import Exclude
-
-        excluded_crossings = set()
-        excluded_external_names = set()
-
-        # Get the exclude constraints.
-        exclusions = list(filter(lambda c: isinstance(c, Exclude), self.constraints))
-        if not exclusions:
-            return 0
-
-        # If there are any, generate the full crossing as a list of tuples.
-        levels_lists = [list(f.levels) for f in self.crossing[0]]
-        all_crossings = list(product(*levels_lists))
-
-        for constraint in exclusions:
-            if constraint.factor.has_complex_window:
-                # If the excluded factor has a complex window, then we don't need
-                # to reduce the sequence length. What if the transition being excluded
-                # is in the crossing? If it is, then they shouldn't be excluding it.
-                # We should give an error if we detect that.
-                continue
-
-            # Retrieve the derivation function that defines this exclusion.
-            excluded_level = constraint.level
-
-            if isinstance(excluded_level, SimpleLevel):
-                for c in all_crossings:
-                    if excluded_level in c:
-                        excluded_crossings.add(get_internal_level_name(c[0]) + ", " + get_internal_level_name(c[1]))
-            else:
-                # For each crossing, ensure that atleast one combination is possible with the design-only factors keeping in mind the exclude constraints.
-                for c in all_crossings:
-                    if all(list(map(lambda d: self.__excluded_derived(excluded_level, c+d), list(product(*[list(f.levels) for f in filter(lambda f: f not in self.crossing[0], self.design)]))))):
-                        excluded_crossings.add(get_internal_level_name(c[0]) + ", " + get_internal_level_name(c[1]))
-                        excluded_external_names.add(get_external_level_name(c[0]) + ", " + get_external_level_name(c[1]))
-        if self.require_complete_crossing and len(excluded_crossings) != 0:
-            er = "Complete crossing is not possible beacuse the following combinations have been excluded:"
-            for names in excluded_external_names:
-                er += "\n" + names
-            self.errors.add(er)
-        return len(excluded_crossings)
-
-
-    def __excluded_derived(self, excluded_level, c):
-        """Given the complete crossing and an exclude constraint returns true
-        if that combination results in the exclude level.
-        """
-        ret = []
-
-        for f in filter(lambda f: f.is_derived(), excluded_level.window.args):
-            ret.append(self.__excluded_derived(list(filter(lambda l: l.factor == f, c))[0], c))
-
-        # Invoking the fn this way is only ok because we only do this for WithinTrial windows.
-        # With complex windows, it wouldn't work due to the list aspect for each argument.
-        ret.append(excluded_level.window.fn(*list(map(lambda l: get_external_level_name(l), filter(lambda l: l.factor in excluded_level.window.args, c)))))
-
-        return all(ret)
-
     def crossing_size(self):
         if self.size:
             return self.size
         crossing_size = self.crossing_size_without_exclusions()
         if not self.require_complete_crossing:
-            crossing_size -= self.__count_exclusions()
+            crossing_size -= self._count_exclusions(self.crossing[0])
         else:
-            self.__count_exclusions()
+            self._count_exclusions(self.crossing[0])
         self.size = crossing_size
         return crossing_size
 
@@ -525,13 +757,7 @@ class MultipleCrossBlock(Block):
 
         This is a helper for :class:`.MultipleCrossBlock.trials_per_sample`.
         """
-        trial = 0
-        counter = 0
-        while counter != crossing_size:
-            trial += 1
-            if f.applies_to_trial(trial):
-                counter += 1
-        return trial
+        return f.trials_required(crossing_size)
 
     def trials_per_sample(self):
         crossing_size = self.crossing_size()
@@ -549,68 +775,8 @@ class MultipleCrossBlock(Block):
         return self.trials_per_sample() * self.variables_per_trial()
 
     def __count_exclusions(self, num):
-        """This method is responsible for determining the number of trials that
-        should be excluded from the full crossing, based on any
-        :class:`Exclude` constraints that the user provides. A single
-        :class:`Exclude` constraint may prevent multiple crossings, depending
-        on the derivation function used.
-        """
-        from sweetpea.constraints import Exclude
-
-        excluded_crossings = set()
-        excluded_external_names = set()
-
-        # Get the exclude constraints.
-        exclusions = list(filter(lambda c: isinstance(c, Exclude), self.constraints))
-        if not exclusions:
-            return 0
-
-        # If there are any, generate the full crossing as a list of tuples.
-        levels_lists = [list(f.levels) for f in self.crossing[0]]
-        all_crossings = list(product(*levels_lists))
-
-        for constraint in exclusions:
-            if constraint.factor.has_complex_window:
-                # If the excluded factor has a complex window, then we don't need
-                # to reduce the sequence length. What if the transition being excluded
-                # is in the crossing? If it is, then they shouldn't be excluding it.
-                # We should give an error if we detect that.
-                continue
-
-            # Retrieve the derivation function that defines this exclusion.
-            excluded_level = constraint.level
-
-            if isinstance(excluded_level, SimpleLevel):
-                for c in all_crossings:
-                    if excluded_level in c:
-                        excluded_crossings.add(get_internal_level_name(c[0]) + ", " + get_internal_level_name(c[1]))
-            else:
-                # For each crossing, ensure that atleast one combination is possible with the disgn-only factors keeping in mind the exclude contraints.
-                for c in all_crossings:
-                    if all(list(map(lambda d: self.__excluded_derived(excluded_level, c+d), list(product(*[list(f.levels) for f in filter(lambda f: f not in self.crossing[0], self.design)]))))):
-                        excluded_crossings.add(get_internal_level_name(c[0]) + ", " + get_internal_level_name(c[1]))
-                        excluded_external_names.add(get_external_level_name(c[0]) + ", " + get_external_level_name(c[1]))
-        if self.require_complete_crossing and len(excluded_crossings) != 0:
-            er = "Complete crossing is not possible beacuse the following combinations have been excluded:"
-            for names in excluded_external_names:
-                er += "\n" + names
-            self.errors.add(er)
-        return len(excluded_crossings)
-
-    def __excluded_derived(self, excluded_level, c):
-        """Given the complete crossing and an exclude constraint returns true
-        if that combination results in the exclude level.
-        """
-        ret = []
-
-        for f in filter(lambda f: f.is_derived(), excluded_level.window.args):
-            ret.append(self.__excluded_derived(list(filter(lambda l: l.factor == f, c))[0], c))
-
-        # Invoking the fn this way is only ok because we only do this for WithinTrial windows.
-        # With complex windows, it wouldn't work due to the list aspect for each argument.
-        ret.append(excluded_level.window.fn(*list(map(lambda l: get_external_level_name(l), filter(lambda l: l.factor in excluded_level.window.args, c)))))
-
-        return all(ret)
+        # Exclusions are currently always counted against the first crossing.
+        return self._count_exclusions(self.crossing[0])
 
     def crossing_size(self):
         if self.size:
@@ -1,7 +1,11 @@
 """This module provides combinatoric functionality."""
 
 
-from typing import List, cast
+import random
+
+from typing import List, Optional, Sequence, Set, cast
+
+import numpy as np
 
 
 def extract_components(sizes: List[int], n: int) -> List[int]:
@@ -42,24 +46,92 @@ def compute_jth_inversion_sequence(n, j):
     return inversion
 
 
+#: The length from which :func:`.construct_permutation` counts free positions
+#: with a Fenwick tree. Below it, removing each chosen position from a list of
+#: the free ones is faster, as the removals only move memory.
+FENWICK_PERMUTATION_LENGTH = 1 << 17
+
+
 def construct_permutation(inversion_sequence: List[int]) -> List[int]:
-    """Given an inversion sequence, construct the permutation."""
+    """Given an inversion sequence, construct the permutation.
+
+    Each element ``n`` is placed in the ``inversion_sequence[n]``-th position
+    (counting from ``0``) that is still free. For sequences of at least
+    :data:`.FENWICK_PERMUTATION_LENGTH` elements, the free positions are
+    counted with a Fenwick tree, so the permutation is built in
+    :math:`O(n \\log n)` time.
+    """
     length = len(inversion_sequence)
-    permutation = cast(List[int], [None] * len(inversion_sequence))
+    if length < FENWICK_PERMUTATION_LENGTH:
+        free = list(range(length))
+        permutation = [0] * length
+        for n, b in enumerate(inversion_sequence):
+            permutation[free.pop(b)] = n
+        return permutation
+
+    # tree[i] holds the number of free positions in (i - (i & -i), i], with
+    # positions numbered from 1.
+    tree = [i & -i for i in range(length + 1)]
+    top = 1 << length.bit_length() if length else 0
+    permutation = cast(List[int], [None] * length)
     for n, b in enumerate(inversion_sequence):
-        idx = 0
-        step = -1
-        while idx < length:
-            if permutation[idx] == None:
-                step += 1
-                if step == b:
-                    break
-            idx += 1
-        permutation[idx] = n
+        # Descend the tree to the last position with at most b free positions
+        # before or at it; the next position is the (b + 1)th free one.
+        position = 0
+        remaining = b
+        step = top
+        while step:
+            following = position + step
+            if following <= length and tree[following] <= remaining:
+                position = following
+                remaining -= tree[following]
+            step >>= 1
+        permutation[position] = n
+        position += 1
+        while position <= length:
+            tree[position] -= 1
+            position += position & -position
 
     return permutation
 
 
+def construct_permutations(inversion_sequences: Sequence[Sequence[int]]) -> List[List[int]]:
+    """Constructs the permutations of many inversion sequences of the same
+    length at once. This is equivalent to calling
+    :func:`.construct_permutation` on each sequence, but the Fenwick trees of
+    all of the sequences are updated together with numpy.
+    """
+    if not inversion_sequences:
+        return []
+    sequences = np.array(inversion_sequences, dtype=np.int64).reshape(len(inversion_sequences), -1)
+    (count, length) = sequences.shape
+    rows = np.arange(count)
+    tree = np.tile(np.arange(length + 1) & -np.arange(length + 1), (count, 1))
+    top = 1 << length.bit_length() if length else 0
+    permutations = np.zeros((count, length), dtype=np.int64)
+    for n in range(length):
+        position = np.zeros(count, dtype=np.int64)
+        remaining = sequences[:, n].copy()
+        step = top
+        while step:
+            following = position + step
+            counts = tree[rows, np.minimum(following, length)]
+            take = (following <= length) & (counts <= remaining)
+            position[take] = following[take]
+            remaining[take] -= counts[take]
+            step >>= 1
+        permutations[rows, position] = n
+        position += 1
+        while True:
+            active = position <= length
+            if not active.any():
+                break
+            tree[rows[active], position[active]] -= 1
+            position += position & -position
+
+    return permutations.tolist()
+
+
 def compute_jth_combination(l, n, j):
     """In a sequence of ``l`` items, where there are ``n`` choices for each
     item, this will compute the ``jth`` combination, out of all :math:`n^l`
@@ -71,3 +143,34 @@ def compute_jth_combination(l, n, j):
         j //= n
 
     return combination
+
+
+def choose_distinct(n: int, count: int, rng: Optional[random.Random] = None) -> List[int]:
+    """Draws ``count`` distinct integers from ``range(n)`` uniformly at
+    random, in a random order. ``n`` may be too large for :func:`random.sample`.
+
+    The integers are drawn from ``rng`` if it is given, and from the global
+    :mod:`random` state otherwise.
+    """
+    if not 0 <= count <= n:
+        raise ValueError(f"Cannot draw {count} distinct integers from {n}.")
+    shuffle = rng.shuffle if rng is not None else random.shuffle
+    randrange = rng.randrange if rng is not None else random.randrange
+
+    # When most of the integers are wanted, shuffling all of them avoids
+    # redrawing integers that were already chosen.
+    if 2 * count >= n:
+        integers = list(range(n))
+        shuffle(integers)
+        return integers[:count]
+
+    # Otherwise, at most half of the integers are taken, so each integer is
+    # drawn at most twice on average.
+    chosen = cast(Set[int], set())
+    integers = cast(List[int], [])
+    while len(integers) < count:
+        i = randrange(0, n)
+        if i not in chosen:
+            chosen.add(i)
+            integers.append(i)
+    return integers
@@ -4,13 +4,15 @@
 from abc import abstractmethod
 from copy import deepcopy
 from typing import List, Tuple, Any, Union, cast, Dict
-from itertools import chain, product
+from itertools import accumulate, chain, product
+
+import numpy as np
 
 from sweetpea.base_constraint import Constraint
-from sweetpea.internal import chunk, chunk_list
+from sweetpea.internal import chunk
 from sweetpea.blocks import Block, FullyCrossBlock, MultipleCrossBlock
-from sweetpea.backend import LowLevelRequest, BackendRequest
-from sweetpea.logic import If, Iff, And, Or, Not
+from sweetpea.backend import BackendRequest
+from sweetpea.logic import If, Iff, And, Or, Not, compile_cnf, replicate_cnf_into
 from sweetpea.primitives import DerivedFactor, DerivedLevel, Factor, Level, SimpleLevel, get_internal_level_name
 
 
@@ -27,6 +29,16 @@ def validate_factor_and_level(block: Block, factor: Factor, level: Union[SimpleL
                               factor.factor_name))
 
 
+def common_applicable_trials(factors: List[Factor], trial_count: int) -> List[int]:
+    """Returns the trials (1-based) among the first ``trial_count`` trials to
+    which all of the given factors apply.
+    """
+    applicable = np.ones(trial_count, dtype=bool)
+    for f in factors:
+        applicable &= f.applicable_trials(trial_count)
+    return (np.flatnonzero(applicable) + 1).tolist()
+
+
 class Consistency(Constraint):
     """This constraint ensures that only one level of each factor is 'on' at a
     time. So for instance in the experiment::
@@ -63,15 +75,13 @@ class Consistency(Constraint):
         for _ in range(block.trials_per_sample()):
             for f in filter(lambda f: not f.has_complex_window, block.design):
                 number_of_levels = len(f.levels)
-                new_request = LowLevelRequest("EQ", 1, list(range(next_var, next_var + number_of_levels)))
-                backend_request.ll_requests.append(new_request)
+                backend_request.ll_requests.add("EQ", 1, range(next_var, next_var + number_of_levels))
                 next_var += number_of_levels
 
         for f in filter(lambda f: f.has_complex_window, block.design):
             variables_for_factor = block.variables_for_factor(f)
-            var_list = list(map(lambda n: n + next_var, range(variables_for_factor)))
-            chunks = list(chunk_list(var_list, len(f.levels)))
-            backend_request.ll_requests += list(map(lambda v: LowLevelRequest("EQ", 1, v), chunks))
+            var_list = np.arange(next_var, next_var + variables_for_factor, dtype=np.int64)
+            backend_request.ll_requests.add_many("EQ", 1, var_list.reshape(-1, len(f.levels)))
             next_var += variables_for_factor
 
 
@@ -120,10 +130,7 @@ class FullyCross(Constraint):
 
         # Step 1: Get a list of the trials that are involved in the crossing.
         crossing_size = max(block.min_trials, block.crossing_size())
-        crossing_trials = list(filter(lambda t: all(map(lambda f: f.applies_to_trial(t),
-                                                        block.crossing[0])),
-                                      range(1, block.trials_per_sample() + 1)))
-        crossing_trials = crossing_trials[:crossing_size]
+        crossing_trials = common_applicable_trials(block.crossing[0], block.trials_per_sample())[:crossing_size]
 
         # Step 2: For each trial, cross all levels of all factors in the crossing.
         crossing_factors = list(map(lambda t: (list(product(*[block.factor_variables_for_trial(f, t)
@@ -154,8 +161,9 @@ class FullyCross(Constraint):
         fresh += sum(num_state_vars)
 
         # Step 7: Associate each state variable with its crossing.
-        flattened_crossings = list(chain.from_iterable(crossings))
-        iffs = list(map(lambda n: Iff(state_vars[n], And([*flattened_crossings[n][0]])), range(len(state_vars))))
+        state_offsets = [0] + list(accumulate(num_state_vars))
+        trial_iffs = lambda i: list(map(lambda n: Iff(state_vars[state_offsets[i] + n], And([*crossings[i][n][0]])),
+                                        range(num_state_vars[i])))
 
         # Step 8: Constrain each crossing to occur in only one trial.
         states = list(chunk(state_vars, block.crossing_size()))
@@ -164,12 +172,17 @@ class FullyCross(Constraint):
         # We Use n < 2 rather than n = 1 here because they may exclude some levels from the crossing.
         # This ensures that there won't be duplicates, while still allowing some to be missing.
         # backend_request.ll_requests += list(map(lambda l: LowLevelRequest("LT", 2, l), transposed))
-        backend_request.ll_requests += list(map(lambda l: LowLevelRequest("GT", 0, l), transposed))
-
-        (cnf, new_fresh) = block.cnf_fn(And(iffs), fresh)
+        backend_request.ll_requests.add_many("GT", 0, transposed)
 
-        backend_request.cnfs.append(cnf)
-        backend_request.fresh = new_fresh
+        # The trials only share the same clause structure if none of them lost
+        # a different number of crossings to exclusions.
+        if len(set(num_state_vars)) == 1:
+            backend_request.fresh = replicate_cnf_into(block.cnf_fn, trial_iffs, len(crossings), fresh,
+                                                       backend_request.cnfs)
+        else:
+            backend_request.fresh = compile_cnf(block.cnf_fn,
+                                                And(list(chain.from_iterable(map(trial_iffs, range(len(crossings)))))),
+                                                fresh, backend_request.cnfs)
 
 
 class MultipleCross(Constraint):
@@ -184,10 +197,7 @@ class MultipleCross(Constraint):
 
             # Step 1: Get a list of the trials that are involved in the crossing.
             crossing_size = max(block.min_trials, block.crossing_size())
-            crossing_trials = list(filter(lambda t: all(map(lambda f: f.applies_to_trial(t),
-                                                            c)),
-                                          range(1, block.trials_per_sample() + 1)))
-            crossing_trials = crossing_trials[:crossing_size]
+            crossing_trials = common_applicable_trials(c, block.trials_per_sample())[:crossing_size]
 
             # Step 2: For each trial, cross all levels of all factors in the crossing.
             crossing_factors = list(map(lambda t: (list(product(*[block.factor_variables_for_trial(f, t) for f in c]))), crossing_trials))
@@ -216,22 +226,29 @@ class MultipleCross(Constraint):
             fresh += sum(num_state_vars)
 
             # Step 7: Associate each state variable with its crossing.
-            flattened_crossings = list(chain.from_iterable(crossings))
-            iffs = list(map(lambda n: Iff(state_vars[n], And([*flattened_crossings[n][0]])), range(len(state_vars))))
+            state_offsets = [0] + list(accumulate(num_state_vars))
+            trial_iffs = lambda i: list(map(lambda n: Iff(state_vars[state_offsets[i] + n], And([*crossings[i][n][0]])),
+                                            range(num_state_vars[i])))
 
             # Step 8: Constrain each crossing to occur in only one trial.
-            states = list(chunk(state_vars, block.crossing_size()))
+            #         A trial has fewer states for crossings smaller than the largest one.
+            states = list(chunk(state_vars, min(block.crossing_size(), len(crossing_factors[0]))))
             transposed = cast(List[List[int]], list(map(list, zip(*states))))
 
             # We Use n < 2 rather than n = 1 here because they may exclude some levels from the crossing.
             # This ensures that there won't be duplicates, while still allowing some to be missing.
             # backend_request.ll_requests += list(map(lambda l: LowLevelRequest("LT", 2, l), transposed))
-            backend_request.ll_requests += list(map(lambda l: LowLevelRequest("GT", 0, l), transposed))
-
-            (cnf, new_fresh) = block.cnf_fn(And(iffs), fresh)
+            backend_request.ll_requests.add_many("GT", 0, transposed)
 
-            backend_request.cnfs.append(cnf)
-            backend_request.fresh = new_fresh
+            # The trials only share the same clause structure if none of them lost
+            # a different number of crossings to exclusions.
+            if len(set(num_state_vars)) == 1:
+                backend_request.fresh = replicate_cnf_into(block.cnf_fn, trial_iffs, len(crossings), fresh,
+                                                           backend_request.cnfs)
+            else:
+                backend_request.fresh = compile_cnf(block.cnf_fn,
+                                                    And(list(chain.from_iterable(map(trial_iffs, range(len(crossings)))))),
+                                                    fresh, backend_request.cnfs)
 
 
 class Derivation(Constraint):
@@ -293,50 +310,60 @@ class Derivation(Constraint):
         pass
 
     def apply(self, block: Block, backend_request: BackendRequest) -> None:
-        if self.is_complex(block):
-            self.__apply_derivation(block, backend_request)
-        else:
-            # If the index is beyond the grid variables, that means it's a derivation from a complex window.
-            # (This is brittle, but I haven't come up with a better way yet.)
-            self.__apply_derivation_with_complex_window(block, backend_request)
+        (derived_variables, dependent_variables) = self.window_variables(block)
+        trial_variables = dependent_variables.tolist()
+        derived = derived_variables.tolist()
+        bounds = list(accumulate([0] + [len(l) for l in self.dependent_idxs]))
 
-    def is_complex(self, block: Block):
-        return self.derived_idx < block.grid_variables()
+        def trial_iffs(t: int) -> List[Iff]:
+            variables = trial_variables[t]
+            or_clause = Or([And(variables[start:end]) for start, end in zip(bounds, bounds[1:])])
+            return [Iff(derived[t], or_clause)]
 
-    def __apply_derivation(self, block: Block, backend_request: BackendRequest) -> None:
-        trial_size = block.variables_per_trial()
-        cross_size = block.trials_per_sample()
+        backend_request.fresh = replicate_cnf_into(block.cnf_fn, trial_iffs, len(derived), backend_request.fresh,
+                                                   backend_request.cnfs)
 
-        iffs = []
-        for n in range(cross_size):
-            or_clause = Or(list(And(list(map(lambda x: x + (n * trial_size) + 1, l))) for l in self.dependent_idxs))
-            iffs.append(Iff(self.derived_idx + (n * trial_size) + 1, or_clause))
+    def is_complex(self, block: Block):
+        return self.derived_idx < block.grid_variables()
 
-        (cnf, new_fresh) = block.cnf_fn(And(iffs), backend_request.fresh)
+    def window_variables(self, block: Block) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the variable of the derived level for each window the
+        derivation applies to, along with a row for each window holding the
+        variables of :attr:`dependent_idxs`, flattened.
+        """
+        dependent_idxs = np.fromiter(chain.from_iterable(self.dependent_idxs), dtype=np.int64)
 
-        backend_request.cnfs.append(cnf)
-        backend_request.fresh = new_fresh
+        if self.is_complex(block):
+            # Every variable moves by a whole trial from one trial to the next.
+            offsets = np.arange(block.trials_per_sample(), dtype=np.int64) * block.variables_per_trial()
+            return (self.derived_idx + 1 + offsets, dependent_idxs + 1 + offsets[:, None])
 
-    def __apply_derivation_with_complex_window(self, block: Block, backend_request: BackendRequest) -> None:
+        # If the index is beyond the grid variables, that means it's a derivation from a complex window.
+        # (This is brittle, but I haven't come up with a better way yet.)
         trial_size = block.variables_per_trial()
-        trial_count = block.trials_per_sample()
-        iffs = []
+        grid_variables = block.grid_variables()
         f = self.factor
         window = f.levels[0].window
-        t = 0
-        for n in range(trial_count):
-            if not f.applies_to_trial(n + 1):
-                continue
-
-            num_levels = len(f.levels)
-            get_trial_size = lambda x: trial_size if x < block.grid_variables() else len(block.decode_variable(x+1)[0].levels)
-            or_clause = Or(list(And(list(map(lambda x: x + (t * window.stride * get_trial_size(x) + 1), l))) for l in self.dependent_idxs))
-            iffs.append(Iff(self.derived_idx + (t * num_levels) + 1, or_clause))
-            t += 1
-        (cnf, new_fresh) = block.cnf_fn(And(iffs), backend_request.fresh)
-
-        backend_request.cnfs.append(cnf)
-        backend_request.fresh = new_fresh
+        num_levels = len(f.levels)
+        applicable_trials = f.applicable_trial_count(block.trials_per_sample())
+
+        # Grid variables move by a whole trial from one window to the next,
+        # while the variables of complex factors move by the number of levels
+        # of their factor. The number of levels for every complex variable is
+        # laid out once, rather than decoding each variable for every trial.
+        complex_factors = filter(lambda cf: cf.has_complex_window, block.design)
+        complex_level_counts = np.concatenate([np.zeros(0, dtype=np.int64)] +
+                                              [np.full(block.variables_for_factor(cf), len(cf.levels), dtype=np.int64)
+                                               for cf in complex_factors])
+        trial_sizes = np.full(dependent_idxs.size, trial_size, dtype=np.int64)
+        complex_idxs = dependent_idxs >= grid_variables
+        trial_sizes[complex_idxs] = complex_level_counts[dependent_idxs[complex_idxs] - grid_variables]
+
+        # The derivation is only applied to the trials the factor applies to,
+        # with one row per window.
+        windows = np.arange(applicable_trials, dtype=np.int64)
+        return (self.derived_idx + 1 + windows * num_levels,
+                dependent_idxs + 1 + windows[:, None] * window.stride * trial_sizes)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -439,7 +466,7 @@ class AtMostKInARow(_KInARow):
         sublists = self._build_variable_sublists(block, level, self.k + 1)
 
         # Build the requests
-        backend_request.ll_requests += list(map(lambda l: LowLevelRequest("LT", self.k + 1, l), sublists))
+        backend_request.ll_requests.add_many("LT", self.k + 1, sublists)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -497,10 +524,8 @@ class AtLeastKInARow(_KInARow):
             # Ending corner case
             implications.append(If(sublists[-1][-1], And(sublists[-1][1:-1])))
 
-        (cnf, new_fresh) = block.cnf_fn(And(implications), backend_request.fresh)
-
-        backend_request.cnfs.append(cnf)
-        backend_request.fresh = new_fresh
+        backend_request.fresh = compile_cnf(block.cnf_fn, And(implications), backend_request.fresh,
+                                            backend_request.cnfs)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -526,7 +551,7 @@ class ExactlyK(_KInARow):
                                  backend_request: BackendRequest
                                  ) -> None:
         sublists = block.build_variable_list(level)
-        backend_request.ll_requests.append(LowLevelRequest("EQ", self.k, sublists))
+        backend_request.ll_requests.add("EQ", self.k, sublists)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -577,10 +602,8 @@ class ExactlyKInARow(_KInARow):
             for idx in range(len(tail) - 1):
                 implications.append(If(l[idx], l[idx + 1]))
 
-        (cnf, new_fresh) = block.cnf_fn(And(implications), backend_request.fresh)
-
-        backend_request.cnfs.append(cnf)
-        backend_request.fresh = new_fresh
+        backend_request.fresh = compile_cnf(block.cnf_fn, And(implications), backend_request.fresh,
+                                            backend_request.cnfs)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -614,8 +637,12 @@ class Exclude(Constraint):
         """Recursively deciphers the excluded level to a list of combinations
         basic levels."""
         excluded_levels = []
-        excluded: List[Tuple[Level, ...]] = [cross for cross in level.get_dependent_cross_product()
-                                             if level.window.predicate(*[level.name for level in cross])]
+        factor = cast(DerivedFactor, level.factor)
+        window_factors = level.window.factors
+        excluded: List[Tuple[Level, ...]] = [
+            tuple(window_factors[n].levels[i] for n, i in enumerate(indices))
+            for indices in factor.level_assignments(level).tolist()
+        ]
         for excluded_level_tuple in excluded:
             combos: List[Dict[Factor, SimpleLevel]] = [{}]
             for excluded_level in excluded_level_tuple:
@@ -645,7 +672,8 @@ class Exclude(Constraint):
 
     def apply(self, block: Block, backend_request: BackendRequest) -> None:
         var_list = block.build_variable_list((self.factor, self.level))
-        backend_request.cnfs.append(And(list(map(lambda n: n * -1, var_list))))
+        for n in var_list:
+            backend_request.cnfs.add_clause([-n])
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
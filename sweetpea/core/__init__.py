@@ -58,11 +58,12 @@ Classes
   * :class:`~sweetpea.core.generate.utility.AssertionType`
   * :class:`~sweetpea.core.generate.utility.GenerationRequest`
   * :class:`~sweetpea.core.generate.utility.Solution`
+  * :class:`~sweetpea.core.generate.solver_session.SolverSession`
 """
 
 from .cnf import Clause, CNF, Var
 from .generate import (
-    AssertionType, GenerationRequest, Solution,
+    AssertionType, GenerationRequest, Solution, SolverSession,
     cnf_is_satisfiable, sample_non_uniform, sample_non_uniform_from_specification, sample_uniform,
     combine_cnf_with_requests
 )
@@ -46,7 +46,7 @@ class Var:
         overhead or issue.
     """
 
-    def __init__(self, value: int):
+    def __init__(self, value: Union[int, Var]):
         self._val: int
         if isinstance(value, Var):
             self._val = value._val
@@ -489,7 +489,7 @@ class CNF(SimpleSequence[Clause]):
     ## CNF Assertions
     ##
 
-    def assert_k_of_n(self, k: int, in_list: Sequence[Var]):
+    def assert_k_of_n(self, k: int, in_list: Sequence[Union[int, Var]]):
         # TODO DOC
         # TODO: Describe this function's purpose.
         sum_bits = self.pop_count(in_list)
@@ -504,15 +504,15 @@ class CNF(SimpleSequence[Clause]):
         # Append the assertion to the formula.
         self.prepend(CNF([Clause(x) for x in assertion]))
 
-    def assert_k_less_than_n(self, k: int, in_list: Sequence[Var]):
+    def assert_k_less_than_n(self, k: int, in_list: Sequence[Union[int, Var]]):
         # TODO DOC
         self._inequality_assertion(True, k, in_list)
 
-    def assert_k_greater_than_n(self, k: int, in_list: Sequence[Var]):
+    def assert_k_greater_than_n(self, k: int, in_list: Sequence[Union[int, Var]]):
         # TODO DOC
         self._inequality_assertion(False, k, in_list)
 
-    def _inequality_assertion(self, assert_less_than: bool, k: int, in_list: Sequence[Var]):
+    def _inequality_assertion(self, assert_less_than: bool, k: int, in_list: Sequence[Union[int, Var]]):
         sum_bits = self.pop_count(in_list)
         in_binary = int_to_binary(k)
         k_vars = self.get_n_fresh(len(in_binary))
@@ -563,9 +563,10 @@ class CNF(SimpleSequence[Clause]):
     ## Pop Count
     ##
 
-    def pop_count(self, in_list: Sequence[Var]) -> List[Var]:
+    def pop_count(self, in_list: Sequence[Union[int, Var]]) -> List[Var]:
         """Returns the list of :class:`Vars <.Var>` that represents the bits of
-        the given list variable in binary.
+        the given list variable in binary. The list may also hold the
+        variables as :class:`ints <int>`.
         """
         if not in_list:
             raise ValueError("cannot take pop count of empty list")
@@ -579,7 +580,7 @@ class CNF(SimpleSequence[Clause]):
         aux_list = self.get_n_fresh((2 ** nearest_largest_power) - len(in_list))
         self.zero_out(aux_list)
         # Now we can start computing the actual pop count.
-        return self._pop_count_layer([[x] for x in chain(in_list, aux_list)])
+        return self._pop_count_layer([[Var(x)] for x in chain(in_list, aux_list)])
 
     def _pop_count_layer(self, bit_list: List[List[Var]]) -> List[Var]:
         if len(bit_list) == 1:
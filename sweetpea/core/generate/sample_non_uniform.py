@@ -18,7 +18,7 @@ from typing import List, Optional
 
 from ..cnf import CNF
 from .tools.cryptominisat import DEFAULT_DOCKER_MODE_ON, cryptominisat_solve
-from .utility import GenerationRequest, ProblemSpecification, Solution, combine_and_save_cnf, temporary_cnf_file
+from .utility import GenerationRequests, ProblemSpecification, Solution, combine_and_save_cnf, temporary_cnf_file
 
 
 __all__ = ['sample_non_uniform', 'sample_non_uniform_from_specification']
@@ -28,7 +28,7 @@ def sample_non_uniform(count: int,
                        initial_cnf: CNF,
                        fresh: int,
                        support: int,
-                       generation_requests: List[GenerationRequest]
+                       generation_requests: GenerationRequests
                        ) -> List[Solution]:
     """Samples solutions to a CNF problem non-uniformly. Produces ``count``
     solutions, each with a support set of length ``support``.
@@ -3,11 +3,11 @@
 """
 
 
-from typing import List
+from typing import List, Optional
 
-from ..cnf import CNF
+from ..cnf import CNF, Var
 from .tools.unigen import DEFAULT_DOCKER_MODE_ON, call_unigen
-from .utility import GenerationRequest, Solution, combine_and_save_cnf, temporary_cnf_file
+from .utility import GenerationRequests, Solution, combine_and_save_cnf, temporary_cnf_file
 
 
 __all__ = ['sample_uniform']
@@ -17,15 +17,25 @@ def sample_uniform(sample_count: int,
                     initial_cnf: CNF,
                    fresh: int,
                    support: int,
-                   generation_requests: List[GenerationRequest],
-                   use_docker: bool = DEFAULT_DOCKER_MODE_ON
+                   generation_requests: GenerationRequests,
+                   use_docker: bool = DEFAULT_DOCKER_MODE_ON,
+                   sampled_variables: Optional[List[Var]] = None,
+                   seed: Optional[int] = None
                    ) -> List[Solution]:
     """Samples solutions to a CNF problem uniformly. The solution is computed
     using Unigen.
+
+    By default, solutions are sampled over the first ``support`` variables.
+    If ``sampled_variables`` is given, they are sampled over those variables
+    instead, which must determine the values of the first ``support``
+    variables.
+
+    If ``seed`` is given, Unigen is seeded with it so that the same samples
+    are drawn each time.
     """
     with temporary_cnf_file() as cnf_file:
-        combine_and_save_cnf(cnf_file, initial_cnf, fresh, support, generation_requests)
-        solution_str = call_unigen(sample_count, cnf_file, docker_mode=use_docker)
+        combine_and_save_cnf(cnf_file, initial_cnf, fresh, support, generation_requests, sampled_variables)
+        solution_str = call_unigen(sample_count, cnf_file, docker_mode=use_docker, seed=seed)
         # TODO: Validate that skipping the comments is the intended
         #       functionality. The Haskell code doesn't appear to need to do
         #       this, but this could be due to the Unigen upgrade or something
@@ -0,0 +1,88 @@
+"""This module provides functionality to test whether a CNF formula is
+satisfiable many times over, each time under different assumptions.
+"""
+
+
+from typing import Any, Iterable, List, Optional, Union
+
+from ..cnf import CNF, Var
+from .tools.cryptominisat import cryptominisat_is_satisfiable
+from .utility import temporary_cnf_file
+
+
+__all__ = ['SolverSession']
+
+
+class SolverSession:
+    """Determines whether a CNF formula is satisfiable together with some unit
+    clauses. Units given to :meth:`commit` are kept for every later check,
+    while units given to :meth:`is_satisfiable` are only assumed for that one
+    check.
+
+    When CryptoMiniSAT's Python bindings are installed (the optional
+    ``pycryptosat`` package, available as the ``sweetpea[pycryptosat]``
+    extra), the formula is loaded once into an incremental solver, which
+    keeps what it learns from one check to the next. Otherwise, each check
+    runs the CryptoMiniSAT executable, but the formula is only rendered as
+    DIMACS once, when the session is created.
+    """
+
+    def __init__(self, cnf: CNF, use_bindings: Optional[bool] = None) -> None:
+        """Starts a session for the given formula. By default, the Python
+        bindings are used if they can be imported; ``use_bindings`` can be
+        given to force a choice.
+        """
+        self._committed: List[int] = []
+        self._solver: Any = None
+        if use_bindings is None or use_bindings:
+            try:
+                from pycryptosat import Solver
+            except ImportError:
+                if use_bindings:
+                    raise
+            else:
+                self._solver = Solver()
+                self._solver.add_clauses(cnf.as_list_of_list_of_ints())
+        if self._solver is None:
+            header, self._clauses = cnf.as_dimacs_string().split('\n\n', 1)
+            self._variable_count = int(header.split()[2])
+            self._clause_count = len(cnf)
+
+    @property
+    def committed(self) -> List[int]:
+        """The units that have been committed, in the order they were given."""
+        return list(self._committed)
+
+    def commit(self, units: Iterable[Union[int, Var]]) -> None:
+        """Permanently adds the given variables to the formula as unit
+        clauses.
+        """
+        new_units = [int(var) for var in units]
+        self._committed += new_units
+        if self._solver is not None:
+            self._solver.add_clauses([[unit] for unit in new_units])
+
+    def is_satisfiable(self, assumptions: Iterable[Union[int, Var]] = ()) -> bool:
+        """Determines whether the formula, with the committed units, is
+        satisfiable when the given variables are also assumed to be true.
+        """
+        if self._solver is not None:
+            satisfiable, _ = self._solver.solve([int(var) for var in assumptions])
+            return bool(satisfiable)
+        with temporary_cnf_file() as cnf_file:
+            cnf_file.write_text(self.as_dimacs_string(assumptions))
+            return bool(cryptominisat_is_satisfiable(cnf_file))
+
+    def as_dimacs_string(self, assumptions: Iterable[Union[int, Var]] = ()) -> str:
+        """Represents the formula, with the committed units and the given
+        assumptions as further units, as a string in the DIMACS format.
+
+        This is the input used when the session runs the CryptoMiniSAT
+        executable, so it is only available without the Python bindings.
+        """
+        if self._solver is not None:
+            raise RuntimeError("the formula is held by the incremental solver")
+        units = self._committed + [int(var) for var in assumptions]
+        variable_count = max([self._variable_count] + [abs(unit) for unit in units])
+        header = f"p cnf {variable_count} {self._clause_count + len(units)}\n\n"
+        return header + self._clauses + ''.join(f"{unit} 0\n" for unit in units)
@@ -10,6 +10,7 @@ Unigen for a few processes.
 from pathlib import Path
 from shlex import split as shell_split
 from subprocess import CompletedProcess, run
+from typing import Optional
 from numpy import random
 
 from .docker_utility import DEFAULT_DOCKER_MODE_ON, docker_run
@@ -37,9 +38,14 @@ def call_unigen_docker(input_file: Path, sample_count: int) -> CompletedProcess:
     return result
 
 
-def call_unigen_cli(input_file: Path, download_if_missing: bool, sample_count: int) -> CompletedProcess:
+def call_unigen_cli(input_file: Path,
+                    download_if_missing: bool,
+                    sample_count: int,
+                    seed: Optional[int] = None
+                    ) -> CompletedProcess:
     """Calls Unigen from the command line, reading a given file as the input
-    problem.
+    problem. Unigen is seeded with ``seed``, or with a seed drawn from
+    numpy's global random state if it is not given.
 
     If ``download_if_missing`` is ``True``, SweetPea will automatically
     download the Unigen executable (and other executables SweetPea depends on)
@@ -47,8 +53,9 @@ def call_unigen_cli(input_file: Path, download_if_missing: bool, sample_count: i
     <https://github.com/sweetpea-org/unigen-exe>`_.
     """
     ensure_executable_available(UNIGEN_EXE, download_if_missing)
-    seed = random.randint(999999999)
-    command = [str(UNIGEN_EXE), str(input_file), "--samples="+str(sample_count), "--seed="+str(999999999)]
+    if seed is None:
+        seed = int(random.randint(999999999))
+    command = [str(UNIGEN_EXE), str(input_file), "--samples="+str(sample_count), "--seed="+str(seed)]
     # NOTE: flake8 doesn't seem to handle the calls to `run` correctly, but
     #       mypy reports everything is fine here so we `noqa` to prevent flake8
     #       complaining about what it doesn't understand.
@@ -59,7 +66,8 @@ def call_unigen_cli(input_file: Path, download_if_missing: bool, sample_count: i
 def call_unigen(sample_count: int,
                 input_file: Path,
                 docker_mode: bool = DEFAULT_DOCKER_MODE_ON,
-                download_if_missing: bool = DEFAULT_DOWNLOAD_IF_MISSING
+                download_if_missing: bool = DEFAULT_DOWNLOAD_IF_MISSING,
+                seed: Optional[int] = None
                 ) -> str:
     """Calls Unigen with the given file as input.
 
@@ -69,11 +77,13 @@ def call_unigen(sample_count: int,
     If ``docker_mode`` is ``False`` and no local Unigen executable can be
     found, and if ``download_if_missing`` is ``True``, the needed executable
     will be automatically downloaded if it's missing.
+
+    The ``seed`` is only used by the command-line executable.
     """
     if docker_mode:
         result = call_unigen_docker(input_file, sample_count)
     else:
-        result = call_unigen_cli(input_file, download_if_missing, sample_count)
+        result = call_unigen_cli(input_file, download_if_missing, sample_count, seed)
     if result.returncode == 0:
         # Success!
         # (Comments in the earlier Haskell version of SweetPea's core indicate
@@ -8,14 +8,14 @@ from __future__ import annotations
 from contextlib import contextmanager
 from enum import Enum, auto
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
 from uuid import uuid4 as generate_uuid
 
 from ..cnf import CNF, Var
 
 
 __all__ = [
-    'AssertionType', 'GenerationRequest', 'SampleType', 'ProblemSpecification', 'Solution',
+    'AssertionType', 'GenerationRequest', 'GenerationRequestColumns', 'GenerationRequests', 'SampleType', 'ProblemSpecification', 'Solution',
     'combine_and_save_cnf', 'combine_cnf_with_requests', 'save_cnf', 'temporary_cnf_file'
 ]
 
@@ -70,6 +70,26 @@ class GenerationRequest(NamedTuple):
             boolean_values=[Var(v) for v in data['booleanValues']])
 
 
+class GenerationRequestColumns(NamedTuple):
+    """Many generation requests stored in columns, so that they can be
+    applied without creating a :class:`GenerationRequest` for each of them.
+    """
+    #: The assertion of each request, as an index into the members of
+    #: :class:`AssertionType` in declaration order.
+    assertion_types: Sequence[int]
+    #: The ``k`` of each request.
+    ks: Sequence[int]
+    #: The variables of request ``n`` are
+    #: ``boolean_values[offsets[n]:offsets[n + 1]]``.
+    offsets: Sequence[int]
+    #: The variables of all requests, one request after another.
+    boolean_values: Sequence[int]
+
+
+#: Generation requests, either one by one or in columns.
+GenerationRequests = Union[Iterable[GenerationRequest], GenerationRequestColumns]
+
+
 class SampleType(Enum):
     """The supported methods of interacting with SweetPea core."""
     #: Uniform sampling of a CNF formula.
@@ -131,11 +151,18 @@ class Solution(NamedTuple):
 def combine_cnf_with_requests(initial_cnf: CNF,
                               fresh: int,
                               support: int,  # FIXME: Remove.
-                              generation_requests: List[GenerationRequest]) -> CNF:
+                              generation_requests: GenerationRequests) -> CNF:
     """Combines a base :class:`CNF` with a new :class:`CNF` formed from the
-    given :class:`GenerationRequests <.GenerationRequest>`.
+    given :class:`GenerationRequests <.GenerationRequest>`, which may also be
+    given in columns as :class:`GenerationRequestColumns`.
     """
     fresh_cnf = CNF.from_fresh(fresh)
+    if isinstance(generation_requests, GenerationRequestColumns):
+        assertions = [fresh_cnf.assert_k_of_n, fresh_cnf.assert_k_less_than_n, fresh_cnf.assert_k_greater_than_n]
+        (codes, ks, offsets, variables) = generation_requests
+        for n, (code, k) in enumerate(zip(codes, ks)):
+            assertions[code](k, variables[offsets[n]:offsets[n + 1]])
+        return fresh_cnf + initial_cnf
     for request in generation_requests:
         if request.assertion_type is AssertionType.EQ:
             fresh_cnf.assert_k_of_n(request.k, request.boolean_values)
@@ -152,19 +179,27 @@ def combine_cnf_with_requests(initial_cnf: CNF,
 def save_cnf(filename: Path,
              cnf: CNF,
              fresh: Optional[int] = None,
-             support: Optional[int] = None):
-    """Writes a CNF formula to a file at the given path."""
-    filename.write_text(cnf.as_unigen_string(support_set_length=support))
+             support: Optional[int] = None,
+             sampled_variables: Optional[List[Var]] = None):
+    """Writes a CNF formula to a file at the given path. If
+    ``sampled_variables`` is given, it is used as the support set instead of
+    the first ``support`` variables.
+    """
+    if sampled_variables is not None:
+        filename.write_text(cnf.as_unigen_string(sampled_variables=sampled_variables))
+    else:
+        filename.write_text(cnf.as_unigen_string(support_set_length=support))
 
 
 def combine_and_save_cnf(filename: Path,
                          initial_cnf: CNF,
                          fresh: int,
                          support: int,
-                         generation_requests: List[GenerationRequest]):
+                         generation_requests: GenerationRequests,
+                         sampled_variables: Optional[List[Var]] = None):
     """Combines a base CNF formula with the augmentations specified by the
-    :class:`list` of :class:`GenerationRequests <.GenerationRequest>`, merges
+    :class:`GenerationRequests <.GenerationRequest>`, merges
     those formulas, then saves the result to a file at the given path.
     """
     combined_cnf = combine_cnf_with_requests(initial_cnf, fresh, support, generation_requests)
-    save_cnf(filename, combined_cnf, fresh, support)
+    save_cnf(filename, combined_cnf, fresh, support, sampled_variables)
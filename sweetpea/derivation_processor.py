@@ -1,16 +1,16 @@
 """This module provides functionality for processing derivations."""
 
 
-import operator as op
+from typing import Dict, List, Tuple, Union, cast
 
-from typing import Any, Dict, List, Tuple, cast
-from functools import reduce
+import numpy as np
 
 # TODO: Fix this Derivation name collision.
 from sweetpea.primitives import DerivationWindow, DerivedFactor, DerivedLevel, Level
 from sweetpea.blocks import Block
 from sweetpea.constraints import Derivation
 from sweetpea.internal import chunk_list
+from sweetpea.predicates import Predicate, is_enumerable, satisfying_assignments
 
 
 class DerivationProcessor:
@@ -56,32 +56,30 @@ class DerivationProcessor:
         accum = []
 
         for factor in derived_factors:
-            according_level: Dict[Tuple[Any, ...], DerivedLevel] = {}
-            for level in factor.levels:
-                cross_product: List[Tuple[Level, ...]] = level.get_dependent_cross_product()
-                valid_tuples: List[Tuple[Level, ...]] = []
-                for level_tuple in cross_product:
-                    names = [level.name for level in level_tuple]
-                    if level.window.width != 1:
-                        # NOTE: mypy doesn't like this, but I'm not rewriting
-                        #       it right now. Need to replace `chunk_list` with
-                        #       a better version.
-                        names = list(chunk_list(names, level.window.width))  # type: ignore
-                    result = level.window.predicate(*names)
-                    if not isinstance(result, bool):
-                        raise ValueError(f"Expected derivation predicate to return bool; got {type(result)}.")
-                    if level.window.predicate(*names):
-                        valid_tuples.append(level_tuple)
-                        if level_tuple in according_level:
-                            raise ValueError(f"Factor {factor.name} matches {according_level[level_tuple].name} and "
-                                             f"{level.name} with assignment {names}.")
-                        according_level[level_tuple] = level
-
-                if not valid_tuples:
+            window = factor.first_level.window
+            if all(is_enumerable(level.window.predicate) for level in factor.levels):
+                # Structured predicates can be enumerated directly, without
+                # going through the cross product of the window's levels.
+                level_assignments = [np.array(assignments, dtype=np.int64).reshape(-1, len(window.factors))
+                                     for assignments in DerivationProcessor.__enumerate_structured_derivations(factor)]
+            else:
+                # Otherwise, the predicates are evaluated once per factor, in
+                # the factor's truth table, which also rejects ambiguous
+                # derivations.
+                table = factor.derivation_table()
+                level_assignments = [np.argwhere(table == n) for n in range(len(factor.levels))]
+
+            # The variable of each level of each factor in the window, so that
+            # the level indices found above can be mapped to variables at once.
+            level_variables = [np.array([block.first_variable_for_level(f, l) for l in f.levels], dtype=np.int64)
+                               for f in window.factors]
+            for level, assignments in zip(factor.levels, level_assignments):
+                if not len(assignments):
                     print(f"WARNING: There is no assignment that matches factor {factor.name} with level {level.name}.")
 
-                valid_indices = [[block.first_variable_for_level(level.factor, level) for level in valid_tuple]
-                                 for valid_tuple in valid_tuples]
+                valid_indices = np.empty(assignments.shape, dtype=np.int64)
+                for n, variables in enumerate(level_variables):
+                    valid_indices[:, n] = variables[assignments[:, n]]
                 shifted_indices = DerivationProcessor.shift_window(valid_indices,
                                                                    level.window,
                                                                    block.variables_per_trial())
@@ -89,6 +87,25 @@ class DerivationProcessor:
                 accum.append(Derivation(level_index, shifted_indices, factor))
         return accum
 
+    @staticmethod
+    def __enumerate_structured_derivations(factor: DerivedFactor) -> List[List[Tuple[int, ...]]]:
+        """Enumerates the level indices satisfying each level's structured
+        predicate, rejecting derivations where more than one level matches.
+        """
+        window = factor.first_level.window
+        according_level: Dict[Tuple[int, ...], DerivedLevel] = {}
+        level_assignments = []
+        for level in factor.levels:
+            assignments = satisfying_assignments(cast(Predicate, level.window.predicate), window.factors, window.width)
+            for indices in assignments:
+                if indices in according_level:
+                    names = [window.factors[n].levels[i].name for n, i in enumerate(indices)]
+                    raise ValueError(f"Factor {factor.name} matches {according_level[indices].name} and "
+                                     f"{level.name} with assignment {names}.")
+                according_level[indices] = level
+            level_assignments.append(assignments)
+        return level_assignments
+
     @staticmethod
     def generate_argument_list(level: DerivedLevel, tup: Tuple[Level, ...]) -> List:
         # User-supplied string level names are the arguments for the user-supplied derivation functions
@@ -100,7 +117,7 @@ class DerivationProcessor:
             return list(chunk_list(level_strings, level.window.width))
 
     @staticmethod
-    def shift_window(indices: List[List[int]],
+    def shift_window(indices: Union[List[List[int]], np.ndarray],
                      window: DerivationWindow,
                      trial_size: int
                      ) -> List[List[int]]:
@@ -117,26 +134,13 @@ class DerivationProcessor:
         interpreted as being in a subsequent trial.
         """
         if window.width == 1:
-            return indices
-
-        # shifted_indices: List[List[int]] = []
-        # shifted_sublists: List[List[int]] = []
-
-        # factor_count = len(window.factors)
-
-        # for index_list in indices:
-        #     sublist_size = len(index_list) // factor_count
-        #     sublists = chunk_list(index_list, sublist_size)
-        #     shifted_sublists =
-
-        shifted_idxs = cast(List[List[int]], [])
-        shifted_sublists = cast(List[List[int]], [])
-        argc = window.initial_factor_count
-        for idx_list in indices:
-            sublist_size = len(idx_list) // argc
-            sublists = chunk_list(idx_list, sublist_size)
-            shifted_sublists = [reduce(lambda l, idx: l + [idx + len(l) * trial_size], idx_list, [])
-                                for idx_list in sublists]
-            shifted_idxs.append(list(reduce(op.add, shifted_sublists, [])))
-
-        return shifted_idxs
+            return indices.tolist() if isinstance(indices, np.ndarray) else indices
+
+        # Each index is shifted by its position within its factor's group of
+        # indices, times the trial size.
+        idxs = np.asarray(indices, dtype=np.int64)
+        if idxs.size == 0:
+            return [list(idx_list) for idx_list in indices]
+        sublist_size = idxs.shape[1] // window.initial_factor_count
+        shifts = (np.arange(idxs.shape[1]) % sublist_size) * trial_size
+        return (idxs + shifts).tolist()
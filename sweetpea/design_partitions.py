@@ -3,7 +3,11 @@ factors.
 """
 
 
+from functools import reduce
+from typing import List
+
 from sweetpea.blocks import Block
+from sweetpea.primitives import Factor
 
 
 class DesignPartitions():
@@ -16,13 +20,32 @@ class DesignPartitions():
         self._block = block
 
     def get_crossed_factors(self):
-        return self._block.crossing[0]
+        # With multiple crossings, the first of the largest crossings determines the trials.
+        return max(self._block.crossing, key=self.crossing_size)
+
+    def get_secondary_crossings(self) -> List[List[Factor]]:
+        """Returns the crossings that are not implied by crossing the crossed
+        factors: those with factors outside of the crossed factors, leaving
+        out crossings that are nested in (or equal to) another such crossing.
+        """
+        crossed = self.get_crossed_factors()
+        candidates = [c for c in self._block.crossing if not set(c) <= set(crossed)]
+        secondary = []
+        for i, c in enumerate(candidates):
+            if any(set(c) < set(other) or (set(c) == set(other) and j < i) for j, other in enumerate(candidates)):
+                continue
+            secondary.append(c)
+        return secondary
+
+    @staticmethod
+    def crossing_size(crossing: List[Factor]) -> int:
+        return reduce(lambda size, factor: size * len(factor.levels), crossing, 1)
 
     def get_crossed_factors_derived(self):
         return list(filter(lambda f: f.is_derived(), self.get_crossed_factors()))
 
     def get_uncrossed_factors(self):
-        return list(filter(lambda f: f not in self._block.crossing[0], self._block.design))
+        return list(filter(lambda f: all(f not in c for c in self._block.crossing), self._block.design))
 
     def get_source_factors(self):
         # Source factors are depended on by at least one derived factor in the crossed factors.
@@ -81,18 +81,16 @@ def __generate_encoding_diagram(blk: Block) -> str:
     diagram_str += ('-' * row_width) + '\n'
 
     # Variables
+    applicable_trials = [f.applicable_trials(num_trials) for f in blk.design]
     for t in range(num_trials):
         args = [str(t + 1)]
-        for f in blk.design:
-            if f.applies_to_trial(t + 1):
+        for f, applicable in zip(blk.design, applicable_trials):
+            if applicable[t]:
                 variables = [blk.first_variable_for_level(f, l) + 1 for l in f.levels]
                 if isinstance(f, DerivedFactor) and f.has_complex_window:
-                    def acc_width(w) -> int:
-                        return w.width + (acc_width(w.args[0].levels[0].window)-1 if w.args[0].has_complex_window else 0)
-                    width = acc_width(f.levels[0].window)
-                    stride = f.levels[0].window.stride
-                    stride_offset = (stride - 1) * int(t / stride)
-                    offset = t - width + 1 - stride_offset
+                    # Complex factors only have variables for the trials they
+                    # apply to, so they are offset by the earlier such trials.
+                    offset = f.applicable_trial_count(t)
                     variables = list(map(lambda n: n + len(variables) * offset, variables))
                 else:
                     variables = list(map(lambda n: n + design_size * t, variables))
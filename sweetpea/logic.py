@@ -1,10 +1,12 @@
 """This module provides functionality for handling logic formulas."""
 
 
+from array import array
 from collections import namedtuple
-from functools import reduce
 from itertools import product
-from typing import Any, Dict, List, Tuple, Union, cast
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, cast
+
+import numpy as np
 
 
 And = namedtuple('And', 'input_list')
@@ -18,6 +20,85 @@ FormulaWithIff = Union[And, Or, If, Iff, Not, int]
 FormulaAndFresh = Tuple[Formula, int]
 
 
+class ClauseSink:
+    """A buffer of CNF clauses, each a list of nonzero integer literals where
+    negative literals are negated variables. The literals of all the clauses
+    are stored in one flat array.
+
+    Constraints compile their formulas straight into a sink with
+    :func:`compile_cnf` and :func:`replicate_cnf_into`, so that Tseitin
+    clauses are written out as they are produced rather than being built as
+    :class:`Or` tuples first. A sink can also be used like the list of
+    :class:`And` formulas it replaces: formulas can be appended to it, and it
+    compares equal to a list of formulas with the same clauses.
+    """
+
+    def __init__(self, formulas: Iterable[And] = ()) -> None:
+        self.__literals = array('q')
+        self.__ends = array('q')
+        self.extend(formulas)
+
+    def add_clause(self, literals: Iterable[int]) -> None:
+        """Adds a single clause."""
+        self.__literals.extend(literals)
+        self.__ends.append(len(self.__literals))
+
+    def add_clauses(self, literals: np.ndarray, lengths: np.ndarray) -> None:
+        """Adds many clauses at once, given the literals of all of them one
+        after another and the number of literals in each.
+        """
+        start = len(self.__literals)
+        self.__literals.frombytes(np.ascontiguousarray(literals, dtype=np.int64).tobytes())
+        self.__ends.frombytes((start + np.cumsum(lengths, dtype=np.int64)).tobytes())
+
+    def append(self, formula: And) -> None:
+        """Adds the clauses of a formula in CNF, as produced by a CNF
+        conversion function.
+        """
+        for clause in cnf_to_json([formula]):
+            self.add_clause(clause)
+
+    def extend(self, formulas: Iterable[And]) -> None:
+        if isinstance(formulas, ClauseSink):
+            start = len(self.__literals)
+            self.__literals.extend(formulas.__literals)
+            self.__ends.extend(end + start for end in formulas.__ends)
+        else:
+            for formula in formulas:
+                self.append(formula)
+
+    def __iadd__(self, formulas: Iterable[And]) -> 'ClauseSink':
+        self.extend(formulas)
+        return self
+
+    def clauses(self) -> List[List[int]]:
+        """Returns the clauses as lists of literals, in the format produced by
+        :func:`cnf_to_json`.
+        """
+        literals = self.__literals.tolist()
+        starts = [0] + self.__ends.tolist()
+        return [literals[start:end] for start, end in zip(starts, starts[1:])]
+
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self.clauses())
+
+    def __len__(self) -> int:
+        return len(self.__ends)
+
+    def __eq__(self, other):
+        if isinstance(other, ClauseSink):
+            return self.__literals == other.__literals and self.__ends == other.__ends
+        if isinstance(other, list):
+            return self.clauses() == cnf_to_json(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return str(self.clauses())
+
+    def __str__(self):
+        return str(self.clauses())
+
+
 # Simple Cache class used by the Tseitin transformation. Maintains the next fresh variable as
 # state, along with the cached values.
 class _Cache:
@@ -37,6 +118,33 @@ class _Cache:
         return self.next_variable
 
 
+# The polarities a subformula can occur with. A subformula occurs positively
+# if it is under an even number of negations, and negatively if it is under an
+# odd number. (The premise of an implication counts as negated, and both sides
+# of an equivalence occur with both polarities.)
+_POSITIVE = 1
+_NEGATIVE = 2
+_BOTH = _POSITIVE | _NEGATIVE
+_FLIPPED = (0, _NEGATIVE, _POSITIVE, _BOTH)
+
+
+# Cache used by the Plaisted-Greenbaum transformation. In addition to the
+# representatives, it records the polarities whose clauses have been added for
+# each of them.
+class _PolarityCache(_Cache):
+    def __init__(self, next_variable: int) -> None:
+        super().__init__(next_variable)
+        self.polarities = cast(Dict[int, int], {})
+
+    def missing_polarities(self, rep: int, polarity: int) -> int:
+        """Returns which of the given polarities have not been encoded yet for
+        a representative, and records them as encoded.
+        """
+        encoded = self.polarities.get(rep, 0)
+        self.polarities[rep] = encoded | polarity
+        return polarity & ~encoded
+
+
 def to_cnf_naive(f: FormulaWithIff, next_variable: int) -> Tuple[And, int]:
     """Converts to CNF using the pattern described on
     https://en.wikipedia.org/wiki/Conjunctive_normal_form#Converting_from_first-order_logic.
@@ -85,6 +193,176 @@ def to_cnf_tseitin(f: FormulaWithIff, next_variable: int) -> Tuple[And, int]:
     return (And(clauses), cache.get_next_variable())
 
 
+def to_cnf_plaisted_greenbaum(f: FormulaWithIff, next_variable: int) -> Tuple[And, int]:
+    """Converts to CNF using the Plaisted-Greenbaum transformation. Like the
+    Tseitin transformation, this introduces a variable for each subformula,
+    but it only encodes the implications that are needed for the polarity the
+    subformula occurs with: a subformula that only occurs positively only
+    needs its variable to imply it, and not the other way around. Negations
+    are represented by negating the literal of their subformula rather than
+    by a variable of their own, and the conjuncts, disjunctions, implications
+    and equivalences at the top of the formula are encoded as clauses
+    directly.
+
+    The resulting formula is usually much smaller than the one produced by
+    :func:`to_cnf_tseitin`. It is satisfied by exactly the same assignments of
+    the formula's own variables, but the introduced variables are no longer
+    determined by them, so models should only be counted or sampled over the
+    formula's variables, as SweetPea does with its support set. See
+    https://doi.org/10.1016/S0747-7171(86)80028-1.
+    """
+    clauses = cast(List[Formula], [])
+    cache = _PolarityCache(next_variable)
+
+    __plaisted_greenbaum_assert(f, clauses, cache)
+
+    return (And(clauses), cache.get_next_variable())
+
+
+def compile_cnf(cnf_fn: Callable[[FormulaWithIff, int], Tuple[And, int]],
+                f: FormulaWithIff,
+                next_variable: int,
+                sink: ClauseSink) -> int:
+    """Converts a formula to CNF with ``cnf_fn`` and adds the clauses to the
+    given :class:`ClauseSink`, returning the next fresh variable. The Tseitin
+    and Plaisted-Greenbaum transformations write their clauses straight into
+    the sink.
+    """
+    if cnf_fn is to_cnf_tseitin:
+        cache = _Cache(next_variable)
+        sink.add_clause([__tseitin_rep(f, sink, cache)])
+        return cache.get_next_variable()
+
+    if cnf_fn is to_cnf_plaisted_greenbaum:
+        polarity_cache = _PolarityCache(next_variable)
+        __plaisted_greenbaum_assert(f, sink, polarity_cache)
+        return polarity_cache.get_next_variable()
+
+    (formula, next_variable) = cnf_fn(f, next_variable)
+    sink.append(formula)
+    return next_variable
+
+
+def replicate_cnf(cnf_fn: Callable[[FormulaWithIff, int], Tuple[And, int]],
+                  conjuncts_for_copy: Callable[[int], Sequence[FormulaWithIff]],
+                  copies: int,
+                  next_variable: int) -> Tuple[And, int]:
+    """Converts the conjunction of ``copies`` copies of a formula to CNF,
+    where ``conjuncts_for_copy(k)`` returns the conjuncts of the ``k``th copy.
+    Every copy must be the first one with each variable shifted by a fixed
+    stride per copy, as is the case when the same formula is applied to every
+    trial of a sequence.
+
+    When ``cnf_fn`` is :func:`to_cnf_tseitin` or
+    :func:`to_cnf_plaisted_greenbaum`, only the first copy is encoded. Its
+    clauses are then used as a template and replicated across the other
+    copies by adding the variable strides (and a stride of fresh variables for
+    the variables the transformation introduced), which gives exactly the same
+    result as ``cnf_fn(And(<all conjuncts>), next_variable)``. Any other
+    ``cnf_fn``, or copies that do not have the expected shape, fall back to
+    converting the whole conjunction. The strides are found by comparing the
+    first two copies, and only the last copy is checked against them.
+    """
+    if cnf_fn not in _TEMPLATE_CNF_FNS or copies < 2:
+        return cnf_fn(And([c for k in range(copies) for c in conjuncts_for_copy(k)]), next_variable)
+
+    sink = ClauseSink()
+    next_variable = replicate_cnf_into(cnf_fn, conjuncts_for_copy, copies, next_variable, sink)
+    clauses = sink.clauses()
+    formulas = cast(List[Formula], [__clause_formula(clause) for clause in clauses])
+    if cnf_fn is to_cnf_tseitin:
+        # The last clause is the unit clause of the top-level representative.
+        formulas[-1] = clauses[-1][0]
+    return (And(formulas), next_variable)
+
+
+def replicate_cnf_into(cnf_fn: Callable[[FormulaWithIff, int], Tuple[And, int]],
+                       conjuncts_for_copy: Callable[[int], Sequence[FormulaWithIff]],
+                       copies: int,
+                       next_variable: int,
+                       sink: ClauseSink) -> int:
+    """Does the same as :func:`replicate_cnf`, but adds the clauses to the
+    given :class:`ClauseSink` and only returns the next fresh variable.
+    """
+    def convert_all() -> int:
+        conjuncts = [c for k in range(copies) for c in conjuncts_for_copy(k)]
+        return compile_cnf(cnf_fn, And(conjuncts), next_variable, sink)
+
+    if cnf_fn not in _TEMPLATE_CNF_FNS or copies < 2:
+        return convert_all()
+
+    first = conjuncts_for_copy(0)
+    strides = __variable_strides(first, conjuncts_for_copy(1))
+    if not strides:
+        return convert_all()
+
+    # The strides are taken from the first two copies, so check that the last
+    # copy is as far from the first as they imply.
+    if copies > 2:
+        last_strides = __variable_strides(first, conjuncts_for_copy(copies - 1))
+        if last_strides != {v: stride * (copies - 1) for (v, stride) in strides.items()}:
+            return convert_all()
+
+    # Copies can only be encoded independently if no subformula of one copy
+    # can be found in the Tseitin cache of another, which is guaranteed when
+    # the variables of all of the copies are distinct.
+    offsets = np.arange(copies, dtype=np.int64)[:, None]
+    variables = np.fromiter(strides.keys(), dtype=np.int64, count=len(strides))
+    steps = np.fromiter(strides.values(), dtype=np.int64, count=len(strides))
+    all_variables = variables + offsets * steps
+    if (steps == 0).any() \
+            or all_variables.min() < 1 \
+            or all_variables.max() >= next_variable \
+            or np.unique(all_variables).size != all_variables.size:
+        return convert_all()
+
+    # Encode the first copy to build the template.
+    template = ClauseSink()
+    if cnf_fn is to_cnf_tseitin:
+        cache = _Cache(next_variable)
+        template_reps = cast(List[int], [__tseitin_rep(c, template, cache) for c in first])
+    else:
+        # The conjuncts are asserted one by one, so there is nothing to tie
+        # the copies together with.
+        polarity_cache = _PolarityCache(next_variable)
+        __plaisted_greenbaum_assert(And(list(first)), template, polarity_cache)
+        cache = polarity_cache
+        template_reps = []
+    fresh_per_copy = cache.get_next_variable() - next_variable
+
+    def step_for(literal: int) -> int:
+        return fresh_per_copy if abs(literal) >= next_variable else strides[abs(literal)]
+
+    template_clauses = template.clauses()
+    template_literals = [l for c in template_clauses for l in c]
+    literals = np.array(template_literals, dtype=np.int64)
+    literal_steps = np.fromiter(map(step_for, template_literals), dtype=np.int64, count=len(template_literals))
+    replicated = np.sign(literals) * (np.abs(literals) + offsets * literal_steps)
+    lengths = np.tile(np.array([len(c) for c in template_clauses], dtype=np.int64), copies)
+    sink.add_clauses(replicated.ravel(), lengths)
+
+    if not template_reps:
+        return next_variable + copies * fresh_per_copy
+
+    reps = np.array(template_reps, dtype=np.int64)
+    rep_steps = np.fromiter(map(step_for, template_reps), dtype=np.int64, count=len(template_reps))
+    all_reps = (reps + offsets * rep_steps).ravel().tolist()
+
+    # Finally, tie the copies together the same way the Tseitin
+    # transformation of the whole conjunction would.
+    top = next_variable + copies * fresh_per_copy
+    sink.add_clause([-r for r in all_reps] + [top])
+    for r in all_reps:
+        sink.add_clause([r, -top])
+    sink.add_clause([top])
+
+    return top + 1
+
+
+# The conversions whose clauses replicate_cnf can build from a template.
+_TEMPLATE_CNF_FNS = (to_cnf_tseitin, to_cnf_plaisted_greenbaum)
+
+
 def cnf_to_json(formula: List[And]) -> List[List[int]]:
     or_list = []
     for a in formula:
@@ -106,84 +384,194 @@ def cnf_to_json(formula: List[And]) -> List[List[int]]:
     return or_list
 
 
+def __variable_strides(first: Sequence[FormulaWithIff], second: Sequence[FormulaWithIff]) -> Dict[int, int]:
+    """Matches two formulas with the same structure against each other and
+    returns the offset between the corresponding variables of each. Returns an
+    empty dictionary if the formulas do not have the same structure, or if a
+    variable of the first one is not consistently mapped to the same variable
+    of the second one.
+    """
+    strides = cast(Dict[int, int], {})
+    pending = [(cast(Any, first), cast(Any, second))]
+    while pending:
+        (f, g) = pending.pop()
+        if isinstance(f, int) and isinstance(g, int):
+            if f <= 0 or g <= 0 or strides.setdefault(f, g - f) != g - f:
+                return {}
+        elif isinstance(f, list) and isinstance(g, list) and len(f) == len(g):
+            pending.extend(zip(f, g))
+        elif isinstance(f, (And, Or, If, Iff, Not)) and type(f) == type(g):
+            pending.extend(zip(f, g))
+        else:
+            return {}
+    return strides
+
+
+def __subformulas(f: FormulaWithIff) -> Sequence[FormulaWithIff]:
+    """Returns the immediate subformulas of a formula, in order."""
+    if isinstance(f, (And, Or)):
+        return f.input_list
+    elif isinstance(f, (If, Iff)):
+        return (f.p, f.q)
+    elif isinstance(f, Not):
+        return (f.c,)
+    else:
+        return ()
+
+
+# The transformations below walk formulas with explicit stacks rather than
+# recursion, so that deeply nested formulas neither hit the recursion limit
+# nor pay for a Python frame per node. Each entry of a stack holds a formula,
+# an iterator over its subformulas that have yet to be transformed, and the
+# transformed subformulas collected so far. Leaves are handled in place
+# without an entry of their own.
+
+def __transform(f: Any,
+                leaves: Union[type, Tuple[type, ...]],
+                rewrite: Callable[[Any], Any],
+                combine: Callable[[Any, List[Any]], Any]) -> Any:
+    """Transforms a formula bottom up. Each formula that is not an instance
+    of ``leaves`` is first replaced with ``rewrite`` until that returns it
+    unchanged, then its subformulas are transformed, and finally ``combine``
+    builds the result from the formula and its transformed subformulas.
+    """
+    result = cast(List[Any], [])
+    stack = [(None, iter((f,)), result)]
+    while stack:
+        (g, rest, parts) = stack[-1]
+        for c in rest:
+            if isinstance(c, leaves):
+                parts.append(c)
+                continue
+            r = rewrite(c)
+            while r is not c:
+                c = r
+                if isinstance(c, leaves):
+                    break
+                r = rewrite(c)
+            if isinstance(c, leaves):
+                parts.append(c)
+            else:
+                stack.append((c, iter(__subformulas(c)), []))
+                break
+        else:
+            stack.pop()
+            if stack:
+                stack[-1][2].append(combine(g, parts))
+    return result[0]
+
+
 def __eliminate_iff(f: FormulaWithIff) -> Formula:
-    if isinstance(f, And):
-        return And(list(map(__eliminate_iff, f.input_list)))
-    elif isinstance(f, Or):
-        return Or(list(map(__eliminate_iff, f.input_list)))
-    elif isinstance(f, If):
-        return __eliminate_iff(Or([Not(f.p), f.q]))
+    return __transform(f, int, __eliminate_iff_rewrite, __eliminate_iff_combine)
+
+
+def __eliminate_iff_rewrite(f: FormulaWithIff) -> FormulaWithIff:
+    if isinstance(f, If):
+        return Or([Not(f.p), f.q])
     elif isinstance(f, Iff):
-        new_formula = And([
+        return And([
             Or([f.p, Not(f.q)]),
             Or([Not(f.p), f.q])
         ])
-        return __eliminate_iff(new_formula)
-    elif isinstance(f, Not):
-        return Not(__eliminate_iff(f.c))
-    elif isinstance(f, int):
+    else:
         return f
 
 
-def __apply_demorgan(f: Formula) -> Formula:
+def __eliminate_iff_combine(f: FormulaWithIff, parts: List[Formula]) -> Formula:
     if isinstance(f, And):
-        return __build_and(list(map(__apply_demorgan, f.input_list)))
+        return And(parts)
     elif isinstance(f, Or):
-        return __build_or(list(map(__apply_demorgan, f.input_list)))
-    elif isinstance(f, Not):
+        return Or(parts)
+    else:
+        return Not(parts[0])
+
+
+def __apply_demorgan(f: Formula) -> Formula:
+    return __transform(f, int, __apply_demorgan_rewrite, __apply_demorgan_combine)
+
+
+def __apply_demorgan_rewrite(f: Formula) -> Formula:
+    if isinstance(f, Not):
         clause = cast(Formula, f.c)
         if isinstance(clause, And):
-            return __apply_demorgan(__build_or(list(map(lambda c: Not(c), clause.input_list))))
+            return __build_or(list(map(lambda c: Not(c), clause.input_list)))
         elif isinstance(clause, Or):
-            return __apply_demorgan(__build_and(list(map(lambda c: Not(c), clause.input_list))))
+            return __build_and(list(map(lambda c: Not(c), clause.input_list)))
         elif isinstance(clause, Not):
-            return __apply_demorgan(clause.c)
-        elif isinstance(clause, int):
-            return f
-    elif isinstance(f, int):
+            return clause.c
+    return f
+
+
+def __apply_demorgan_combine(f: Formula, parts: List[Formula]) -> Formula:
+    if isinstance(f, And):
+        return __build_and(parts)
+    elif isinstance(f, Or):
+        return __build_or(parts)
+    else:
+        # Only negated variables are left.
         return f
 
 
 def __distribute_ors_naive(f: Formula) -> Formula:
+    return __transform(f, (int, Not), lambda g: g, __distribute_ors_naive_combine)
+
+
+def __distribute_ors_naive_combine(f: Formula, clauses: List[Formula]) -> Formula:
     if isinstance(f, And):
-        return __build_and(list(map(__distribute_ors_naive, f.input_list)))
-    elif isinstance(f, Or):
-        clauses = list(map(__distribute_ors_naive, f.input_list))
+        return __build_and(clauses)
+    else:
         crossable_clauses = list(map(__get_list_for_crossing, clauses))
         crossed_clauses = list(product(*crossable_clauses))
         or_list = list(map(__build_or, crossed_clauses))
         return __build_and(cast(List[Formula], or_list))
-    elif isinstance(f, Not) or isinstance(f, int):
-        return f
 
 
 def __distribute_ors_switching(f: Formula, fresh: int) -> FormulaAndFresh:
-    if isinstance(f, And):
-        (clauses, new_fresh) = reduce(__apply_distribute_ors,
-                                      f.input_list,
-                                      (cast(List[Formula], []), fresh))
-        return (__build_and(clauses), new_fresh)
-    elif isinstance(f, Or):
-        (clauses, new_fresh) = reduce(__apply_distribute_ors,
-                                      f.input_list,
-                                      (cast(List[Formula], []), fresh))
-        clauses.sort(key=__order_clauses)
-        if len(clauses) > 1:
-            if __should_not_combine(clauses):
-                return (f, fresh)
-            elif __should_combine_naively(clauses):
-                return __distribute_ors_switching(__naive_combination(clauses), new_fresh)
-            else:
-                (new_formula, new_fresh) = __switching_combination(clauses, new_fresh)
-                return __distribute_ors_switching(new_formula, new_fresh)
-        else:
-            return (clauses[0], new_fresh)
-    elif isinstance(f, Not):
+    if isinstance(f, Not):
         assert isinstance(f.c, int)
         return (f, fresh)
     elif isinstance(f, int):
         return (f, fresh)
 
+    # Each entry also holds the next fresh variable from when its formula
+    # was reached, because an Or that does not need to be distributed is kept
+    # as it is, along with that variable.
+    result = cast(List[Formula], [])
+    stack = [(cast(Formula, And([f])), iter([f]), result, fresh)]
+    while True:
+        (g, rest, clauses, entry_fresh) = stack[-1]
+        for c in rest:
+            if isinstance(c, Not):
+                assert isinstance(c.c, int)
+                clauses.append(c)
+            elif isinstance(c, int):
+                clauses.append(c)
+            else:
+                stack.append((c, iter(c.input_list), [], fresh))
+                break
+        else:
+            stack.pop()
+            if not stack:
+                return (result[0], fresh)
+            elif isinstance(g, And):
+                stack[-1][2].append(__build_and(clauses))
+                continue
+
+            clauses.sort(key=__order_clauses)
+            if len(clauses) > 1:
+                if __should_not_combine(clauses):
+                    stack[-1][2].append(g)
+                    fresh = entry_fresh
+                    continue
+                elif __should_combine_naively(clauses):
+                    new_formula = __naive_combination(clauses)
+                else:
+                    (new_formula, fresh) = __switching_combination(clauses, fresh)
+                # Distribute the combination again, in place of the Or.
+                stack.append((new_formula, iter(cast(Any, new_formula).input_list), [], fresh))
+            else:
+                stack[-1][2].append(clauses[0])
+
 
 def __flatten_clause_list(clauses: List[Formula], cls: Any) -> List[Formula]:
     flattened_list = cast(List[Formula], [])
@@ -204,14 +592,6 @@ def __build_and(l: List[Formula]) -> And:
     return And(__flatten_clause_list(l, And))
 
 
-def __apply_distribute_ors(acc: Tuple[List[Formula], int], elem: Formula) -> Tuple[List[Formula], int]:
-    fs = acc[0]
-    fresh = acc[1]
-    (f, new_fresh) = __distribute_ors_switching(elem, fresh)
-    fs.append(f)
-    return (fs, new_fresh)
-
-
 def __should_not_combine(clauses: List[Formula]) -> bool:
     return not any(isinstance(c, And) for c in clauses)
 
@@ -262,62 +642,97 @@ def __order_clauses(c: Formula) -> int:
         return c
 
 
+def __clause_formula(literals: List[int]) -> Or:
+    return Or(cast(List[Formula], [l if l > 0 else Not(-l) for l in literals]))
+
+
+def __emit_clause(clauses: Union[List[Formula], ClauseSink], literals: List[int]) -> None:
+    """Adds a clause produced by the Tseitin transformation, either straight
+    into a :class:`ClauseSink` or as an :class:`Or` to a list of formulas.
+    """
+    if isinstance(clauses, ClauseSink):
+        clauses.add_clause(literals)
+    else:
+        clauses.append(__clause_formula(literals))
+
+
 def __tseitin_rep(f: FormulaWithIff,
-                  clauses: List[Formula],
-                  cache: _Cache) -> Formula:
-    if isinstance(f, And):
-        # Replace any subformulae
-        new_vars = list(map(lambda c: __tseitin_rep(c, clauses, cache), f.input_list))
+                  clauses: Union[List[Formula], ClauseSink],
+                  cache: _Cache) -> int:
+    if isinstance(f, int):
+        return f
 
+    # The subformulas are replaced by their representatives from left to
+    # right, depth first, so the representatives are allocated in the same
+    # order as a recursive traversal would.
+    stack = [(f, iter(__subformulas(f)), cast(List[int], []))]
+    while True:
+        (g, rest, new_vars) = stack[-1]
+        for c in rest:
+            if isinstance(c, int):
+                new_vars.append(c)
+            else:
+                stack.append((c, iter(__subformulas(c)), []))
+                break
+        else:
+            stack.pop()
+            new_rep = __tseitin_node(g, new_vars, clauses, cache)
+            if not stack:
+                return new_rep
+            stack[-1][2].append(new_rep)
+
+
+def __tseitin_node(f: FormulaWithIff,
+                   new_vars: List[int],
+                   clauses: Union[List[Formula], ClauseSink],
+                   cache: _Cache) -> int:
+    """Returns the variable representing a formula whose subformulas have
+    been replaced by the variables ``new_vars``, recording its equivalences
+    the first time the formula is seen.
+    """
+    if isinstance(f, And):
         # Get the variable that represents this clause
         old_next_var = cache.get_next_variable()
         new_rep = cache.get(str(And(new_vars)))
 
         # Record the equivalences, if the cache missed.
         if old_next_var == new_rep:
-            clauses.append(Or(cast(List[Formula], list(map(Not, new_vars))) +
-                              cast(List[Formula], [new_rep])))
-            clauses.extend(list(map(lambda v: Or([v, Not(new_rep)]), new_vars)))
+            __emit_clause(clauses, [-v for v in new_vars] + [new_rep])
+            for v in new_vars:
+                __emit_clause(clauses, [v, -new_rep])
 
         return new_rep
 
     elif isinstance(f, Or):
-        # Replace any subformulae
-        new_vars = list(map(lambda c: __tseitin_rep(c, clauses, cache), f.input_list))
-
         # Get the variable that represents this clause
         old_next_var = cache.get_next_variable()
         new_rep = cache.get(str(Or(new_vars)))
 
         # Record the equivalences, if the cache missed.
         if old_next_var == new_rep:
-            clauses.append(Or(cast(List[Formula], new_vars) +
-                              cast(List[Formula], [Not(new_rep)])))
-            clauses.extend(list(map(lambda v: Or([Not(v), new_rep]), new_vars)))
+            __emit_clause(clauses, new_vars + [-new_rep])
+            for v in new_vars:
+                __emit_clause(clauses, [-v, new_rep])
 
         return new_rep
 
     elif isinstance(f, If):
-        # Replace any subformulae
-        new_p = __tseitin_rep(f.p, clauses, cache)
-        new_q = __tseitin_rep(f.q, clauses, cache)
+        (new_p, new_q) = new_vars
 
-         # Get the variable that represents this clause
+        # Get the variable that represents this clause
         old_next_var = cache.get_next_variable()
         new_rep = cache.get(str(If(new_p, new_q)))
 
         # Record the equivalences, if the cache missed.
         if old_next_var == new_rep:
-            clauses.append(Or([Not(new_p), new_q, Not(new_rep)]))
-            clauses.append(Or([    new_p,  new_rep]))
-            clauses.append(Or([Not(new_q), new_rep]))
+            __emit_clause(clauses, [-new_p, new_q, -new_rep])
+            __emit_clause(clauses, [ new_p,  new_rep])
+            __emit_clause(clauses, [-new_q,  new_rep])
 
         return new_rep
 
     elif isinstance(f, Iff):
-        # Replace any subformulae
-        new_p = __tseitin_rep(f.p, clauses, cache)
-        new_q = __tseitin_rep(f.q, clauses, cache)
+        (new_p, new_q) = new_vars
 
         # Get the variable that represents this clause
         old_next_var = cache.get_next_variable()
@@ -325,16 +740,15 @@ def __tseitin_rep(f: FormulaWithIff,
 
         # Record the equivalences, if the cache missed.
         if old_next_var == new_rep:
-            clauses.append(Or([    new_p,      new_q,      new_rep ]))
-            clauses.append(Or([Not(new_p), Not(new_q),     new_rep ]))
-            clauses.append(Or([    new_p,  Not(new_q), Not(new_rep)]))
-            clauses.append(Or([Not(new_p),     new_q,  Not(new_rep)]))
+            __emit_clause(clauses, [ new_p,  new_q,  new_rep])
+            __emit_clause(clauses, [-new_p, -new_q,  new_rep])
+            __emit_clause(clauses, [ new_p, -new_q, -new_rep])
+            __emit_clause(clauses, [-new_p,  new_q, -new_rep])
 
         return new_rep
 
-    elif isinstance(f, Not):
-        # Replace any subformulae in the Not clause.
-        new_f = __tseitin_rep(f.c, clauses, cache)
+    else:
+        (new_f,) = new_vars
 
         # Allocate a new variable to represent the new Not clause
         old_next_var = cache.get_next_variable()
@@ -342,11 +756,171 @@ def __tseitin_rep(f: FormulaWithIff,
 
         # Record the equivalence between the new representation and the original.
         if old_next_var == new_rep:
-            clauses.append(Or([    new_f,      new_rep ]))
-            clauses.append(Or([Not(new_f), Not(new_rep)]))
+            __emit_clause(clauses, [ new_f,  new_rep])
+            __emit_clause(clauses, [-new_f, -new_rep])
 
         # Return it.
         return new_rep
 
-    elif isinstance(f, int):
-        return f
+
+def __plaisted_greenbaum_assert(f: FormulaWithIff,
+                                clauses: Union[List[Formula], ClauseSink],
+                                cache: _PolarityCache) -> None:
+    """Adds clauses that hold exactly when the formula is true. Conjunctions
+    are split into their conjuncts, and disjunctions, implications and
+    equivalences at the top are encoded as clauses over the literals of their
+    subformulas.
+    """
+    pending = [f]
+    while pending:
+        g = pending.pop()
+        if isinstance(g, And):
+            pending.extend(reversed(g.input_list))
+        elif isinstance(g, Or):
+            __emit_clause(clauses, [__plaisted_greenbaum_literal(c, _POSITIVE, clauses, cache) for c in g.input_list])
+        elif isinstance(g, If):
+            p = __plaisted_greenbaum_literal(g.p, _NEGATIVE, clauses, cache)
+            q = __plaisted_greenbaum_literal(g.q, _POSITIVE, clauses, cache)
+            __emit_clause(clauses, [-p, q])
+        elif isinstance(g, Iff):
+            # An equivalence between a variable and a formula, as used to
+            # define derived levels, makes the variable itself the formula's
+            # representative.
+            (left, left_negated, _) = __strip_negations(g.p, _BOTH)
+            (right, right_negated, _) = __strip_negations(g.q, _BOTH)
+            if isinstance(right, int) and not isinstance(left, int):
+                (left, left_negated, right, right_negated) = (right, right_negated, left, left_negated)
+            if isinstance(left, int) and not isinstance(right, int):
+                literal = -left if left_negated != right_negated else left
+                literals = [__plaisted_greenbaum_literal(c, c_polarity, clauses, cache)
+                            for (c, c_polarity) in __subformula_polarities(right, _BOTH)]
+                __plaisted_greenbaum_clauses(right, literals, literal, _BOTH, clauses)
+            else:
+                p_literal = __plaisted_greenbaum_literal(g.p, _BOTH, clauses, cache)
+                q_literal = __plaisted_greenbaum_literal(g.q, _BOTH, clauses, cache)
+                __emit_clause(clauses, [ p_literal, -q_literal])
+                __emit_clause(clauses, [-p_literal,  q_literal])
+        else:
+            __emit_clause(clauses, [__plaisted_greenbaum_literal(g, _POSITIVE, clauses, cache)])
+
+
+def __plaisted_greenbaum_literal(f: FormulaWithIff,
+                                 polarity: int,
+                                 clauses: Union[List[Formula], ClauseSink],
+                                 cache: _PolarityCache) -> int:
+    """Returns a literal that implies the formula if ``polarity`` includes
+    :data:`_POSITIVE`, and is implied by it if ``polarity`` includes
+    :data:`_NEGATIVE`, adding the clauses needed for that.
+    """
+    (f, negated, polarity) = __strip_negations(f, polarity)
+    if isinstance(f, int):
+        return -f if negated else f
+
+    # Each entry holds a formula, whether its literal is negated, its
+    # polarity, an iterator over its remaining subformulas with their
+    # polarities, and the literals of the subformulas collected so far.
+    stack = [(f, negated, polarity, iter(__subformula_polarities(f, polarity)), cast(List[int], []))]
+    while True:
+        (g, negated, polarity, rest, literals) = stack[-1]
+        for (c, c_polarity) in rest:
+            (c, c_negated, c_polarity) = __strip_negations(c, c_polarity)
+            if isinstance(c, int):
+                literals.append(-c if c_negated else c)
+            else:
+                stack.append((c, c_negated, c_polarity, iter(__subformula_polarities(c, c_polarity)), []))
+                break
+        else:
+            stack.pop()
+            rep = __plaisted_greenbaum_node(g, literals, polarity, clauses, cache)
+            literal = -rep if negated else rep
+            if not stack:
+                return literal
+            stack[-1][4].append(literal)
+
+
+def __strip_negations(f: FormulaWithIff, polarity: int) -> Tuple[FormulaWithIff, bool, int]:
+    """Removes the negations around a formula, returning the formula inside,
+    whether it was negated an odd number of times, and its polarity.
+    """
+    negated = False
+    while isinstance(f, Not):
+        f = f.c
+        negated = not negated
+        polarity = _FLIPPED[polarity]
+    return (f, negated, polarity)
+
+
+def __subformula_polarities(f: FormulaWithIff, polarity: int) -> Iterable[Tuple[FormulaWithIff, int]]:
+    """Returns the immediate subformulas of a formula with the polarities they
+    occur with, given the formula's own polarity.
+    """
+    if isinstance(f, (And, Or)):
+        return ((c, polarity) for c in f.input_list)
+    elif isinstance(f, If):
+        return ((f.p, _FLIPPED[polarity]), (f.q, polarity))
+    else:
+        f = cast(Iff, f)
+        return ((f.p, _BOTH), (f.q, _BOTH))
+
+
+def __plaisted_greenbaum_node(f: FormulaWithIff,
+                              literals: List[int],
+                              polarity: int,
+                              clauses: Union[List[Formula], ClauseSink],
+                              cache: _PolarityCache) -> int:
+    """Returns the variable representing a formula whose subformulas have
+    been replaced by the literals ``literals``, adding the clauses for the
+    polarities that have not been encoded for it yet.
+    """
+    if isinstance(f, And):
+        rep = cache.get(str(And(literals)))
+    elif isinstance(f, Or):
+        rep = cache.get(str(Or(literals)))
+    elif isinstance(f, If):
+        rep = cache.get(str(If(*literals)))
+    else:
+        rep = cache.get(str(Iff(*literals)))
+    __plaisted_greenbaum_clauses(f, literals, rep, cache.missing_polarities(rep, polarity), clauses)
+    return rep
+
+
+def __plaisted_greenbaum_clauses(f: FormulaWithIff,
+                                 literals: List[int],
+                                 rep: int,
+                                 polarity: int,
+                                 clauses: Union[List[Formula], ClauseSink]) -> None:
+    """Adds the clauses relating the literal ``rep`` to a formula whose
+    subformulas have been replaced by the literals ``literals``: ``rep``
+    implies the formula for :data:`_POSITIVE`, and is implied by it for
+    :data:`_NEGATIVE`.
+    """
+    if isinstance(f, And):
+        if polarity & _POSITIVE:
+            for l in literals:
+                __emit_clause(clauses, [l, -rep])
+        if polarity & _NEGATIVE:
+            __emit_clause(clauses, [-l for l in literals] + [rep])
+
+    elif isinstance(f, Or):
+        if polarity & _POSITIVE:
+            __emit_clause(clauses, literals + [-rep])
+        if polarity & _NEGATIVE:
+            for l in literals:
+                __emit_clause(clauses, [-l, rep])
+
+    elif isinstance(f, If):
+        (p, q) = literals
+        if polarity & _POSITIVE:
+            __emit_clause(clauses, [-p, q, -rep])
+        if polarity & _NEGATIVE:
+            __emit_clause(clauses, [ p,  rep])
+            __emit_clause(clauses, [-q,  rep])
+
+    else:
+        (p, q) = literals
+        if polarity & _POSITIVE:
+            __emit_clause(clauses, [ p, -q, -rep])
+            __emit_clause(clauses, [-p,  q, -rep])
+        if polarity & _NEGATIVE:
+            __emit_clause(clauses, [ p,  q,  rep])
+            __emit_clause(clauses, [-p, -q,  rep])
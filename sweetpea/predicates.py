@@ -0,0 +1,385 @@
+"""This module provides structured predicates for derivations.
+
+Derivation predicates are usually plain Python functions, which SweetPea can
+only treat as black boxes: to find the level combinations a derived level
+depends on, every combination in the cross product of the derivation window's
+factors has to be tried. For wide windows, that cross product grows very
+quickly.
+
+The predicates in this module are built from comparisons of the levels in a
+derivation window instead, such as::
+
+    >>> color = Factor("color", ["red", "blue", "green"])
+    >>> text  = Factor("text",  ["red", "blue", "green"])
+    >>> con_level = DerivedLevel("con", WithinTrial(eq(arg(0), arg(1)), [color, text]))
+    >>> inc_level = DerivedLevel("inc", WithinTrial(ne(arg(0), arg(1)), [color, text]))
+
+    >>> repeat = DerivedLevel("repeat", Transition(eq(arg(0, 0), arg(0, 1)), [color]))
+
+They can be used anywhere a predicate function is accepted, and they behave
+exactly like the equivalent function when called. In addition, the level
+combinations satisfying a structured predicate can be enumerated directly, in
+time proportional to the number of combinations found. (See
+:func:`.satisfying_assignments`.)
+"""
+
+
+from __future__ import annotations
+
+
+__all__ = [
+    'Argument', 'Predicate', 'Equal', 'NotEqual', 'Member', 'AllOf', 'AnyOf', 'Negation',
+    'arg', 'eq', 'ne', 'is_in', 'is_enumerable', 'satisfying_assignments',
+]
+
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from itertools import product
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union, cast
+
+if TYPE_CHECKING:
+    from sweetpea.primitives import Factor
+
+
+@dataclass(frozen=True)
+class Argument:
+    """A reference to the name of a level in a derivation window.
+
+    :param index:
+        The position of the factor in the list of factors given to the
+        derivation window.
+
+    :param trial:
+        The position of the trial within the window, starting at ``0`` for the
+        earliest trial. This must be omitted for windows with a width of ``1``
+        (such as :class:`.WithinTrialDerivationWindow`) and given for all
+        others.
+    """
+
+    index: int
+    trial: Optional[int] = None
+
+    def value(self, args: Sequence[Any]) -> str:
+        """Looks up the level name referenced by this argument among the
+        arguments a predicate is called with.
+
+        Arguments of windows with a width of ``1`` are level names, and those
+        of wider windows are lists of level names, one per trial. As with
+        :func:`.Argument.slot`, :attr:`trial` has to be given exactly when the
+        window is wider than ``1``.
+        """
+        value = args[self.index]
+        if self.trial is None:
+            if not isinstance(value, str):
+                raise ValueError(f"Argument {self.index} must give a trial for a window wider than 1.")
+            return value
+        if isinstance(value, str):
+            raise ValueError(f"Argument {self.index} cannot give a trial for a window of width 1.")
+        return value[self.trial]
+
+    def slot(self, width: int) -> int:
+        """The position of the referenced level among the window's (expanded)
+        :attr:`~.DerivationWindow.factors`.
+        """
+        if width == 1:
+            if self.trial is not None:
+                raise ValueError(f"Argument {self.index} cannot give a trial for a window of width 1.")
+            return self.index
+        if self.trial is None:
+            raise ValueError(f"Argument {self.index} must give a trial for a window of width {width}.")
+        if not 0 <= self.trial < width:
+            raise ValueError(f"Argument {self.index} refers to trial {self.trial} of a window of width {width}.")
+        return self.index * width + self.trial
+
+
+#: Either an :class:`.Argument` or a constant level name.
+Term = Union[Argument, str]
+
+
+def _term_value(term: Term, args: Sequence[Any]) -> str:
+    return term.value(args) if isinstance(term, Argument) else term
+
+
+class Predicate(ABC):
+    """The base class of structured predicates. Structured predicates can be
+    combined with ``&``, ``|``, and ``~``.
+    """
+
+    @abstractmethod
+    def __call__(self, *args: Any) -> bool:
+        pass
+
+    def __and__(self, other: Predicate) -> Predicate:
+        return AllOf((self, other))
+
+    def __or__(self, other: Predicate) -> Predicate:
+        return AnyOf((self, other))
+
+    def __invert__(self) -> Predicate:
+        return Negation(self)
+
+
+@dataclass(frozen=True)
+class Equal(Predicate):
+    """Holds when both terms have the same level name."""
+
+    left: Term
+    right: Term
+
+    def __call__(self, *args: Any) -> bool:
+        return _term_value(self.left, args) == _term_value(self.right, args)
+
+
+@dataclass(frozen=True)
+class NotEqual(Predicate):
+    """Holds when the terms have different level names."""
+
+    left: Term
+    right: Term
+
+    def __call__(self, *args: Any) -> bool:
+        return _term_value(self.left, args) != _term_value(self.right, args)
+
+
+@dataclass(frozen=True)
+class Member(Predicate):
+    """Holds when the referenced level name is one of the given names."""
+
+    argument: Argument
+    names: FrozenSet[str]
+
+    def __call__(self, *args: Any) -> bool:
+        return self.argument.value(args) in self.names
+
+
+@dataclass(frozen=True)
+class AllOf(Predicate):
+    """Holds when all of the given predicates hold."""
+
+    predicates: Tuple[Predicate, ...]
+
+    def __call__(self, *args: Any) -> bool:
+        return all(p(*args) for p in self.predicates)
+
+
+@dataclass(frozen=True)
+class AnyOf(Predicate):
+    """Holds when any of the given predicates holds."""
+
+    predicates: Tuple[Predicate, ...]
+
+    def __call__(self, *args: Any) -> bool:
+        return any(p(*args) for p in self.predicates)
+
+
+@dataclass(frozen=True)
+class Negation(Predicate):
+    """Holds when the given predicate does not."""
+
+    predicate: Predicate
+
+    def __call__(self, *args: Any) -> bool:
+        return not self.predicate(*args)
+
+
+def arg(index: int, trial: Optional[int] = None) -> Argument:
+    """Returns an :class:`.Argument`."""
+    return Argument(index, trial)
+
+
+def eq(left: Term, right: Term) -> Equal:
+    """Returns an :class:`.Equal` predicate."""
+    return Equal(left, right)
+
+
+def ne(left: Term, right: Term) -> NotEqual:
+    """Returns a :class:`.NotEqual` predicate."""
+    return NotEqual(left, right)
+
+
+def is_in(argument: Argument, names: Iterable[Any]) -> Member:
+    """Returns a :class:`.Member` predicate."""
+    return Member(argument, frozenset(map(str, names)))
+
+
+###############################################################################
+##
+## Enumeration
+##
+
+
+# An atom of a conjunction, after pushing negations inwards: a comparison of
+# two terms, or a (possibly negated) membership test.
+_Atom = Tuple[str, Any, Any]
+
+#: The largest number of conjunctions the disjunctive normal form of an
+#: enumerable predicate may have. Pushing negations through nested
+#: conjunctions and disjunctions can multiply the number of conjunctions, so
+#: larger predicates are evaluated combination by combination instead.
+MAX_DNF_CONJUNCTIONS = 1 << 12
+
+
+def _dnf_size(predicate: Any, negated: bool = False) -> Optional[int]:
+    """Counts the conjunctions in the disjunctive normal form of the predicate
+    without building it, or returns ``None`` if it cannot be converted.
+    """
+    if isinstance(predicate, Negation):
+        return _dnf_size(predicate.predicate, not negated)
+    if isinstance(predicate, (AllOf, AnyOf)):
+        sizes = [_dnf_size(p, negated) for p in predicate.predicates]
+        if any(size is None for size in sizes):
+            return None
+        if isinstance(predicate, AllOf) != negated:
+            total = 1
+            for size in cast(List[int], sizes):
+                # Stop multiplying once the limit is passed, so the count stays small.
+                total = min(total * size, MAX_DNF_CONJUNCTIONS + 1)
+            return total
+        return sum(cast(List[int], sizes))
+    if isinstance(predicate, (Equal, NotEqual, Member)):
+        return 1
+    return None
+
+
+def is_enumerable(predicate: Any) -> bool:
+    """Determines whether the combinations of levels satisfying the predicate
+    can be enumerated with :func:`.satisfying_assignments`: it has to be a
+    structured predicate whose disjunctive normal form has at most
+    :data:`.MAX_DNF_CONJUNCTIONS` conjunctions.
+    """
+    size = _dnf_size(predicate)
+    return size is not None and size <= MAX_DNF_CONJUNCTIONS
+
+
+def _to_dnf(predicate: Predicate, negated: bool = False) -> List[List[_Atom]]:
+    """Converts the predicate into disjunctive normal form, as a list of
+    conjunctions of atoms.
+    """
+    if isinstance(predicate, Negation):
+        return _to_dnf(predicate.predicate, not negated)
+    if isinstance(predicate, (AllOf, AnyOf)):
+        parts = [_to_dnf(p, negated) for p in predicate.predicates]
+        if isinstance(predicate, AllOf) != negated:
+            return [[atom for conjunction in combination for atom in conjunction]
+                    for combination in product(*parts)]
+        return [conjunction for part in parts for conjunction in part]
+    if isinstance(predicate, (Equal, NotEqual)):
+        is_equal = isinstance(predicate, Equal) != negated
+        return [[('eq' if is_equal else 'ne', predicate.left, predicate.right)]]
+    if isinstance(predicate, Member):
+        return [[('out' if negated else 'in', predicate.argument, predicate.names)]]
+    raise ValueError(f"Cannot enumerate the assignments of predicate {predicate}.")
+
+
+def _conjunction_assignments(atoms: List[_Atom], factors: Sequence[Factor], width: int) -> Iterable[Tuple[int, ...]]:
+    slot_names = [[level.name for level in factor.levels] for factor in factors]
+    allowed: List[Set[str]] = [set(names) for names in slot_names]
+
+    # Slots that have to hold the same name are merged into classes.
+    parent = list(range(len(factors)))
+
+    def find(slot: int) -> int:
+        while parent[slot] != slot:
+            parent[slot] = parent[parent[slot]]
+            slot = parent[slot]
+        return slot
+
+    different: List[Tuple[Term, Term]] = []
+    for (kind, left, right) in atoms:
+        if kind == 'in':
+            allowed[left.slot(width)] &= right
+        elif kind == 'out':
+            allowed[left.slot(width)] -= right
+        elif kind == 'eq':
+            if isinstance(left, Argument) and isinstance(right, Argument):
+                parent[find(left.slot(width))] = find(right.slot(width))
+            elif isinstance(left, Argument) or isinstance(right, Argument):
+                (argument, name) = (left, right) if isinstance(left, Argument) else (right, left)
+                allowed[cast(Argument, argument).slot(width)] &= {cast(str, name)}
+            elif left != right:
+                return []
+        else:
+            different.append((left, right))
+
+    classes: Dict[int, List[int]] = {}
+    for slot in range(len(factors)):
+        classes.setdefault(find(slot), []).append(slot)
+    class_names: Dict[int, List[str]] = {}
+    for root, slots in classes.items():
+        names = set.intersection(*(allowed[slot] for slot in slots))
+        # Keep the order of the first slot's levels so the output is stable.
+        class_names[root] = [name for name in slot_names[slots[0]] if name in names]
+
+    # Inequalities become constraints between classes, or constant exclusions.
+    class_pairs: List[Tuple[int, int]] = []
+    for (left, right) in different:
+        if isinstance(left, Argument) and isinstance(right, Argument):
+            (a, b) = (find(left.slot(width)), find(right.slot(width)))
+            if a == b:
+                return []
+            class_pairs.append((a, b))
+        elif isinstance(left, Argument) or isinstance(right, Argument):
+            (argument, name) = (left, right) if isinstance(left, Argument) else (right, left)
+            root = find(cast(Argument, argument).slot(width))
+            class_names[root] = [n for n in class_names[root] if n != name]
+        elif left == right:
+            return []
+
+    roots = list(classes.keys())
+    position = {root: n for n, root in enumerate(roots)}
+    checks: List[List[int]] = [[] for _ in roots]
+    for (a, b) in class_pairs:
+        (first, second) = sorted((position[a], position[b]))
+        checks[second].append(first)
+
+    indices = [{name: i for i, name in enumerate(names)} for names in slot_names]
+    results: List[Tuple[int, ...]] = []
+    chosen: List[str] = []
+
+    def assign(n: int) -> None:
+        if n == len(roots):
+            assignment = [0] * len(factors)
+            for root, name in zip(roots, chosen):
+                for slot in classes[root]:
+                    assignment[slot] = indices[slot][name]
+            results.append(tuple(assignment))
+            return
+        for name in class_names[roots[n]]:
+            if any(chosen[m] == name for m in checks[n]):
+                continue
+            chosen.append(name)
+            assign(n + 1)
+            chosen.pop()
+
+    assign(0)
+    return results
+
+
+def satisfying_assignments(predicate: Predicate, factors: Sequence[Factor], width: int) -> List[Tuple[int, ...]]:
+    """Enumerates the combinations of levels that satisfy a structured
+    predicate, without going through the whole cross product of levels.
+
+    :param predicate:
+        The predicate of a derivation window.
+
+    :param factors:
+        The derivation window's (expanded) :attr:`~.DerivationWindow.factors`.
+
+    :param width:
+        The width of the derivation window.
+
+    :returns:
+        A sorted list of tuples of level indices, one index per factor in
+        ``factors``, in the same order as the cross product of the factors'
+        levels.
+
+    :raises ValueError: If the predicate is not :func:`enumerable
+        <.is_enumerable>`.
+    """
+    if not is_enumerable(predicate):
+        raise ValueError(f"Cannot enumerate the assignments of predicate {predicate}.")
+    found: Set[Tuple[int, ...]] = set()
+    for conjunction in _to_dnf(predicate):
+        found.update(_conjunction_assignments(conjunction, factors, width))
+    return sorted(found)
@@ -25,11 +25,20 @@ __all__ = [
 ]
 
 
+import multiprocessing
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from dataclasses import InitVar, dataclass, field
-from itertools import product
-from random import randint
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, cast
+from itertools import count, product
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, cast
+
+import numpy as np
+
+from tqdm import tqdm
+
+from sweetpea.predicates import AnyOf, Negation, Predicate, is_enumerable, satisfying_assignments
 
 
 ###############################################################################
@@ -38,6 +47,11 @@ from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, cast
 ##
 
 
+# Levels and factors are identified by integers drawn from this counter, which
+# makes their identifiers unique within a process.
+_ids = count()
+
+
 """
 
 TODO: REMOVE
@@ -92,9 +106,11 @@ class Level:
     #: The name of the level.
     name: str
 
-    # TODO: I think we can get rid of `Level.internal_name` and replace it with
-    #       some other mechanism. See the TODO notes in `Level.__post_init__`.
-    #: The internal name, which is meant to be unique among levels.
+    #: A process-unique integer identifying this level, assigned when the
+    #: level is created. Copies of a level keep its identifier.
+    id: int = field(init=False, repr=False)
+
+    #: The internal name, which is unique among levels.
     #:
     #: .. deprecated:: 0.1.0
     #:
@@ -141,24 +157,16 @@ class Level:
         # NOTE: This conversion exists for backwards compatibility.
         if not isinstance(self.name, str):
             self.name = str(self.name)
-        # TODO: Using random integers seems insecure. Perhaps use UUIDs or a
-        #       global (module-level) incremented counter.
-        # TODO: Alternatively, because this is only used for the `__eq__`
-        #       implementation, we could potentially remove this altogether and
-        #       simply switch to using `is` checks (which is a more secure way
-        #       of doing the same thing). The downside there is that this
-        #       requires users of SweetPea to understand the distinction
-        #       between `==` and `is`, which adds a bit of a barrier for an
-        #       audience that is not primarily made of programmers.
-        self.internal_name = self.name + f"{randint(0, 99999):05d}"
+        self.id = next(_ids)
+        self.internal_name = self.name + f"{self.id:05d}"
 
     def __hash__(self) -> int:
-        return hash(self.internal_name)
+        return self.id
 
     def __eq__(self, other) -> bool:
-        if not isinstance(other, type(self)):
+        if not isinstance(other, Level):
             return False
-        return self.internal_name == other.internal_name
+        return self.id == other.id
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}<{self.name}>"
@@ -226,6 +234,10 @@ class DerivedLevel(Level):
 
     weight: InitVar[int] = 1
 
+    #: Whether this level was produced from an :class:`.ElseLevel`, in which
+    #: case it holds exactly when none of the other levels of its factor do.
+    is_else: bool = field(init=False, default=False, compare=False)
+
     # NOTE: The __post_init__ method is a special case where we can ignore the
     #       Liskov substitution property. This is addressed in
     #       python/mypy#9254:
@@ -340,11 +352,20 @@ class ElseLevel(Level):
         #       representation to avoid this real duplication.
         factors = first_level.window.factors[::first_level.window.width]
         # TODO: This exhibits the same issue as the preceding TODO.
-        window = DerivationWindow(lambda *args: not any(map(lambda l: l.window.predicate(*args), other_levels)),
+        # The else level of structured predicates is structured too, so it can
+        # still be enumerated symbolically.
+        predicates = [l.window.predicate for l in other_levels]
+        if all(isinstance(p, Predicate) for p in predicates):
+            predicate: Callable = Negation(AnyOf(tuple(cast(List[Predicate], predicates))))
+        else:
+            predicate = lambda *args: not any(map(lambda l: l.window.predicate(*args), other_levels))
+        window = DerivationWindow(predicate,
                                   factors,
                                   first_level.window.width,
                                   first_level.window.stride)
-        return DerivedLevel(self.name, window)
+        level = DerivedLevel(self.name, window)
+        level.is_else = True
+        return level
 
 
 ###############################################################################
@@ -421,6 +442,14 @@ class Factor:
     #: The discrete values that this factor can have.
     levels: Sequence[Level] = field(init=False)
 
+    #: A process-unique integer identifying this factor, assigned when the
+    #: factor is created. Copies of a factor keep its identifier.
+    id: int = field(init=False, repr=False)
+
+    # The first trial this factor applies to and the stride between applicable
+    # trials. (See `Factor.trial_pattern`.)
+    _trial_pattern: Optional[Tuple[int, int]] = field(init=False, default=None, repr=False)
+
     #: A mapping from level names to levels for constant-time lookup.
     _level_map: Dict[str, Level] = field(init=False, default_factory=dict)
 
@@ -446,6 +475,7 @@ class Factor:
         return instance
 
     def __post_init__(self, initial_levels: Sequence[Any]):
+        self.id = next(_ids)
         # First, we convert the given initial levels into actual `Level`s. To
         # ensure the input list is untouched, we copy any levels that came in.
         real_levels: List[Level] = []
@@ -493,16 +523,16 @@ class Factor:
         return new_instance
 
     def __eq__(self, other) -> bool:
-        if not isinstance(other, type(self)):
+        if not isinstance(other, Factor):
             return False
-        return self.name == other.name and self.levels == other.levels
+        return self.id == other.id
 
     def __str__(self) -> str:
         levels_string = '[' + ', '.join(map(str, self.levels)) + ']'
         return f"{type(self).__name__}<{self.name} | {levels_string}>"
 
     def __hash__(self) -> int:
-        return hash(self.name)
+        return self.id
 
     def __getitem__(self, name: str) -> Level:
         value = self.get_level(name)
@@ -576,17 +606,57 @@ class Factor:
         """
         if trial_number <= 0:
             raise ValueError(f"Trial numbers must be 1 or greater; got {trial_number}.")
-        if not isinstance(self, DerivedFactor):
-            return True
+        (first_trial, stride) = self.trial_pattern
+        return trial_number >= first_trial and (trial_number - first_trial) % stride == 0
 
-        def acc_width(d: DerivationWindow) -> int:
-            if isinstance(d.first_factor, DerivedFactor) and d.first_factor.has_complex_window:
-                return d.width + acc_width(d.first_factor.first_level.window) - 1
-            return d.width
+    @property
+    def trial_pattern(self) -> Tuple[int, int]:
+        """The first trial this factor applies to, and the number of trials
+        from one applicable trial to the next. This is computed once, the first
+        time it is needed.
+        """
+        if self._trial_pattern is None:
+            if not isinstance(self, DerivedFactor):
+                self._trial_pattern = (1, 1)
+            else:
+                def acc_width(d: DerivationWindow) -> int:
+                    if isinstance(d.first_factor, DerivedFactor) and d.first_factor.has_complex_window:
+                        return d.width + acc_width(d.first_factor.first_level.window) - 1
+                    return d.width
+
+                # The factor applies to trials from the accumulated width of
+                # its window onwards, at positions aligned with its own window.
+                window = self.first_level.window
+                earliest_trial = acc_width(window)
+                first_trial = earliest_trial + (window.width - earliest_trial) % window.stride
+                self._trial_pattern = (first_trial, window.stride)
+        return self._trial_pattern
+
+    def applicable_trials(self, trial_count: int) -> np.ndarray:
+        """A boolean mask over the trials ``1`` through ``trial_count``
+        (stored at positions ``0`` through ``trial_count - 1``) indicating
+        which trials this factor applies to.
+        """
+        (first_trial, stride) = self.trial_pattern
+        mask = np.zeros(trial_count, dtype=bool)
+        mask[first_trial - 1::stride] = True
+        return mask
+
+    def applicable_trial_count(self, trial_count: int) -> int:
+        """The number of trials among ``1`` through ``trial_count`` that this
+        factor applies to.
+        """
+        (first_trial, stride) = self.trial_pattern
+        return max(0, (trial_count - first_trial) // stride + 1)
 
-        window = self.first_level.window
-        return (trial_number >= acc_width(window)
-                and (trial_number - window.width) % window.stride == 0)
+    def trials_required(self, applicable_trial_count: int) -> int:
+        """The number of trials needed for this factor to apply to the given
+        number of trials.
+        """
+        (first_trial, stride) = self.trial_pattern
+        if applicable_trial_count <= 0:
+            return 0
+        return first_trial + (applicable_trial_count - 1) * stride
 
     # TODO: REMOVE. (backwards compatibility)
     @property
@@ -694,6 +764,9 @@ class DerivedFactor(Factor):
 
     levels: Sequence[DerivedLevel] = field(init=False)
 
+    #: The cached result of :func:`.DerivedFactor.derivation_table`.
+    _derivation_table: Optional[np.ndarray] = field(init=False, default=None, repr=False)
+
     def _process_initial_levels(self, initial_levels: Sequence[Level]) -> Sequence[DerivedLevel]:
         # First, we construct the list of `DerivedLevel`s.
         adjusted_levels: List[DerivedLevel] = []
@@ -737,6 +810,186 @@ class DerivedFactor(Factor):
     def first_level(self) -> DerivedLevel:
         return cast(DerivedLevel, self.levels[0])
 
+    def derivation_table(self) -> np.ndarray:
+        """Compiles the derivation predicates of this factor's levels into a
+        truth table. The table has one dimension per factor in the derivation
+        window's :attr:`~.DerivationWindow.factors` (which are repeated
+        according to the window's width), indexed by the position of a level
+        in that factor. Each entry holds the index of the level of this factor
+        derived from that combination of levels, or ``-1`` if no level
+        matches it.
+
+        The predicates are only evaluated the first time the table is needed,
+        and levels converted from an :class:`.ElseLevel` are filled in as the
+        complement of the other levels without calling their predicates. The
+        combinations are evaluated in chunks; large tables report their
+        progress as they go and, on Linux, are split across worker processes.
+
+        :raises ValueError: If a predicate does not return a :class:`bool`, or
+            if more than one level matches the same combination of levels.
+        """
+        if self._derivation_table is not None:
+            return self._derivation_table
+
+        shape = tuple(len(f.levels) for f in self.first_level.window.factors)
+        cells = int(np.prod(shape, dtype=np.int64))
+        chunks = [(start, min(start + _DERIVATION_CHUNK_SIZE, cells))
+                  for start in range(0, cells, _DERIVATION_CHUNK_SIZE)]
+        table = np.empty(cells, dtype=np.int64)
+        report = cells >= _PARALLEL_DERIVATION_THRESHOLD
+        with tqdm(total=cells, desc=f"Deriving {self.name}", unit="combinations",
+                  file=sys.stdout, disable=not report) as progress:
+            for ((start, stop), chunk) in _evaluate_derivation_chunks(self, chunks):
+                table[start:stop] = chunk
+                progress.update(stop - start)
+        table = table.reshape(shape)
+
+        # An else level without any other levels never matches anything.
+        else_indices = [level_index for level_index, level in enumerate(self.levels) if level.is_else]
+        if else_indices and len(else_indices) < len(self.levels):
+            unmatched = table == -1
+            if len(else_indices) > 1 and unmatched.any():
+                first, second = else_indices[:2]
+                raise ValueError(f"Factor {self.name} matches {self.levels[first].name} and "
+                                 f"{self.levels[second].name} whenever no other level matches.")
+            table[unmatched] = else_indices[0]
+
+        self._derivation_table = table
+        return table
+
+    @property
+    def has_structured_derivations(self) -> bool:
+        """Whether all of the levels of this factor are derived with
+        :class:`structured predicates <.Predicate>`.
+        """
+        return all(isinstance(level.window.predicate, Predicate) for level in self.levels)
+
+    def derived_level_index(self, indices: Sequence[int]) -> int:
+        """Returns the index of the level of this factor that is derived from
+        one combination of levels, given by their indices in the derivation
+        window's :attr:`~.DerivationWindow.factors`, or ``-1`` if no level
+        matches.
+
+        Structured predicates are evaluated for that combination alone, so
+        the :func:`.DerivedFactor.derivation_table` is only compiled for
+        opaque predicates (or if it has already been compiled).
+        """
+        if self._derivation_table is not None or not self.has_structured_derivations:
+            return int(self.derivation_table()[tuple(indices)])
+        window = self.first_level.window
+        args: List[Any] = [f.levels[i].name for f, i in zip(window.factors, indices)]
+        if window.width != 1:
+            args = [args[i:i + window.width] for i in range(0, len(args), window.width)]
+        return _derive_level_index(self, list(enumerate(self.levels)), args)
+
+    def level_assignments(self, level: DerivedLevel) -> np.ndarray:
+        """Returns the combinations of levels from which the given level of
+        this factor is derived, as an array with one row per combination and
+        one column per factor in the derivation window's
+        :attr:`~.DerivationWindow.factors`, holding level indices.
+
+        :func:`Enumerable <.is_enumerable>` structured predicates are
+        enumerated directly, without compiling the
+        :func:`.DerivedFactor.derivation_table`.
+        """
+        window = self.first_level.window
+        if self._derivation_table is None and all(is_enumerable(l.window.predicate) for l in self.levels):
+            assignments = satisfying_assignments(cast(Predicate, level.window.predicate), window.factors, window.width)
+            return np.array(assignments, dtype=np.int64).reshape(-1, len(window.factors))
+        return np.argwhere(self.derivation_table() == self.levels.index(level))
+
+    def get_derived_level(self, levels: Sequence[Level]) -> Optional[DerivedLevel]:
+        """Looks up the level of this factor that is derived from the given
+        levels with :func:`.DerivedFactor.derived_level_index`. The levels
+        must be given in the order of the derivation window's
+        :attr:`~.DerivationWindow.factors`.
+
+        :returns: The derived level, or ``None`` if no level matches.
+        """
+        factors = self.first_level.window.factors
+        index = self.derived_level_index([f.levels.index(l) for f, l in zip(factors, levels)])
+        return self.levels[index] if index >= 0 else None
+
+
+#: The number of level combinations evaluated at a time when compiling a
+#: :func:`.DerivedFactor.derivation_table`.
+_DERIVATION_CHUNK_SIZE = 1 << 16
+
+#: Derivation tables with at least this many entries report their progress
+#: and, on Linux with more than one CPU, are compiled by a pool of forked
+#: worker processes. (Forking is unsafe on macOS once numpy has started
+#: threads, and unavailable on Windows.)
+_PARALLEL_DERIVATION_THRESHOLD = 1 << 20
+
+# The factor whose derivations are being evaluated by forked worker processes.
+# Workers inherit it from the parent process, so derivation predicates do not
+# need to be picklable.
+_parallel_derivation_factor: Optional[DerivedFactor] = None
+
+
+def _evaluate_derivation_chunk(factor: DerivedFactor, start: int, stop: int) -> np.ndarray:
+    """Evaluates the derivation predicates of a factor for the level
+    combinations at the flattened positions ``start`` to ``stop`` of its
+    :func:`.DerivedFactor.derivation_table`.
+    """
+    window = factor.first_level.window
+    factors = window.factors
+    names = [[level.name for level in f.levels] for f in factors]
+    positions = np.unravel_index(np.arange(start, stop), tuple(len(n) for n in names))
+    levels = [(level_index, level) for level_index, level in enumerate(factor.levels) if not level.is_else]
+    chunk = np.full(stop - start, -1, dtype=np.int64)
+    for (cell, indices) in enumerate(zip(*(p.tolist() for p in positions))):
+        args: List[Any] = [names[n][i] for n, i in enumerate(indices)]
+        if window.width != 1:
+            args = [args[i:i + window.width] for i in range(0, len(args), window.width)]
+        chunk[cell] = _derive_level_index(factor, levels, args)
+    return chunk
+
+
+def _derive_level_index(factor: DerivedFactor, levels: List[Tuple[int, DerivedLevel]], args: List[Any]) -> int:
+    """Evaluates the predicates of the given levels of a factor, with their
+    indices, for one combination of level names. Returns the index of the
+    matching level, or ``-1`` if none matches.
+    """
+    matched = -1
+    for level_index, level in levels:
+        result = level.window.predicate(*args)
+        if not isinstance(result, bool):
+            raise ValueError(f"Expected derivation predicate to return bool; got {type(result)}.")
+        if result:
+            if matched != -1:
+                raise ValueError(f"Factor {factor.name} matches {factor.levels[matched].name} and "
+                                 f"{level.name} with assignment {args}.")
+            matched = level_index
+    return matched
+
+
+def _evaluate_parallel_derivation_chunk(bounds: Tuple[int, int]) -> np.ndarray:
+    return _evaluate_derivation_chunk(cast(DerivedFactor, _parallel_derivation_factor), *bounds)
+
+
+def _evaluate_derivation_chunks(factor: DerivedFactor,
+                                chunks: List[Tuple[int, int]]
+                                ) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+    """Evaluates the chunks of a factor's derivation table in order, in
+    parallel when the table is large enough and processes can be forked.
+    Tables compiled while another one is being compiled in parallel (from a
+    derivation predicate) are evaluated in this process.
+    """
+    global _parallel_derivation_factor
+    cells = chunks[-1][1] if chunks else 0
+    if (len(chunks) < 2 or cells < _PARALLEL_DERIVATION_THRESHOLD or multiprocessing.cpu_count() < 2
+            or sys.platform != 'linux' or _parallel_derivation_factor is not None):
+        for bounds in chunks:
+            yield (bounds, _evaluate_derivation_chunk(factor, *bounds))
+        return
+    _parallel_derivation_factor = factor
+    try:
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context('fork')) as executor:
+            yield from zip(chunks, executor.map(_evaluate_parallel_derivation_chunk, chunks))
+    finally:
+        _parallel_derivation_factor = None
+
 
 ###############################################################################
 ##
@@ -1,16 +1,95 @@
 from abc import ABC, abstractmethod
-from typing import List, cast
-from itertools import repeat
+from typing import Iterator, List, Optional, Sequence, Union, cast, overload
+
+import numpy as np
 
 from sweetpea.blocks import Block
-from sweetpea.internal import intersperse
+from sweetpea.primitives import Factor
+
+
+"""
+Sampled experiments stored column-wise, as a tensor of level codes of shape
+(samples x trials x factors). The code of a level is its index among the
+levels of its factor, and NOT_APPLICABLE (-1) marks the trials to which a
+factor does not apply.
+
+The experiments behave like a list of the dicts produced by
+SamplingStrategy.decode, which are only built when they are accessed.
+Factors are ordered as the keys of those dicts: the factors without complex
+windows first, then those with complex windows, each in design order.
+"""
+class ColumnarExperiments(Sequence[dict]):
+
+    NOT_APPLICABLE = -1
+
+    def __init__(self, codes: np.ndarray, factor_names: List[str], level_names: List[List[str]]) -> None:
+        self.codes = codes
+        self.factor_names = factor_names
+        self.level_names = level_names
+        # The sentinel indexes the '' added after each factor's level names.
+        self.__labels = [np.array(names + [''], dtype=object) for names in level_names]
+
+    @staticmethod
+    def factors(block: Block) -> List[Factor]:
+        return [f for f in block.design if not f.has_complex_window] + \
+               [f for f in block.design if f.has_complex_window]
+
+    @staticmethod
+    def code_type(block: Block) -> type:
+        most_levels = max([len(f.levels) for f in block.design], default=0)
+        return np.int8 if most_levels <= np.iinfo(np.int8).max else np.int16
+
+    """
+    Builds the columnar form of experiments given as dicts.
+    """
+    @staticmethod
+    def from_dicts(block: Block, experiments: List[dict]) -> 'ColumnarExperiments':
+        factors = ColumnarExperiments.factors(block)
+        codes: np.ndarray = np.full((len(experiments), block.trials_per_sample(), len(factors)),
+                        ColumnarExperiments.NOT_APPLICABLE, dtype=ColumnarExperiments.code_type(block))
+        for i, f in enumerate(factors):
+            level_codes = {l.external_name: n for n, l in enumerate(f.levels)}
+            for sample, experiment in zip(codes, experiments):
+                for trial, name in enumerate(experiment.get(f.factor_name, [])):
+                    sample[trial, i] = level_codes.get(name, ColumnarExperiments.NOT_APPLICABLE)
+        return ColumnarExperiments(codes, [f.factor_name for f in factors],
+                                   [[l.external_name for l in f.levels] for f in factors])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> dict: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'ColumnarExperiments': ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ColumnarExperiments(self.codes[index], self.factor_names, self.level_names)
+        sample = self.codes[index]
+        return {name: labels[sample[:, i]].tolist()
+                for i, (name, labels) in enumerate(zip(self.factor_names, self.__labels))}
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[i] for i in range(len(self)))
+
+    """
+    Converts all of the experiments to dicts at once.
+    """
+    def to_dicts(self) -> List[dict]:
+        experiments = cast(List[dict], [{} for _ in range(len(self))])
+        for i, (name, labels) in enumerate(zip(self.factor_names, self.__labels)):
+            for experiment, row in zip(experiments, labels[self.codes[:, :, i]].tolist()):
+                experiment[name] = row
+        return experiments
 
 
 """
 Data object for sampling result.
 """
 class SamplingResult:
-    def __init__(self, samples: List[dict], metrics: dict) -> None:
+    def __init__(self, samples: Union[List[dict], ColumnarExperiments], metrics: dict) -> None:
         self.samples = samples
         self.metrics = metrics
 
@@ -28,7 +107,7 @@ class SamplingStrategy(ABC):
     """
     @staticmethod
     @abstractmethod
-    def sample(block: Block, sample_count: int) -> SamplingResult:
+    def sample(block: Block, sample_count: int, *, seed: Optional[int] = None) -> SamplingResult:
         pass
 
     """
@@ -44,43 +123,58 @@ class SamplingStrategy(ABC):
     """
     @staticmethod
     def decode(block: Block, solution: List[int]) -> dict:
-        # Sort the list and remove any negative (false) variables
-        solution.sort()
-        solution = list(filter(lambda v: v > 0, solution))
-
-        # Separate into simple/complex variables.
-        simple_variables = list(filter(lambda v: v <= block.grid_variables(), solution))
-        complex_variables = list(filter(lambda v: v > block.grid_variables(), solution))
-
-        experiment = cast(dict, {})
-
-        # Simple factors
-        tuples = list(map(lambda v: block.decode_variable(v), simple_variables))
-        string_tuples = list(map(lambda t: (t[0].factor_name, t[1].external_name), tuples))
-        for (factor_name, level_name) in string_tuples:
-            if factor_name not in experiment:
-                experiment[factor_name] = []
-            experiment[factor_name].append(level_name)
-
-        # Complex factors - The challenge here is knowing when to insert '', rather than using the variables.
-        # Start after 'width' trials, and shift 'stride' trials for each variable.
-        complex_factors = list(filter(lambda f: f.has_complex_window, block.design))
-        for f in complex_factors:
-            # Get variables for this factor
-            start = block.first_variable_for_level(f, f.levels[0]) + 1
-            end = start + block.variables_for_factor(f)
-            variables = list(filter(lambda n: n in range(start, end), complex_variables))
-
-            # Get the level names for the variables in the solution.
-            level_tuples = list(map(lambda v: block.decode_variable(v), variables))
-            level_names = list(map(lambda t: (t[1].external_name), level_tuples))
-
-            # Intersperse empty strings for the trials to which this factor does not apply.
-            #level_names = list(intersperse('', level_names, f.levels[0].window.stride - 1))
-            #level_names = list(repeat('', f.levels[0].window.width - 1)) + level_names
-            level_names_fill = []
-            for n in range(block.trials_per_sample()):
-                level_names_fill.append(level_names.pop(0) if f.applies_to_trial(n+1) else '')
-            experiment[f.factor_name] = level_names_fill
-
-        return experiment
+        return SamplingStrategy.decode_batch(block, [solution])[0]
+
+    """
+    Decodes many solutions at once. The solutions are given either as a list
+    of solutions in the form taken by decode (lists of variables, which are
+    negative when false), or as a (samples x variables) array whose column
+    v - 1 is nonzero when variable v is true. Variables beyond the block's
+    variables_per_sample are ignored.
+    """
+    @staticmethod
+    def decode_batch(block: Block, solutions: Union[np.ndarray, List[List[int]]]) -> List[dict]:
+        return SamplingStrategy.decode_columnar(block, solutions).to_dicts()
+
+    """
+    Decodes many solutions at once into ColumnarExperiments. The solutions
+    are given as for decode_batch.
+
+    The levels of every factor are looked up for all solutions and trials
+    together, from tables of the variables of each level in each trial.
+    """
+    @staticmethod
+    def decode_columnar(block: Block, solutions: Union[np.ndarray, List[List[int]]]) -> ColumnarExperiments:
+        variable_count = block.variables_per_sample()
+        if isinstance(solutions, np.ndarray):
+            values = np.zeros((solutions.shape[0], variable_count), dtype=bool)
+            columns = min(variable_count, solutions.shape[1])
+            values[:, :columns] = solutions[:, :columns] != 0
+        else:
+            values = np.zeros((len(solutions), variable_count + 1), dtype=bool)
+            for row, solution in zip(values, solutions):
+                variables = np.array(solution, dtype=np.int64)
+                row[variables[(variables > 0) & (variables <= variable_count)]] = True
+            values = values[:, 1:]
+
+        trial_count = block.trials_per_sample()
+        factors = ColumnarExperiments.factors(block)
+        codes: np.ndarray = np.full((len(values), trial_count, len(factors)),
+                        ColumnarExperiments.NOT_APPLICABLE, dtype=ColumnarExperiments.code_type(block))
+        for i, f in enumerate(factors):
+            # The (0-based) variables of each level of the factor, with one
+            # row per trial in which the factor applies.
+            first_variables = np.array([block.first_variable_for_level(f, l) for l in f.levels], dtype=np.int64)
+            if f.has_complex_window:
+                offsets = len(f.levels) * np.arange(f.applicable_trial_count(trial_count))
+            else:
+                offsets = block.variables_per_trial() * np.arange(trial_count)
+            levels = values[:, offsets[:, None] + first_variables]
+
+            # Trials where none of the factor's levels are set are left as
+            # not applicable.
+            chosen = np.where(levels.any(axis=2), levels.argmax(axis=2), ColumnarExperiments.NOT_APPLICABLE)
+            codes[:, np.flatnonzero(f.applicable_trials(trial_count)), i] = chosen
+
+        return ColumnarExperiments(codes, [f.factor_name for f in factors],
+                                   [[l.external_name for l in f.levels] for f in factors])
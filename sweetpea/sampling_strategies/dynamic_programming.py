@@ -0,0 +1,382 @@
+import random
+
+from collections import Counter
+from itertools import product
+from math import factorial
+from typing import Dict, List, Optional, Tuple, cast
+
+import numpy as np
+
+from sweetpea.blocks import Block, FullyCrossBlock
+from sweetpea.combinatorics import (
+    choose_distinct, compute_jth_inversion_sequence, construct_permutation, extract_components)
+from sweetpea.constraints import (
+    AtLeastKInARow, AtMostKInARow, Consistency, Derivation, Exclude, ExactlyKInARow, FullyCross)
+from sweetpea.primitives import DerivedFactor, Factor
+from sweetpea.sampling_strategies.base import ColumnarExperiments, SamplingStrategy, SamplingResult
+from sweetpea.sampling_strategies.unigen import UnigenSamplingStrategy
+
+
+#: The largest number of states the solution counting may visit before the
+#: design is sampled with Unigen instead.
+MAX_STATES = 1_000_000
+
+#: The largest number of distinct trials (combinations of the levels of the
+#: factors without complex windows) that are enumerated.
+MAX_TRIALS = 100_000
+
+
+class DynamicProgrammingSamplingStrategy(SamplingStrategy):
+    """This strategy samples exactly uniformly from designs with transitions
+    and run-length constraints, without a SAT solver.
+
+    Each crossing instance appears once per sequence, so a sequence is an
+    ordering of the crossing instances, along with a choice of the uncrossed
+    levels of each trial. Crossing instances that affect the transitions and
+    constraints in the same ways are interchangeable, so valid sequences are
+    counted by dynamic programming over the number of instances of each kind
+    that remain to be placed, the relevant levels of the previous trial, and
+    the length of the current run of each constrained level. Sequences are
+    then unranked by walking the counts.
+
+    Designs that cannot be counted this way, or whose counting would visit
+    too many states, are sampled with the :class:`.UnigenSamplingStrategy`.
+    """
+
+    def __str__(self):
+        return 'Dynamic Programming Sampling Strategy'
+
+    @staticmethod
+    def sample(block: Block, sample_count: int, *, seed: Optional[int] = None) -> SamplingResult:
+        # Exclusions that remove entire crossings are reported as errors
+        # unless the block does not require a complete crossing.
+        block.trials_per_sample()
+        if block.errors:
+            for e in block.errors:
+                print(e)
+                if "WARNING" not in e:
+                    return SamplingResult([], {})
+
+        try:
+            enumerator = DPSolutionEnumerator(block)
+        except UnsupportedDesignError as e:
+            result = UnigenSamplingStrategy.sample(block, sample_count, seed=seed)
+            result.metrics['fallback'] = str(e)
+            return result
+
+        # Unigen searches for the minimum number of trials needed when there
+        # are no solutions.
+        if enumerator.solution_count() == 0:
+            return UnigenSamplingStrategy.sample(block, sample_count, seed=seed)
+
+        metrics = {
+            'solution_count': enumerator.solution_count(),
+            'state_count': enumerator.state_count(),
+        }
+        count = min(sample_count, enumerator.solution_count())
+        rng = random.Random(seed) if seed is not None else None
+        return SamplingResult(enumerator.generate_samples(choose_distinct(enumerator.solution_count(), count, rng)),
+                              metrics)
+
+
+class UnsupportedDesignError(ValueError):
+    """Raised when the solutions of a design cannot be counted by the
+    :class:`.DPSolutionEnumerator`.
+    """
+
+
+# A step of a sequence: the kind of crossing instance placed in the trial,
+# the signature of the trial's relevant levels, the number of trials with
+# that signature for a crossing instance of that kind, and the next state.
+_Step = Tuple[int, int, int, tuple]
+
+
+"""
+Given a fully crossed block whose constraints only involve its derivations, transitions, exclusions and run lengths,
+this class counts the valid trial sequences and constructs the sequence with a given number.
+"""
+class DPSolutionEnumerator():
+
+    def __init__(self, block: Block) -> None:
+        self._block = cast(FullyCrossBlock, block)
+        self.__validate()
+
+        self._factors = [f for f in block.design if not f.has_complex_window]
+        self._transitions = [cast(DerivedFactor, f) for f in block.design if f.has_complex_window]
+        self._factor_index = {f: i for i, f in enumerate(self._factors)}
+        self._transition_indices = [block.design.index(f) for f in self._transitions]
+        self._excluded = set((self._block.design.index(f), f.levels.index(l)) for (f, l) in block.exclude)
+
+        # The trials each crossing instance can appear in, grouped by their signatures.
+        self._run_levels = self.__run_levels()
+        self._arguments = sorted(set(self._factor_index[a] for f in self._transitions
+                                     for a in f.first_level.window.args))
+        self._signatures = cast(Dict[tuple, int], {})
+        self._trials = self.__generate_trials()
+
+        # Crossing instances with the same trial signatures are interchangeable.
+        kinds = cast(Dict[tuple, int], {})
+        self._kinds = cast(List[List[int]], [])
+        self._kind_profiles = cast(List[List[Tuple[int, int]]], [])
+        for instance, trials in enumerate(self._trials):
+            profile = tuple(sorted((signature, len(t)) for signature, t in trials.items()))
+            if profile not in kinds:
+                kinds[profile] = len(self._kinds)
+                self._kinds.append([])
+                self._kind_profiles.append(list(profile))
+            self._kinds[kinds[profile]].append(instance)
+
+        self._signature_values = [signature for signature, _ in sorted(self._signatures.items(), key=lambda s: s[1])]
+        self._steps = cast(Dict[tuple, List[_Step]], {})
+        self._counts = cast(Dict[tuple, int], {})
+        self._path_count = self.__count_paths()
+        self._arrangement_counts = [factorial(len(instances)) for instances in self._kinds]
+        self._solution_count = self._path_count
+        for count in self._arrangement_counts:
+            self._solution_count *= count
+
+    def solution_count(self) -> int:
+        return self._solution_count
+
+    def state_count(self) -> int:
+        return len(self._counts)
+
+    def generate_samples(self, sequence_numbers: List[int]) -> ColumnarExperiments:
+        factors = ColumnarExperiments.factors(self._block)
+        trial_count = self._block.trials_per_sample()
+        codes: np.ndarray = np.full((len(sequence_numbers), trial_count, len(factors)),
+                                    ColumnarExperiments.NOT_APPLICABLE,
+                                    dtype=ColumnarExperiments.code_type(self._block))
+        for sample, sequence_number in zip(codes, sequence_numbers):
+            levels = self.generate_sequence(sequence_number)
+            sample[:] = np.array(levels, dtype=codes.dtype)[:, [self._block.design.index(f) for f in factors]]
+        return ColumnarExperiments(codes, [f.factor_name for f in factors],
+                                   [[l.external_name for l in f.levels] for f in factors])
+
+    def generate_sample(self, sequence_number: int) -> dict:
+        return self.generate_samples([sequence_number])[0]
+
+    def generate_sequence(self, sequence_number: int) -> List[List[int]]:
+        """Constructs the sequence with the given number. Each trial is given
+        as the indices of the levels of the block's design factors, with
+        ``-1`` for factors that do not apply to the trial.
+        """
+        if not 0 <= sequence_number < self._solution_count:
+            raise ValueError(f"Sequence number {sequence_number} is out of range.")
+
+        # The lower part of the number selects the path through the counts, and the upper part selects the order in
+        # which each kind's crossing instances take the places of that kind.
+        (arrangement_number, path_number) = divmod(sequence_number, self._path_count)
+        orders = []
+        for kind, j in enumerate(extract_components(self._arrangement_counts, arrangement_number)):
+            permutation = construct_permutation(compute_jth_inversion_sequence(len(self._kinds[kind]), j))
+            orders.append([self._kinds[kind][i] for i in permutation])
+
+        placed = [0] * len(self._kinds)
+        sequence = cast(List[List[int]], [])
+        state = self.__initial_state()
+        for _ in range(self._block.trials_per_sample()):
+            for (kind, signature, weight, following) in self._steps[state]:
+                block = weight * self._counts[following]
+                if path_number < block:
+                    (choice, path_number) = divmod(path_number, self._counts[following])
+                    instance = orders[kind][placed[kind]]
+                    placed[kind] += 1
+                    sequence.append(list(self._trials[instance][signature][choice]))
+                    state = following
+                    break
+                path_number -= block
+
+        self.__add_transition_levels(sequence)
+        return sequence
+
+    def __validate(self) -> None:
+        block = self._block
+        if not isinstance(block, FullyCrossBlock):
+            raise UnsupportedDesignError("only fully crossed blocks are supported.")
+        if any(f.has_complex_window for f in block.crossing[0]):
+            raise UnsupportedDesignError("crossings with complex windows are not supported.")
+        for f in block.design:
+            if not isinstance(f, DerivedFactor):
+                continue
+            window = f.first_level.window
+            if any(a.has_complex_window for a in window.args):
+                raise UnsupportedDesignError(f"{f.factor_name} depends on a factor with a complex window.")
+            if f.has_complex_window and (window.width != 2 or window.stride != 1):
+                raise UnsupportedDesignError(f"the window of {f.factor_name} is not a transition.")
+        for c in block.constraints:
+            if not isinstance(c, (FullyCross, Consistency, Derivation, Exclude,
+                                  AtMostKInARow, AtLeastKInARow, ExactlyKInARow)):
+                raise UnsupportedDesignError(f"{type(c).__name__} constraints are not supported.")
+
+    def __run_levels(self) -> List[Tuple[int, int, int, type]]:
+        """The design factor index, level index, k, and type of each run-length constraint."""
+        run_levels = []
+        for c in self._block.constraints:
+            if isinstance(c, (AtMostKInARow, AtLeastKInARow, ExactlyKInARow)):
+                (f, l) = c.level
+                run_levels.append((self._block.design.index(f), f.levels.index(l), c.k, type(c)))
+        return run_levels
+
+    def __generate_trials(self) -> List[Dict[int, List[Tuple[int, ...]]]]:
+        """For each crossing instance, lists the trials (level indices of the design factors) it can appear in,
+        grouped by the signature of each trial's relevant levels. Crossing instances that cannot appear in any trial
+        are left out, as they are by the FullyCross constraint.
+        """
+        block = self._block
+        crossing = block.crossing[0]
+        uncrossed = [f for f in self._factors if f not in crossing and not isinstance(f, DerivedFactor)]
+        derived = [cast(DerivedFactor, f) for f in self._factors if isinstance(f, DerivedFactor)]
+        total = np.prod([len(f.levels) for f in crossing + uncrossed], dtype=np.float64)
+        if total > MAX_TRIALS:
+            raise UnsupportedDesignError(f"the design has more than {MAX_TRIALS} distinct trials.")
+
+        design_index = [block.design.index(f) for f in self._factors]
+        trials = []
+        for instance in product(*[range(len(f.levels)) for f in crossing]):
+            grouped = cast(Dict[int, List[Tuple[int, ...]]], {})
+            for completion in product(*[range(len(f.levels)) for f in uncrossed]):
+                levels = cast(Dict[Factor, int], dict(zip(crossing + uncrossed, instance + completion)))
+                if not self.__derive_levels(levels, derived):
+                    continue
+                trial = [-1] * len(block.design)
+                for f, l in levels.items():
+                    trial[block.design.index(f)] = l
+                if any((i, trial[i]) in self._excluded for i in design_index):
+                    continue
+                signature = self.__signature(trial)
+                grouped.setdefault(signature, []).append(tuple(trial))
+            if grouped:
+                trials.append(grouped)
+
+        if len(trials) != block.trials_per_sample():
+            raise UnsupportedDesignError("the crossing instances do not fill the trials exactly once.")
+        return trials
+
+    @staticmethod
+    def __derive_levels(levels: Dict[Factor, int], derived: List[DerivedFactor]) -> bool:
+        """Adds the levels of the derived factors without complex windows to the levels of a trial. Returns whether
+        the trial is consistent: every derived factor has a level, which is the crossed level if it is crossed.
+        """
+        pending = list(derived)
+        while pending:
+            remaining = []
+            for f in pending:
+                args = f.first_level.window.args
+                if any(a not in levels for a in args):
+                    remaining.append(f)
+                    continue
+                index = f.derived_level_index([levels[a] for a in args])
+                if index < 0 or levels.get(f, index) != index:
+                    return False
+                levels[f] = index
+            if len(remaining) == len(pending):
+                f = remaining[0]
+                missing = next(a for a in f.first_level.window.args if a not in levels)
+                raise UnsupportedDesignError(f"{f.factor_name} depends on {missing.factor_name}, "
+                                             "which does not have a level in each trial.")
+            pending = remaining
+        return True
+
+    def __signature(self, trial: List[int]) -> int:
+        """Numbers the distinct combinations of the levels that transitions and run-length constraints depend on."""
+        signature = (tuple(trial[self._block.design.index(self._factors[a])] for a in self._arguments),
+                     tuple(trial[f] == l for (f, l, _, _) in self._run_levels))
+        return self._signatures.setdefault(signature, len(self._signatures))
+
+    def __initial_state(self) -> tuple:
+        return (tuple(len(instances) for instances in self._kinds), None, (0,) * len(self._run_levels))
+
+    def __transition_levels(self, previous: Optional[tuple], current: tuple) -> Optional[List[int]]:
+        """The levels of the transition factors between two trials, given by the levels of the factors the
+        transitions depend on. Returns ``None`` if a transition has no level or an excluded level.
+        """
+        if previous is None:
+            return [-1] * len(self._transitions)
+        arguments = {a: n for n, a in enumerate(self._arguments)}
+        levels = []
+        for f in self._transitions:
+            window_levels = []
+            for a in f.first_level.window.factors[::2]:
+                n = arguments[self._factor_index[a]]
+                window_levels += [previous[n], current[n]]
+            index = f.derived_level_index(window_levels)
+            if index < 0 or (self._block.design.index(f), index) in self._excluded:
+                return None
+            levels.append(index)
+        return levels
+
+    def __next_state(self, state: tuple, kind: int, signature: int) -> Optional[tuple]:
+        (remaining, previous, runs) = state
+        (arguments, in_runs) = self._signature_values[signature]
+        transition_levels = self.__transition_levels(previous, arguments)
+        if transition_levels is None:
+            return None
+
+        next_runs = []
+        for n, ((f, l, k, kind_of_run), run) in enumerate(zip(self._run_levels, runs)):
+            if f in self._transition_indices:
+                in_run = transition_levels[self._transition_indices.index(f)] == l
+            else:
+                in_run = in_runs[n]
+            if in_run:
+                run += 1
+                if run > k:
+                    if kind_of_run is not AtLeastKInARow:
+                        return None
+                    run = k
+            else:
+                if 0 < run < k and kind_of_run is not AtMostKInARow:
+                    return None
+                run = 0
+            next_runs.append(run)
+
+        next_remaining = list(remaining)
+        next_remaining[kind] -= 1
+        return (tuple(next_remaining), arguments, tuple(next_runs))
+
+    def __is_final(self, state: tuple) -> bool:
+        (_, _, runs) = state
+        return all(run == 0 or run >= k or kind_of_run is AtMostKInARow
+                   for ((_, _, k, kind_of_run), run) in zip(self._run_levels, runs))
+
+    def __count_paths(self) -> int:
+        """Counts the sequences of kinds and signatures, weighted by the number of trials with each signature, from
+        the initial state to a final state.
+        """
+        # Find the states reachable from the initial state, one trial at a time.
+        layers = [[self.__initial_state()]]
+        for _ in range(self._block.trials_per_sample()):
+            layer = cast(Dict[tuple, None], {})
+            for state in layers[-1]:
+                steps = []
+                for kind, left in enumerate(state[0]):
+                    if not left:
+                        continue
+                    for (signature, weight) in self._kind_profiles[kind]:
+                        following = self.__next_state(state, kind, signature)
+                        if following is not None:
+                            steps.append((kind, signature, weight, following))
+                            layer[following] = None
+                self._steps[state] = steps
+                if len(self._steps) > MAX_STATES:
+                    raise UnsupportedDesignError(f"counting the solutions needs more than {MAX_STATES} states.")
+            layers.append(list(layer))
+
+        # Count the paths from the last trial back to the first.
+        for state in layers[-1]:
+            self._counts[state] = 1 if self.__is_final(state) else 0
+        for layer_states in reversed(layers[:-1]):
+            for state in layer_states:
+                self._counts[state] = sum(weight * self._counts[following]
+                                          for (_, _, weight, following) in self._steps[state])
+        return self._counts[self.__initial_state()]
+
+    def __add_transition_levels(self, sequence: List[List[int]]) -> None:
+        arguments = [self._block.design.index(self._factors[a]) for a in self._arguments]
+        previous = None
+        for trial in sequence:
+            current = tuple(trial[i] for i in arguments)
+            for f, level in zip(self._transitions, cast(List[int], self.__transition_levels(previous, current))):
+                trial[self._block.design.index(f)] = level
+            previous = current
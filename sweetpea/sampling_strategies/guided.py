@@ -1,14 +1,12 @@
 import os
 import numpy as np
 
-from functools import reduce
 from itertools import product, chain
 from time import time
-from typing import List, cast
+from typing import Callable, List, Optional, cast
 
 from sweetpea.blocks import Block
-from sweetpea.core import CNF, cnf_is_satisfiable
-from sweetpea.logic import And, cnf_to_json
+from sweetpea.core import CNF, SolverSession
 from sweetpea.sampling_strategies.base import SamplingStrategy, SamplingResult
 from sweetpea.server import build_cnf
 
@@ -23,7 +21,7 @@ because trial selections early on can prune the remaining search space unevenly.
 class GuidedSamplingStrategy(SamplingStrategy):
 
     @staticmethod
-    def sample(block: Block, sample_count: int) -> SamplingResult:
+    def sample(block: Block, sample_count: int, *, seed: Optional[int] = None) -> SamplingResult:
 
         samples = cast(List[dict], [])
         metrics = cast(dict, {
@@ -35,11 +33,14 @@ class GuidedSamplingStrategy(SamplingStrategy):
         # Build the full CNF for this block
         cnf = build_cnf(block)
 
+        # Trials are chosen with the global numpy state unless a seed is given.
+        randint = np.random.RandomState(seed).randint if seed is not None else np.random.randint
+
         metrics['solver_call_count'] = 0
         for _ in range(sample_count):
             sample_metrics = cast(dict, {})
             t_start = time()
-            samples.append(GuidedSamplingStrategy.__generate_sample(block, cnf, sample_metrics))
+            samples.append(GuidedSamplingStrategy.__generate_sample(block, cnf, sample_metrics, randint))
             sample_metrics['time'] = time() - t_start
             metrics['sample_metrics'].append(sample_metrics)
             metrics['solver_call_count'] += sample_metrics['solver_call_count']
@@ -51,11 +52,12 @@ class GuidedSamplingStrategy(SamplingStrategy):
 
 
     @staticmethod
-    def __generate_sample(block: Block, cnf: CNF, sample_metrics: dict) -> dict:
+    def __generate_sample(block: Block, cnf: CNF, sample_metrics: dict, randint: Callable[[int, int], int]) -> dict:
         sample_metrics['trials'] = []
 
-        # Start a 'committed' list of CNFs
-        committed = cast(List[And], [])
+        # Load the CNF into a solver session once; committed trials become permanent units
+        # and each candidate is only assumed for its own check.
+        session = SolverSession(cnf)
 
         for trial_number in range(block.trials_per_sample()):
             trial_start_time = time()
@@ -82,8 +84,7 @@ class GuidedSamplingStrategy(SamplingStrategy):
                 unsat = []
                 for v in flat_vars:
                     t_start = time()
-                    full_cnf = cnf + CNF(cnf_to_json(committed)) + CNF(cnf_to_json([And([v])]))
-                    allowed = cnf_is_satisfiable(full_cnf)
+                    allowed = session.is_satisfiable([v])
                     duration_seconds = time() - t_start
                     solver_calls.append({'time': duration_seconds, 'SAT': allowed})
                     if not allowed:
@@ -106,8 +107,7 @@ class GuidedSamplingStrategy(SamplingStrategy):
             allowed_trials = []
             for potential_trial in potential_trials:
                 start_time = time()
-                full_cnf = cnf + CNF(cnf_to_json(committed)) + CNF(cnf_to_json([And(potential_trial)]))
-                allowed = cnf_is_satisfiable(full_cnf)
+                allowed = session.is_satisfiable(potential_trial)
                 duration_seconds = time() - start_time
 
                 solver_calls.append({'time': duration_seconds, 'SAT': allowed})
@@ -121,8 +121,8 @@ class GuidedSamplingStrategy(SamplingStrategy):
 
             # Randomly sample a single trial from the uniform distribution of the allowed trials,
             # and commit that trial to the committed sequence.
-            trial_idx = np.random.randint(0, len(allowed_trials))
-            committed.append(And(allowed_trials[trial_idx]))
+            trial_idx = randint(0, len(allowed_trials))
+            session.commit(allowed_trials[trial_idx])
 
             trial_metrics['time'] = time() - trial_start_time
 
@@ -131,13 +131,8 @@ class GuidedSamplingStrategy(SamplingStrategy):
         for tm in sample_metrics['trials']:
             sample_metrics['solver_call_count'] += tm['solver_call_count']
 
-        # Flatten the committed trials into a list of integers and decode it.
-        solution = GuidedSamplingStrategy.__committed_to_solution(committed)
-        return SamplingStrategy.decode(block, solution)
-
-    @staticmethod
-    def __committed_to_solution(committed: List[And]) -> List[int]:
-        return reduce(lambda sol, clause: sol + clause.input_list, committed, [])
+        # The committed units are the chosen trials, one after another.
+        return SamplingStrategy.decode(block, session.committed)
 
     @staticmethod
     def __prefilter_enabled():
@@ -1,4 +1,4 @@
-from typing import List, cast
+from typing import List, Optional, cast
 
 from sweetpea.sampling_strategies.base import SamplingStrategy, SamplingResult
 from sweetpea.blocks import Block
@@ -6,12 +6,13 @@ from sweetpea.core import CNF, sample_non_uniform
 
 """
 This represents the non-uniform sampling strategy, in which we 'sample' just by using a SAT
-solver repeatedly to produce unique (but not uniform) samples.
+solver repeatedly to produce unique (but not uniform) samples. The samples do not depend on
+a seed.
 """
 class NonUniformSamplingStrategy(SamplingStrategy):
 
     @staticmethod
-    def sample(block: Block, sample_count: int) -> SamplingResult:
+    def sample(block: Block, sample_count: int, *, seed: Optional[int] = None) -> SamplingResult:
         backend_request = block.build_backend_request()
         if block.errors:
             for e in block.errors:
@@ -23,7 +24,7 @@ class NonUniformSamplingStrategy(SamplingStrategy):
                                        CNF(backend_request.get_cnfs_as_json()),
                                        backend_request.fresh - 1,
                                        block.variables_per_sample(),
-                                       backend_request.get_requests_as_generation_requests())
+                                       backend_request.ll_requests.generation_request_columns())
 
-        result = list(map(lambda s: SamplingStrategy.decode(block, s.assignment), solutions))
+        result = SamplingStrategy.decode_columnar(block, [s.assignment for s in solutions])
         return SamplingResult(result, {})
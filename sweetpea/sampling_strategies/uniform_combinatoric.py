@@ -1,17 +1,21 @@
+import multiprocessing
 import operator as op
 import random
 import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
 from functools import reduce
 from itertools import product
 from math import factorial
-from typing import List, cast, Tuple
+from typing import List, Optional, cast, Tuple
 
-from sweetpea.blocks import Block, FullyCrossBlock
-from sweetpea.combinatorics import extract_components, compute_jth_inversion_sequence, construct_permutation, compute_jth_combination
+from sweetpea.blocks import Block, FullyCrossBlock, MultipleCrossBlock
+from sweetpea.combinatorics import (
+    extract_components, compute_jth_inversion_sequence, construct_permutation, compute_jth_combination,
+    choose_distinct)
 from sweetpea.design_partitions import DesignPartitions
 from sweetpea.logic import And
-from sweetpea.primitives import get_external_level_name
+from sweetpea.primitives import DerivedLevel, Factor, get_external_level_name
 from sweetpea.sampling_strategies.base import SamplingStrategy, SamplingResult
 from sweetpea.constraints import Exclude, _KInARow, ExactlyKInARow, AtMostKInARow
 
@@ -38,13 +42,26 @@ class UniformCombinatoricSamplingStrategy(SamplingStrategy):
         return 'Uniform Combinatoric Sampling Strategy'
 
     @staticmethod
-    def sample(block: Block, sample_count: int) -> SamplingResult:
+    def sample(block: Block, sample_count: int, *, seed: Optional[int] = None, processes: int = 1) -> SamplingResult:
+        """Samples distinct sequences uniformly at random. Given a ``seed``,
+        the same sequences are returned in the same order whatever the number
+        of ``processes`` used to construct them.
+        """
         # 1. Validate the block. Only FullyCrossBlock, No complex windows allowed.
         UniformCombinatoricSamplingStrategy.__validate(block)
         metrics = {}
 
+        # Exclusions that remove entire crossings are reported as errors
+        # unless the block does not require a complete crossing.
+        block.trials_per_sample()
+        if block.errors:
+            for e in block.errors:
+                print(e)
+                if "WARNING" not in e:
+                    return SamplingResult([], {})
+
         # 2. Count how many solutions there are.
-        enumerator = UCSolutionEnumerator(cast(FullyCrossBlock, block))
+        enumerator = UCSolutionEnumerator(block)
         metrics['solution_count'] = enumerator.solution_count()
 
         # Select KInARow constraints to check for rejection sampling.
@@ -56,10 +73,9 @@ class UniformCombinatoricSamplingStrategy(SamplingStrategy):
         rejected = 0
         total_rejected = 0
         samples = cast(List[dict], [])
-        sequence_numbers = cast(List[int], [])
-        while sampled < sample_count:
-            solution_variables = enumerator.generate_random_sample(sequence_numbers)
-            sequence_numbers.append(solution_variables[0])
+        rng = random.Random(seed) if seed is not None else None
+        sequence_numbers = enumerator.generate_random_sequence_numbers(min(sample_count, enumerator.solution_count()), rng)
+        for sample in enumerator.generate_samples(sequence_numbers, processes):
             # sample = SamplingStrategy.decode(block, solution_variables)
 
             # if UniformCombinatoricSamplingStrategy.__are_constraints_violated(block, sample):
@@ -71,9 +87,7 @@ class UniformCombinatoricSamplingStrategy(SamplingStrategy):
             rejected = 0
             sampled += 1
 
-            samples.append(solution_variables[1])
-            if len(sequence_numbers) == enumerator.solution_count():
-                break
+            samples.append(sample)
 
         metrics['sample_count'] = sample_count
         metrics['total_rejected'] = total_rejected
@@ -81,6 +95,15 @@ class UniformCombinatoricSamplingStrategy(SamplingStrategy):
 
         return SamplingResult(samples, metrics)
 
+    @staticmethod
+    def supports(block: Block) -> bool:
+        """Whether the strategy can sample the given block."""
+        try:
+            UniformCombinatoricSamplingStrategy.__validate(block)
+        except ValueError:
+            return False
+        return True
+
     @staticmethod
     def __are_constraints_violated(block: Block, sample: dict) -> bool:
         constraints = cast(List[_KInARow], filter(lambda c: isinstance(c, _KInARow), block.constraints))
@@ -116,27 +139,60 @@ class UniformCombinatoricSamplingStrategy(SamplingStrategy):
 
     @staticmethod
     def __validate(block: Block) -> None:
-        if not isinstance(block, FullyCrossBlock):
-            raise ValueError('The uniform combinatoric sampling strategy currently only supports FullyCrossBlock.')
-
-        for c in block.constraints:
-            if isinstance(c, Exclude):
-                raise ValueError('The uniform combinatoric sampling strategy currently does not support Exclude constraints.')
+        if not isinstance(block, (FullyCrossBlock, MultipleCrossBlock)):
+            raise ValueError('The uniform combinatoric sampling strategy currently only supports FullyCrossBlock and MultipleCrossBlock.')
 
         for f in block.design:
             if f.has_complex_window:
                 raise ValueError('Found factor in design with complex window! Factor={} The uniform combinatoric sampling strategy currently does not support designs containing factors with complex windows. Sorry!'.format(f.factor_name))
 
+        if isinstance(block, MultipleCrossBlock):
+            UniformCombinatoricSamplingStrategy.__validate_crossings(block)
+
+    @staticmethod
+    def __validate_crossings(block: MultipleCrossBlock) -> None:
+        """Multiple crossings are supported when every crossing is nested in
+        the largest crossing, or has the same size and only adds basic factors
+        that are not shared with any other crossing nor used by its derived
+        factors.
+        """
+        if any(isinstance(c, Exclude) for c in block.constraints):
+            raise ValueError('The uniform combinatoric sampling strategy does not support Exclude constraints with multiple crossings.')
+
+        partitions = DesignPartitions(block)
+        crossed = partitions.get_crossed_factors()
+        source_factors = partitions.get_source_factors()
+        added = cast(List[Factor], [])
+        for c in partitions.get_secondary_crossings():
+            names = ', '.join(f.factor_name for f in c)
+            if partitions.crossing_size(c) != partitions.crossing_size(crossed):
+                raise ValueError('The crossing of {} is neither nested in the largest crossing nor the same size. The uniform combinatoric sampling strategy does not support such crossings.'.format(names))
+            for f in c:
+                if f in crossed:
+                    continue
+                if f.is_derived() or f in source_factors or f in added:
+                    raise ValueError('Factor {} in the crossing of {} must be a basic factor that only appears in that crossing for the uniform combinatoric sampling strategy.'.format(f.factor_name, names))
+                added.append(f)
+
 
 """
 Given a fully crossed block with no complex windows, this class stores the data structures and logic for enumerating
 valid trial sequences in the design.
+
+A multiple-crossed block is enumerated through its largest crossing. Crossings nested in it are implied by it. Each
+other crossing of the same size shares some factors with it and adds basic factors of its own, so every combination
+of the shared levels appears in as many trials as there are combinations of the added levels, and these are matched
+up by a permutation.
 """
 class UCSolutionEnumerator():
 
-    def __init__(self, block: FullyCrossBlock) -> None:
+    def __init__(self, block: Block) -> None:
         self._block = block
         self._partitions = DesignPartitions(block)
+        self._excluded_levels = set(block.exclude)
+        self._source_factors = self.__source_factors()
+        self._independent_factors = [f for f in self._partitions.get_uncrossed_basic_factors()
+                                     if f not in self._source_factors]
         self._crossing_instances = self.__generate_crossing_instances()
         self._source_combinations = self.__generate_source_combinations()
         self._segment_lengths = cast(List[int], []) # Will be populated by solution counting
@@ -146,6 +202,13 @@ class UCSolutionEnumerator():
         # list are allowed.
         self._valid_source_combinations_indices = cast(List[List[int]], []) # Will be populated by solution counting
 
+        # The levels of each independent basic factor that are not excluded.
+        self._allowed_independent_levels = cast(List[list], []) # Will be populated by solution counting
+
+        # The shared factors, the combinations of their levels, and the combinations of the levels of the added
+        # factors for each secondary crossing.
+        self._secondary_crossings = self.__generate_secondary_crossings()
+
         # Needs to be called last.
         self._solution_count = self.__count_solutions()
 
@@ -159,6 +222,37 @@ class UCSolutionEnumerator():
             sequence_number = random.randrange(0, self._solution_count)
         return (sequence_number, self.generate_sample(sequence_number))
 
+    def generate_random_sequence_numbers(self, count: int, rng: Optional[random.Random] = None) -> List[int]:
+        """Draws ``count`` distinct sequence numbers uniformly at random, in a
+        random order. ``count`` cannot exceed the number of solutions.
+        """
+        return choose_distinct(self._solution_count, count, rng)
+
+    def generate_random_samples(self, count: int, rng: Optional[random.Random] = None) -> List[Tuple[int, dict]]:
+        """Generates ``count`` distinct samples uniformly at random, along with
+        their sequence numbers.
+        """
+        sequence_numbers = self.generate_random_sequence_numbers(count, rng)
+        return list(zip(sequence_numbers, self.generate_samples(sequence_numbers)))
+
+    def generate_samples(self, sequence_numbers: List[int], processes: int = 1) -> List[dict]:
+        """Generates the samples with the given sequence numbers, in order.
+        With more than one process, each worker process generates the samples
+        for a contiguous part of the sequence numbers.
+        """
+        if processes < 2 or len(sequence_numbers) < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [self.generate_sample(n) for n in sequence_numbers]
+
+        global _parallel_enumerator
+        part_size = -(-len(sequence_numbers) // processes)
+        parts = [sequence_numbers[i:i + part_size] for i in range(0, len(sequence_numbers), part_size)]
+        _parallel_enumerator = self
+        try:
+            with ProcessPoolExecutor(len(parts), mp_context=multiprocessing.get_context('fork')) as executor:
+                return [sample for part in executor.map(_generate_parallel_samples, parts) for sample in part]
+        finally:
+            _parallel_enumerator = None
+
     def generate_sample(self, sequence_number: int) -> dict:
         trial_values = self.generate_trail_values(sequence_number)
 
@@ -191,7 +285,7 @@ class UCSolutionEnumerator():
 
         # 2. Generate the inversion sequence for the selected permutation number.
         #    Use the inversion sequence to construct the permutation.
-        l = self._block.crossing_size()
+        l = len(self._crossing_instances)
         inversion_sequence = compute_jth_inversion_sequence(l, components[0])
         permutation_indices = construct_permutation(inversion_sequence)
         permutation = list(map(lambda i: self._crossing_instances[i], permutation_indices))
@@ -203,35 +297,58 @@ class UCSolutionEnumerator():
             source_combination_index_for_component = self._valid_source_combinations_indices[p][component_for_p]
             source_combinations.append(self._source_combinations[source_combination_index_for_component])
 
-        # 4. Generate the combinations for independent basic factors
+        # 4. Generate the combinations for independent basic factors, each of which has its own component.
         independent_factor_combinations = cast(List[dict], [{}] *l)
-        u_b_i = self._partitions.get_uncrossed_basic_independent_factors()
-        if u_b_i:
-            independent_combination_idx = components[l+1]
-            for f in u_b_i:
-                combo = compute_jth_combination(l, len(f.levels), independent_combination_idx)
-                for i in range(l):
-                    if not independent_factor_combinations[i]:
-                        independent_factor_combinations[i] = {f : f.levels[combo[i]]}
-                        continue
-                    independent_factor_combinations[i][f] = f.levels[combo[i]]
-
-        # 5. Merge the selected levels gathered so far to facilitate computing the uncrossed derived factor levels.
+        for f_idx, f in enumerate(self._independent_factors):
+            levels = self._allowed_independent_levels[f_idx]
+            combo = compute_jth_combination(l, len(levels), components[l + 1 + f_idx])
+            for i in range(l):
+                if not independent_factor_combinations[i]:
+                    independent_factor_combinations[i] = {f : levels[combo[i]]}
+                    continue
+                independent_factor_combinations[i][f] = levels[combo[i]]
+
+        # 5. Match the levels of the factors added by secondary crossings to the trials with each shared combination,
+        #    each shared combination having its own component.
+        secondary_combinations = cast(List[dict], [{} for _ in range(l)])
+        c_idx = l + 1 + len(self._independent_factors)
+        for (shared, shared_combinations, added_combinations) in self._secondary_crossings:
+            for shared_combination in shared_combinations:
+                trials = [t for t in range(l) if all(permutation[t][f] == level for f, level in shared_combination.items())]
+                added_permutation = construct_permutation(compute_jth_inversion_sequence(len(trials), components[c_idx]))
+                for t, a in zip(trials, added_permutation):
+                    secondary_combinations[t].update(added_combinations[a])
+                c_idx += 1
+
+        # 6. Merge the selected levels gathered so far to facilitate computing the uncrossed derived factor levels.
         trial_values = cast(List[dict], [{}] * l)
         for t in range(l):
-            trial_values[t] = {**permutation[t], **source_combinations[t], **independent_factor_combinations[t]}
+            trial_values[t] = {**permutation[t], **source_combinations[t], **independent_factor_combinations[t],
+                               **secondary_combinations[t]}
 
-        # 6. Generate uncrossed derived level values
-        u_d = self._partitions.get_uncrossed_derived_factors()
-        for f in u_d:
-            for t in range(l):
-                # For each level in the factor, see if the derivation function is true.
-                for level in f.levels:
-                    if level.window.fn(*[(trial_values[t][f]).name for f in level.window.args]):
-                        trial_values[t][f] = level
+        # 7. Generate uncrossed derived level values
+        for t in range(l):
+            self.__add_uncrossed_derived_levels(trial_values[t])
 
         return trial_values
 
+    def __add_uncrossed_derived_levels(self, trial_value: dict) -> None:
+        for f in self._partitions.get_uncrossed_derived_factors():
+            # Look up the level derived from the levels of this trial.
+            level = f.get_derived_level([trial_value[arg] for arg in f.first_level.window.args])
+            if level is not None:
+                trial_value[f] = level
+
+    def __is_excluded(self, trial_value: dict) -> bool:
+        """Determines whether the levels of a trial, including the uncrossed
+        derived levels that follow from them, include an excluded level.
+        """
+        if not self._excluded_levels:
+            return False
+        trial_value = dict(trial_value)
+        self.__add_uncrossed_derived_levels(trial_value)
+        return any(pair in self._excluded_levels for pair in trial_value.items())
+
     """
     Generates all the crossings, indexed by factor name for easy lookup later.
     [
@@ -244,43 +361,106 @@ class UCSolutionEnumerator():
         level_lists = [list(f.levels) for f in crossing]
         return [{crossing[i]: level for i,level in enumerate(levels)} for levels in product(*level_lists)]
 
+    """
+    The uncrossed basic factors whose levels are chosen together with each crossing instance: those the derived
+    factors in the crossing depend on, and those that excluded derived levels depend on. The levels of the other
+    uncrossed basic factors can be chosen independently.
+    """
+    def __source_factors(self) -> List[Factor]:
+        source_factors = self._partitions.get_uncrossed_basic_source_factors()
+        pending = [f for (f, _) in self._excluded_levels if f.is_derived()]
+        seen = set(pending)
+        while pending:
+            for f in cast(DerivedLevel, pending.pop().first_level).window.args:
+                if f.is_derived() and f not in seen:
+                    seen.add(f)
+                    pending.append(f)
+                elif not f.is_derived() and f not in source_factors and f not in self._partitions.get_crossed_factors():
+                    source_factors.append(f)
+        # Keep the factors in design order so that the enumeration does not depend on the order of the exclusions.
+        return [f for f in self._block.design if f in source_factors]
+
+    def __generate_secondary_crossings(self) -> List[Tuple[List[Factor], List[dict], List[dict]]]:
+        crossed = self._partitions.get_crossed_factors()
+        secondary_crossings = []
+        for c in self._partitions.get_secondary_crossings():
+            shared = [f for f in c if f in crossed]
+            added = [f for f in c if f not in crossed]
+            secondary_crossings.append((shared,
+                                        [dict(zip(shared, levels)) for levels in product(*[f.levels for f in shared])],
+                                        [dict(zip(added, levels)) for levels in product(*[f.levels for f in added])]))
+        return secondary_crossings
+
     def __generate_source_combinations(self) -> List[dict]:
-        ubs = self._partitions.get_uncrossed_basic_source_factors()
+        ubs = self._source_factors
         level_lists = [list(f.levels) for f in ubs]
         return [{ubs[i]: level for i,level in enumerate(levels)} for levels in product(*level_lists)]
 
     def __count_solutions(self):
         self._segment_lengths = []
-        ##############################################################
-        # Permutations of crossing instances
-        n = self._block.crossing_size()
-        n_factorial = factorial(n)
-        self._segment_lengths.append(n_factorial)
-
         ##############################################################
         # Uncrossed Dependent Factors
         level_combinations = self.__generate_source_combinations()
 
         # Keep only allowed combos for each permutation
+        crossed_derived = self._partitions.get_crossed_factors_derived()
+        crossing_instances = cast(List[dict], [])
         for ci in self._crossing_instances:
             sc_indices = list(range(len(self._source_combinations)))
+            excluded_count = 0
             for sc_idx, sc in enumerate(self._source_combinations):
-                # Apply the derivation fn for each DF in the crossing for this instance and make sure it returns
-                # true for this level combination. If it doesn't, then remove this combination.
+                # Look up the level each DF in the crossing derives from this level combination, and make sure it is
+                # the level in this crossing instance. If it isn't, then remove this combination.
                 merged_levels = {**ci, **sc}
-                for df in self._partitions.get_crossed_factors_derived():
-                    w = merged_levels[df].window
-                    if not w.fn(*[(merged_levels[f]).name for f in w.args]):
+                for df in crossed_derived:
+                    if df.get_derived_level([merged_levels[f] for f in df.first_level.window.args]) != merged_levels[df]:
                         sc_indices.remove(sc_idx)
+                        break
+                else:
+                    # Combinations that lead to an excluded level are removed as well.
+                    if self.__is_excluded(merged_levels):
+                        sc_indices.remove(sc_idx)
+                        excluded_count += 1
+
+            # Crossing instances that cannot appear only because of exclusions are left out of the crossing, as they
+            # are by the FullyCross constraint. Instances that the derivations rule out on their own stay, and leave
+            # no solutions.
+            if excluded_count and excluded_count == len(self._source_combinations):
+                continue
 
+            crossing_instances.append(ci)
             self._segment_lengths.append(len(sc_indices))
             self._valid_source_combinations_indices.append(sc_indices)
+        self._crossing_instances = crossing_instances
+        if len(self._crossing_instances) != self._block.trials_per_sample():
+            raise ValueError("The crossing instances do not fill the trials exactly once.")
+
+        ##############################################################
+        # Permutations of crossing instances
+        n = len(self._crossing_instances)
+        n_factorial = factorial(n)
+        self._segment_lengths.insert(0, n_factorial)
 
         ##############################################################
         # Uncrossed Independent Factors
-        u_b_i_counts = []
-        u_b_i = self._partitions.get_uncrossed_basic_independent_factors()
-        for f in u_b_i:
-            self._segment_lengths.append(pow(len(f.levels), n))
+        for f in self._independent_factors:
+            levels = [l for l in f.levels if (f, l) not in self._excluded_levels]
+            self._allowed_independent_levels.append(levels)
+            self._segment_lengths.append(pow(len(levels), n))
+
+        ##############################################################
+        # Factors Added by Secondary Crossings
+        for (_, shared_combinations, added_combinations) in self._secondary_crossings:
+            self._segment_lengths += [factorial(len(added_combinations))] * len(shared_combinations)
 
         return reduce(op.mul, self._segment_lengths, 1)
+
+
+# The enumerator whose samples are being generated by forked worker processes.
+# Workers inherit it from the parent process, so derivation predicates do not
+# need to be picklable.
+_parallel_enumerator: Optional[UCSolutionEnumerator] = None
+
+
+def _generate_parallel_samples(sequence_numbers: List[int]) -> List[dict]:
+    return [cast(UCSolutionEnumerator, _parallel_enumerator).generate_sample(n) for n in sequence_numbers]
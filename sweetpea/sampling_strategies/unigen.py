@@ -3,11 +3,11 @@ from sweetpea.constraints import minimum_trials
 from tqdm import tqdm
 import sys
 
-from typing import List, cast
+from typing import List, Optional, cast
 
 from sweetpea.sampling_strategies.base import SamplingStrategy, SamplingResult
 from sweetpea.blocks import Block
-from sweetpea.core import sample_uniform, CNF
+from sweetpea.core import sample_uniform, CNF, Var
 
 """
 This strategy relies fully on Unigen to produce the desired number of samples.
@@ -15,7 +15,7 @@ This strategy relies fully on Unigen to produce the desired number of samples.
 class UnigenSamplingStrategy(SamplingStrategy):
 
     @staticmethod
-    def sample(block: Block, sample_count: int, min_search: bool=False) -> SamplingResult:
+    def sample(block: Block, sample_count: int, min_search: bool=False, *, seed: Optional[int] = None) -> SamplingResult:
 
         backend_request = block.build_backend_request()
         if block.errors:
@@ -24,13 +24,18 @@ class UnigenSamplingStrategy(SamplingStrategy):
                 if "WARNING" not in e:
                     return SamplingResult([], {})
 
+        # Unigen only has to sample the basic levels that are not implied by
+        # the others; the remaining levels are recovered when decoding.
+        support = block.independent_support()
         solutions = sample_uniform(
             sample_count,
             CNF(backend_request.get_cnfs_as_json()),
             backend_request.fresh - 1,
             block.variables_per_sample(),
-            backend_request.get_requests_as_generation_requests(),
-            False)
+            backend_request.ll_requests.generation_request_columns(),
+            False,
+            [Var(v) for v in support] if support else None,
+            seed)
 
         # This section deals with the problem caused by a corner case created
         # by at_least_k_in_a_row_constraint. I.e. in some cases this cotnraint
@@ -61,7 +66,7 @@ class UnigenSamplingStrategy(SamplingStrategy):
                         c.validate(block)
                         c.apply(block, None)
                         block.constraints.append(c)
-                        res = UnigenSamplingStrategy.sample(block, sample_count, True)
+                        res = UnigenSamplingStrategy.sample(block, sample_count, True, seed=seed)
                         progress.update(1)
                         if res.samples:
                             if current_constraint <= min_constraint:
@@ -82,5 +87,5 @@ class UnigenSamplingStrategy(SamplingStrategy):
                 else:
                     return SamplingResult([], {})
 
-        result = list(map(lambda s: SamplingStrategy.decode(block, s.assignment), solutions))
+        result = SamplingStrategy.decode_columnar(block, block.expand_support([s.assignment for s in solutions]))
         return SamplingResult(result, {})
\ No newline at end of file
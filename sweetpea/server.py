@@ -17,7 +17,7 @@ def build_cnf(block: Block) -> CNF:
         cnf,
         backend_request.fresh - 1,
         block.variables_per_sample(),
-        backend_request.get_requests_as_generation_requests())
+        backend_request.ll_requests.generation_request_columns())
     return combined_cnf
 
 
@@ -28,5 +28,5 @@ def is_cnf_still_sat(block: Block, additional_clauses: List[And]) -> bool:
         cnf,
         backend_request.fresh - 1,
         block.variables_per_sample(),
-        backend_request.get_requests_as_generation_requests())
+        backend_request.ll_requests.generation_request_columns())
     return cnf_is_satisfiable(combined_cnf)
@@ -1,10 +1,13 @@
 import operator as op
 import pytest
 
+import numpy as np
+
 from random import shuffle
 
-from sweetpea.sampling_strategies.base import SamplingStrategy
-from sweetpea import fully_cross_block
+from sweetpea.sampling_strategies.base import ColumnarExperiments, SamplingStrategy
+from sweetpea import fully_cross_block, synthesize_trials
+from sweetpea.sampling_strategies.uniform_combinatoric import UniformCombinatoricSamplingStrategy
 from sweetpea.primitives import Factor, DerivedLevel, WithinTrial, Transition, Window
 
 
@@ -147,3 +150,102 @@ def test_decode_with_transition_and_only_positive_variables():
     assert decoded['color'] ==          ['blue', 'red',  'red', 'blue']
     assert decoded['text']  ==          ['red',  'blue', 'red', 'blue']
     assert decoded['color repeats?'] == ['',     'no',   'yes', 'no'  ]
+
+
+def test_decode_batch():
+    block = fully_cross_block([color, text, color_repeats_factor, congruent_bookend],
+                              [color, text],
+                              [])
+
+    solutions = [[ 1,  -2,  3,  -4,
+                   5,  -6, -7,   8,
+                  -9,  10,  11, -12,
+                  -13, 14, -15,  16,
+                   17, -18, -19, 20, 21, -22,
+                   23, -24,  25, -26],
+                 [ 1,  -2,  -3,   4,
+                  -5,   6,   7,  -8,
+                  -9,   10, -11,  12,
+                   13, -14,  15, -16,
+                  -17,  18,  19, -20, -21, 22,
+                  -23,  24,  25, -26]]
+    expected = [{
+        'color':              ['red', 'red',  'blue', 'blue'],
+        'text':               ['red', 'blue', 'red',  'blue'],
+        'color repeats?':     ['',    'yes',  'no',   'yes' ],
+        'congruent bookend?': ['yes', '',     '',     'yes' ]
+    }, {
+        'color':              ['red',  'blue', 'blue', 'red'],
+        'text':               ['blue', 'red',  'blue', 'red'],
+        'color repeats?':     ['',     'no',   'yes',  'no' ],
+        'congruent bookend?': ['no',   '',     '',     'yes']
+    }]
+
+    assert SamplingStrategy.decode_batch(block, solutions) == expected
+    assert SamplingStrategy.decode_batch(block, np.array(solutions) > 0) == expected
+    assert [SamplingStrategy.decode(block, s) for s in solutions] == expected
+
+
+def test_decode_columnar():
+    block = fully_cross_block([color, text, color_repeats_factor, congruent_bookend],
+                              [color, text],
+                              [])
+
+    solutions = [[ 1,  -2,  3,  -4,
+                   5,  -6, -7,   8,
+                  -9,  10,  11, -12,
+                  -13, 14, -15,  16,
+                   17, -18, -19, 20, 21, -22,
+                   23, -24,  25, -26]]
+    experiments = SamplingStrategy.decode_columnar(block, solutions)
+
+    assert experiments.factor_names == ['color', 'text', 'color repeats?', 'congruent bookend?']
+    assert experiments.level_names == [['red', 'blue'], ['red', 'blue'], ['yes', 'no'], ['yes', 'no']]
+    assert experiments.codes.dtype == np.int8
+    assert experiments.codes.tolist() == [[[0,  0, -1,  0],
+                                           [0,  1,  0, -1],
+                                           [1,  0,  1, -1],
+                                           [1,  1,  0,  0]]]
+
+    expected = {
+        'color':              ['red', 'red',  'blue', 'blue'],
+        'text':               ['red', 'blue', 'red',  'blue'],
+        'color repeats?':     ['',    'yes',  'no',   'yes' ],
+        'congruent bookend?': ['yes', '',     '',     'yes' ]
+    }
+    assert len(experiments) == 1
+    assert experiments[0] == expected
+    assert list(experiments) == [expected]
+    assert experiments.to_dicts() == [expected]
+    assert ColumnarExperiments.from_dicts(block, [expected]).codes.tolist() == experiments.codes.tolist()
+
+
+def test_synthesize_trials_columnar():
+    block = fully_cross_block([color, text, con_factor], [color, text], [])
+
+    experiments = synthesize_trials(block, 3, UniformCombinatoricSamplingStrategy, columnar=True)
+
+    assert isinstance(experiments, ColumnarExperiments)
+    assert experiments.codes.shape == (3, 4, 3)
+    for e in experiments:
+        assert sorted(zip(e['color'], e['text'])) == [('blue', 'blue'), ('blue', 'red'), ('red', 'blue'), ('red', 'red')]
+        assert e['congruent?'] == ['con' if c == t else 'inc' for c, t in zip(e['color'], e['text'])]
+
+
+class SequentialSamplingStrategy(SamplingStrategy):
+    """A strategy whose sample method does not take a number of processes."""
+
+    @staticmethod
+    def sample(block, sample_count, *, seed=None):
+        return UniformCombinatoricSamplingStrategy.sample(block, sample_count, seed=seed)
+
+
+def test_synthesize_trials_processes():
+    block = fully_cross_block([color, text, con_factor], [color, text], [])
+
+    # Strategies that do not support processes ignore them.
+    experiments = synthesize_trials(block, 2, SequentialSamplingStrategy, seed=1, processes=2)
+    assert experiments == synthesize_trials(block, 2, SequentialSamplingStrategy, seed=1)
+
+    experiments = synthesize_trials(block, 2, UniformCombinatoricSamplingStrategy, seed=1, processes=2)
+    assert experiments == synthesize_trials(block, 2, UniformCombinatoricSamplingStrategy, seed=1)
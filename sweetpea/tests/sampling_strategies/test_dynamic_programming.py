@@ -0,0 +1,145 @@
+import operator as op
+import pytest
+
+from sweetpea import fully_cross_block, synthesize_trials_uniform
+from sweetpea.primitives import Factor, DerivedLevel, WithinTrial, Transition, Window
+from sweetpea.constraints import (
+    AtLeastKInARow, AtMostKInARow, Exclude, MinimumTrials, at_most_k_in_a_row, exactly_k_in_a_row)
+from sweetpea.sampling_strategies.dynamic_programming import (
+    DynamicProgrammingSamplingStrategy, DPSolutionEnumerator, UnsupportedDesignError)
+from sweetpea.sampling_strategies.base import SamplingResult
+from sweetpea.sampling_strategies.unigen import UnigenSamplingStrategy
+from sweetpea.tests.test_utils import get_level_from_name
+
+color = Factor("color", ["red", "blue"])
+text  = Factor("text",  ["red", "blue"])
+size  = Factor("size",  ["big", "small"])
+
+con_factor = Factor("congruent?", [
+    DerivedLevel("con", WithinTrial(op.eq, [color, text])),
+    DerivedLevel("inc", WithinTrial(op.ne, [color, text]))
+])
+
+color_repeats_factor = Factor("repeated color?", [
+    DerivedLevel("yes", Transition(lambda colors: colors[0] == colors[1], [color])),
+    DerivedLevel("no",  Transition(lambda colors: colors[0] != colors[1], [color]))
+])
+
+switch_factor = Factor("switch?", [
+    DerivedLevel("yes", Transition(lambda colors, sizes: colors[0] == colors[1] or sizes[1] == "big",
+                                   [color, size])),
+    DerivedLevel("no",  Transition(lambda colors, sizes: not (colors[0] == colors[1] or sizes[1] == "big"),
+                                   [color, size]))
+])
+
+con_repeats_factor = Factor("repeated congruency?", [
+    DerivedLevel("yes", Transition(lambda cons: cons[0] == cons[1], [con_factor])),
+    DerivedLevel("no",  Transition(lambda cons: cons[0] != cons[1], [con_factor]))
+])
+
+
+# The expected counts were checked by enumerating the solutions of the
+# corresponding CNF formulas.
+@pytest.mark.parametrize('design, crossing, constraints, expected_count', [
+    [[color, text, con_factor, color_repeats_factor], [color, text], [], 24],
+    [[color, text, size, switch_factor], [color, text], [], 384],
+    [[color, text, size, switch_factor], [color, text],
+     [AtMostKInARow(2, (switch_factor, get_level_from_name(switch_factor, "yes")))], 272],
+    [[color, text, size, switch_factor], [color, text],
+     [Exclude(switch_factor, get_level_from_name(switch_factor, "no"))], 112],
+    [[color, text, con_factor, con_repeats_factor], [color, text],
+     [AtLeastKInARow(2, (con_repeats_factor, get_level_from_name(con_repeats_factor, "yes")))], 8],
+    [[color, text, con_factor, con_repeats_factor], [color, text], [exactly_k_in_a_row(1, con_repeats_factor)], 16],
+    [[color, text, con_factor, color_repeats_factor], [color, con_factor],
+     [AtMostKInARow(1, (color_repeats_factor, get_level_from_name(color_repeats_factor, "yes")))], 24],
+    [[color, text, size], [color, text], [at_most_k_in_a_row(2, size)], 240],
+    [[color, text, size, switch_factor], [color, text], [AtLeastKInARow(2, (size, get_level_from_name(size, "big")))], 168],
+])
+def test_solution_count(design, crossing, constraints, expected_count):
+    block = fully_cross_block(design, crossing, constraints)
+    assert DPSolutionEnumerator(block).solution_count() == expected_count
+
+
+def test_generate_sample_satisfies_constraints():
+    block = fully_cross_block([color, text, size, switch_factor], [color, text],
+                              [AtMostKInARow(2, (switch_factor, get_level_from_name(switch_factor, "yes")))])
+    enumerator = DPSolutionEnumerator(block)
+
+    samples = [enumerator.generate_sample(n) for n in range(enumerator.solution_count())]
+    assert len(set(str(s) for s in samples)) == enumerator.solution_count()
+    for sample in samples:
+        assert sorted(zip(sample["color"], sample["text"])) == sorted(zip(["red", "red", "blue", "blue"],
+                                                                           ["red", "blue", "red", "blue"]))
+        assert sample["switch?"][0] == ""
+        for t in range(1, 4):
+            switch = sample["color"][t - 1] == sample["color"][t] or sample["size"][t] == "big"
+            assert sample["switch?"][t] == ("yes" if switch else "no")
+        assert "yes yes yes" not in " ".join(sample["switch?"])
+
+
+def test_generate_sequence_rejects_out_of_range_numbers():
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], [])
+    enumerator = DPSolutionEnumerator(block)
+
+    with pytest.raises(ValueError):
+        enumerator.generate_sequence(enumerator.solution_count())
+
+
+@pytest.mark.parametrize('design, crossing, constraints', [
+    [[color, text, color_repeats_factor], [color, color_repeats_factor], []],
+    [[color, text, Factor("congruent?", [
+        DerivedLevel("con", Window(lambda c, t: c[0] == t[2], [color, text], 3, 1)),
+        DerivedLevel("inc", Window(lambda c, t: c[0] != t[2], [color, text], 3, 1))
+     ])], [color, text], []],
+    [[color, text], [color, text], [MinimumTrials(8)]],
+])
+def test_unsupported_designs(design, crossing, constraints):
+    block = fully_cross_block(design, crossing, constraints)
+    with pytest.raises(UnsupportedDesignError):
+        DPSolutionEnumerator(block)
+
+
+def test_within_trial_factor_of_a_transition_is_unsupported():
+    repeat_or_red = Factor("repeat or red?", [
+        DerivedLevel("yes", WithinTrial(lambda r, c: r == "yes" or c == "red", [color_repeats_factor, color])),
+        DerivedLevel("no",  WithinTrial(lambda r, c: not (r == "yes" or c == "red"), [color_repeats_factor, color]))
+    ])
+    block = fully_cross_block([color, text, color_repeats_factor, repeat_or_red], [color, text], [])
+    with pytest.raises(UnsupportedDesignError, match="repeat or red\\? depends on a factor with a complex window"):
+        DPSolutionEnumerator(block)
+
+
+def test_sample_records_the_fallback(monkeypatch, capsys):
+    fallback = SamplingResult([], {})
+    monkeypatch.setattr(UnigenSamplingStrategy, 'sample', lambda block, sample_count, seed=None: fallback)
+    block = fully_cross_block([color, text], [color, text], [MinimumTrials(8)])
+    result = DynamicProgrammingSamplingStrategy.sample(block, 1)
+
+    assert result is fallback
+    assert 'MinimumTrials' in result.metrics['fallback']
+    assert capsys.readouterr().out == ""
+
+
+def test_sample():
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text],
+                              [AtMostKInARow(1, (color_repeats_factor, get_level_from_name(color_repeats_factor, "yes")))])
+    result = DynamicProgrammingSamplingStrategy.sample(block, 100)
+
+    assert result.metrics['solution_count'] == len(result.samples)
+    assert len(set(str(s) for s in result.samples)) == len(result.samples)
+
+
+def test_sample_is_deterministic_for_a_seed():
+    block = fully_cross_block([color, text, size, switch_factor], [color, text], [])
+
+    samples = DynamicProgrammingSamplingStrategy.sample(block, 10, seed=3).samples
+    assert list(samples) == list(DynamicProgrammingSamplingStrategy.sample(block, 10, seed=3).samples)
+
+
+def test_synthesize_trials_uniform_with_transitions():
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], [])
+    experiments = synthesize_trials_uniform(block, 5, seed=1)
+
+    assert len(experiments) == 5
+    assert all(e["repeated color?"][0] == "" for e in experiments)
+    assert synthesize_trials_uniform(block, 5, seed=1) == experiments
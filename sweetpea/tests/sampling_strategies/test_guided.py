@@ -1,11 +1,35 @@
 import pytest
 
-from sweetpea.logic import And
+from sweetpea import fully_cross_block
+from sweetpea.primitives import Factor, DerivedLevel, WithinTrial
+from sweetpea.constraints import AtMostKInARow
 from sweetpea.sampling_strategies.guided import GuidedSamplingStrategy
 
 
-def test_committed_to_solution():
-    assert GuidedSamplingStrategy._GuidedSamplingStrategy__committed_to_solution([
-        And([1, 3, 5]),
-        And([2, 4, 6])
-    ]) == [1, 3, 5, 2, 4, 6]
+def test_guided_sampling():
+    pytest.importorskip("pycryptosat")
+
+    color = Factor("color", ["red", "blue"])
+    text  = Factor("text",  ["red", "blue"])
+    congruency = Factor("congruency", [
+        DerivedLevel("con", WithinTrial(lambda c, t: c == t, [color, text])),
+        DerivedLevel("inc", WithinTrial(lambda c, t: c != t, [color, text]))
+    ])
+    block = fully_cross_block([color, text, congruency], [color, text],
+                              [AtMostKInARow(1, (congruency, congruency.levels[0]))])
+
+    result = GuidedSamplingStrategy.sample(block, 3, seed=1)
+    assert len(result.samples) == 3
+    for sample in result.samples:
+        assert sorted(zip(sample['color'], sample['text'])) == sorted((c, t) for c in ["red", "blue"]
+                                                                      for t in ["red", "blue"])
+        for c, t, con in zip(sample['color'], sample['text'], sample['congruency']):
+            assert con == ("con" if c == t else "inc")
+        assert "con, con" not in ", ".join(sample['congruency'])
+
+    # Every trial had at least one allowed candidate, and the last trial exactly one.
+    for sample_metrics in result.metrics['sample_metrics']:
+        assert all(t['allowed_trials'] >= 1 for t in sample_metrics['trials'])
+        assert sample_metrics['trials'][-1]['allowed_trials'] == 1
+
+    assert GuidedSamplingStrategy.sample(block, 3, seed=1).samples == result.samples
@@ -151,3 +151,30 @@ def test_generate_sample_basic_stroop_uneven_colors(sequence_number, expected_so
     enumerator = UCSolutionEnumerator(block)
     print(enumerator.generate_sample(sequence_number))
     assert enumerator.generate_sample(sequence_number) == expected_solution
+
+
+@pytest.mark.parametrize('count', [0, 1, 5, 12, 13, 24])
+def test_generate_random_sequence_numbers(count):
+    enumerator = UCSolutionEnumerator(block)
+    assert enumerator.solution_count() == 24
+
+    sequence_numbers = enumerator.generate_random_sequence_numbers(count)
+    assert len(sequence_numbers) == count
+    assert len(set(sequence_numbers)) == count
+    assert all(0 <= n < 24 for n in sequence_numbers)
+
+
+def test_generate_random_sequence_numbers_rejects_too_many():
+    enumerator = UCSolutionEnumerator(block)
+
+    with pytest.raises(ValueError):
+        enumerator.generate_random_sequence_numbers(25)
+
+
+def test_generate_random_samples():
+    enumerator = UCSolutionEnumerator(block)
+
+    samples = enumerator.generate_random_samples(24)
+    assert sorted(n for (n, _) in samples) == list(range(24))
+    for (n, sample) in samples:
+        assert sample == enumerator.generate_sample(n)
@@ -4,7 +4,7 @@ import os
 import pytest
 import re
 
-from sweetpea import fully_cross_block
+from sweetpea import fully_cross_block, multiple_cross_block
 from sweetpea.primitives import Factor, DerivedLevel, WithinTrial, Transition, Window
 from sweetpea.constraints import Exclude, ExactlyKInARow, AtMostKInARow
 from sweetpea.sampling_strategies.uniform_combinatoric import UniformCombinatoricSamplingStrategy, UCSolutionEnumerator
@@ -53,13 +53,12 @@ def test_validate_accepts_derived_factors_with_simple_windows():
     UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
 
 
-def test_validate_rejects_exclude_constraints():
+def test_validate_accepts_exclude_constraints():
     block = fully_cross_block([color, text, con_factor_within_trial],
                               [color, text],
                               [Exclude(color, red_color)])
 
-    with pytest.raises(ValueError):
-        UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
+    UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
 
 
 def test_validate_rejects_derived_factors_with_complex_windows():
@@ -70,6 +69,28 @@ def test_validate_rejects_derived_factors_with_complex_windows():
         UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
 
 
+def test_validate_accepts_multiple_crossings():
+    mix = Factor("mix", ["red", "blue"])
+    block = multiple_cross_block([color, text, mix], [[color, text], [text, mix], [mix]], [])
+
+    UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
+    assert not block.complex_factors_or_constraints
+
+
+def test_validate_rejects_unsupported_multiple_crossings():
+    mix = Factor("mix", ["red", "blue"])
+    size = Factor("size", ["big", "small"])
+    for (design, crossings, constraints) in [
+            ([color, text, mix], [[color, text], [mix]], []),
+            ([color, text, mix, size], [[color, text], [text, mix], [mix, size]], []),
+            ([color, text, con_factor_within_trial], [[color, text], [color, con_factor_within_trial]], []),
+            ([color, text, mix], [[color, text], [text, mix]], [Exclude(mix, get_level_from_name(mix, "red"))])]:
+        block = multiple_cross_block(design, crossings, constraints)
+        with pytest.raises(ValueError):
+            UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__validate(block)
+        assert block.complex_factors_or_constraints
+
+
 def test_example_counts():
     # Get all the python examples from the uc-counting-tests directory
     path_to_test_files = os.path.dirname(os.path.abspath(__file__)) + "/uc-counting-tests/*.py"
@@ -101,6 +122,131 @@ def test_example_counts():
         pytest.fail('{} failures occurred in counting tests: {}'.format(len(failures), failures))
 
 
+def test_counts_with_exclude_constraints():
+    color = Factor("color", ["red", "blue", "green"])
+    word  = Factor("word",  ["red", "blue"])
+    mood  = Factor("mood",  ["a", "b", "c"])
+    size  = Factor("size",  ["big", "small", "tiny"])
+    direction = Factor("direction", ["up", "down"])
+
+    stimulus = Factor("stimulus", [
+        DerivedLevel("legal",   WithinTrial(lambda c, w: not (c == "green" and w == "blue"), [color, word])),
+        DerivedLevel("illegal", WithinTrial(lambda c, w: c == "green" and w == "blue", [color, word]))
+    ])
+    color_mood = Factor("color mood", [
+        DerivedLevel("x", WithinTrial(lambda c, m: c == "red" or m == "a", [color, mood])),
+        DerivedLevel("y", WithinTrial(lambda c, m: not (c == "red" or m == "a"), [color, mood]))
+    ])
+
+    # Excluded crossing instances are left out of the permutations.
+    block = fully_cross_block([color, word, stimulus], [color, word],
+                              [Exclude(stimulus, get_level_from_name(stimulus, "illegal"))],
+                              require_complete_crossing=False)
+    assert UCSolutionEnumerator(block).solution_count() == 120
+
+    block = fully_cross_block([color, word, stimulus], [color, word],
+                              [Exclude(stimulus, get_level_from_name(stimulus, "legal"))],
+                              require_complete_crossing=False)
+    assert UCSolutionEnumerator(block).solution_count() == 1
+
+    # Crossing instances that a crossed derived level rules out on its own are not dropped by an unrelated exclusion.
+    block = fully_cross_block([color, word, stimulus], [color, stimulus],
+                              [Exclude(word, get_level_from_name(word, "red"))],
+                              require_complete_crossing=False)
+    assert UCSolutionEnumerator(block).solution_count() == 0
+    assert UniformCombinatoricSamplingStrategy.sample(block, 3).samples == []
+
+    # Excluded levels of independent factors are never chosen.
+    block = fully_cross_block([word, size, direction], [word],
+                              [Exclude(size, get_level_from_name(size, "tiny"))])
+    assert UCSolutionEnumerator(block).solution_count() == 2 * 2**2 * 2**2
+
+    # Factors that an excluded derived level depends on are chosen together with each crossing instance.
+    block = fully_cross_block([color, word, mood, color_mood], [color],
+                              [Exclude(color_mood, get_level_from_name(color_mood, "y"))])
+    enumerator = UCSolutionEnumerator(block)
+    # Only red allows moods other than "a".
+    assert enumerator.solution_count() == 6 * (3 * 1 * 1) * 2**3
+    for n in range(enumerator.solution_count()):
+        assert 'y' not in enumerator.generate_sample(n)['color mood']
+
+
+def test_samples_are_distinct_with_many_independent_factors():
+    size  = Factor("size", ["big", "small", "tiny"])
+    direction = Factor("direction", ["up", "down"])
+    block = fully_cross_block([color, size, direction], [color], [])
+
+    enumerator = UCSolutionEnumerator(block)
+    samples = [enumerator.generate_sample(n) for n in range(enumerator.solution_count())]
+    assert len(samples) == 2 * 3**2 * 2**2
+    assert len(set(tuple(tuple(v) for v in s.values()) for s in samples)) == len(samples)
+
+
+# The expected counts were checked by enumerating the solutions of the
+# corresponding CNF formulas.
+def test_counts_with_multiple_crossings():
+    mix   = Factor("mix",   ["red", "blue"])
+    size  = Factor("size",  ["big", "small"])
+    shape = Factor("shape", ["square", "circle"])
+
+    # Shared factors
+    block = multiple_cross_block([color, text, mix, con_factor_within_trial], [[color, text], [text, mix]], [])
+    assert UCSolutionEnumerator(block).solution_count() == 96
+
+    # Disjoint crossings
+    block = multiple_cross_block([color, text, size, shape], [[color, text], [size, shape]], [])
+    assert UCSolutionEnumerator(block).solution_count() == 576
+
+    # Nested crossings
+    block = multiple_cross_block([color, text], [[color, text], [color]], [])
+    assert UCSolutionEnumerator(block).solution_count() == 24
+
+    block = multiple_cross_block([color, text, size, shape], [[color, text], [size, shape], [size]], [])
+    assert UCSolutionEnumerator(block).solution_count() == 576
+
+    # Independent factors
+    block = multiple_cross_block([color, text, mix, size], [[color, text], [text, mix]], [])
+    assert UCSolutionEnumerator(block).solution_count() == 1536
+
+
+def test_samples_satisfy_multiple_crossings():
+    mix = Factor("mix", ["red", "blue"])
+    block = multiple_cross_block([color, text, mix, con_factor_within_trial], [[color, text], [text, mix]], [])
+
+    enumerator = UCSolutionEnumerator(block)
+    samples = [enumerator.generate_sample(n) for n in range(enumerator.solution_count())]
+    assert len(set(tuple(tuple(v) for v in s.values()) for s in samples)) == len(samples)
+    for s in samples:
+        assert sorted(zip(s["color"], s["text"])) == sorted(zip(s["text"], s["mix"]))
+        assert s["congruent?"] == ["con" if c == t else "inc" for (c, t) in zip(s["color"], s["text"])]
+
+
+def test_sample_is_deterministic_for_a_seed():
+    size = Factor("size", ["big", "small", "tiny"])
+    block = fully_cross_block([color, text, size], [color, text], [])
+
+    samples = UniformCombinatoricSamplingStrategy.sample(block, 20, seed=5).samples
+    assert len(samples) == 20
+    assert UniformCombinatoricSamplingStrategy.sample(block, 20, seed=5).samples == samples
+    assert UniformCombinatoricSamplingStrategy.sample(block, 20, seed=5, processes=3).samples == samples
+    assert UniformCombinatoricSamplingStrategy.sample(block, 20, seed=6).samples != samples
+
+
+def test_sample_with_excluded_crossing_requires_incomplete_crossing():
+    block = fully_cross_block([color, text, con_factor_within_trial],
+                              [color, text],
+                              [Exclude(color, red_color)])
+    assert UniformCombinatoricSamplingStrategy.sample(block, 10).samples == []
+
+    block = fully_cross_block([color, text, con_factor_within_trial],
+                              [color, text],
+                              [Exclude(color, red_color)],
+                              require_complete_crossing=False)
+    samples = UniformCombinatoricSamplingStrategy.sample(block, 10).samples
+    assert len(samples) == 2
+    assert all(s['color'] == ['blue', 'blue'] for s in samples)
+
+
 def test_constraint_violation():
     are_constraints_violated = UniformCombinatoricSamplingStrategy._UniformCombinatoricSamplingStrategy__are_constraints_violated
 
@@ -1,8 +1,12 @@
 import json
 import pytest
 
+import numpy as np
+
 from sweetpea.logic import And, Or
-from sweetpea.backend import LowLevelRequest, BackendRequest
+from sweetpea.backend import LowLevelRequest, LowLevelRequestBatch, BackendRequest
+from sweetpea.core import CNF, combine_cnf_with_requests
+from sweetpea.core.generate.utility import AssertionType
 
 
 def test_low_level_request_validation():
@@ -18,3 +22,35 @@ def test_low_level_request_validation():
     # Non-numeric k
     with pytest.raises(ValueError):
         LowLevelRequest('EQ', '5', [1, 2, 3])
+
+
+def test_low_level_request_batch():
+    batch = LowLevelRequestBatch([LowLevelRequest('EQ', 1, [1, 2])])
+    batch.add('LT', 3, range(3, 6))
+    batch.add_many('GT', 0, [[6, 7], [8]])
+    batch.add_many('EQ', 2, np.array([[9, 10, 11], [12, 13, 14]]))
+    batch += [LowLevelRequest('LT', 2, [15])]
+
+    expected = [LowLevelRequest('EQ', 1, [1, 2]),
+                LowLevelRequest('LT', 3, [3, 4, 5]),
+                LowLevelRequest('GT', 0, [6, 7]),
+                LowLevelRequest('GT', 0, [8]),
+                LowLevelRequest('EQ', 2, [9, 10, 11]),
+                LowLevelRequest('EQ', 2, [12, 13, 14]),
+                LowLevelRequest('LT', 2, [15])]
+    assert batch == expected
+    assert len(batch) == 7
+    assert batch[-1] == expected[-1]
+    assert batch.ks.tolist() == [1, 3, 0, 0, 2, 2, 2]
+    assert batch.offsets.tolist() == [0, 2, 5, 7, 8, 11, 14, 15]
+    assert batch.variables.tolist() == list(range(1, 16))
+    assert list(batch.generation_requests()) == [r.to_generation_request() for r in expected]
+    assert LowLevelRequest.comparisons == [t.name for t in AssertionType]
+    assert (str(combine_cnf_with_requests(CNF(), 15, 15, batch.generation_request_columns()))
+            == str(combine_cnf_with_requests(CNF(), 15, 15, batch.generation_requests())))
+    assert batch == LowLevelRequestBatch(expected)
+
+    with pytest.raises(ValueError):
+        batch.add_many('bad', 1, [[1]])
+    with pytest.raises(ValueError):
+        batch.add('EQ', '5', [1])
@@ -7,7 +7,8 @@ from itertools import permutations
 from sweetpea import fully_cross_block
 from sweetpea.primitives import Factor, DerivedLevel, WithinTrial, Transition, Window
 from sweetpea.blocks import FullyCrossBlock
-from sweetpea.constraints import Exclude
+from sweetpea.constraints import AtMostKInARow, Exclude
+from sweetpea.sampling_strategies.base import SamplingStrategy
 from sweetpea.tests.test_utils import get_level_from_name
 
 color = Factor("color", ["red", "blue"])
@@ -362,6 +363,66 @@ def test_fully_cross_block_crossing_size_with_overlapping_exclude():
                            require_complete_crossing=False).crossing_size() == 5
 
 
+def test_fully_cross_block_crossing_size_with_exclude_and_many_design_factors():
+    # Factors the exclusion doesn't depend on shouldn't need to be enumerated.
+    extra_factors = [Factor("extra " + str(i), ["a", "b", "c"]) for i in range(16)]
+
+    assert FullyCrossBlock([color, text, con_factor] + extra_factors,
+                           [[color, text]],
+                           [Exclude(con_factor, con_level)],
+                           require_complete_crossing=False).crossing_size() == 2
+
+
+def test_fully_cross_block_crossing_size_with_exclude_of_nested_derivation():
+    # The excluded level depends on the congruency factor, which isn't crossed,
+    # so no crossing can be ruled out by the exclusion on its own.
+    big_con = Factor("big congruent?", [
+        DerivedLevel("yes", WithinTrial(lambda con, size: con == "con" and size == "big", [con_factor, size])),
+        DerivedLevel("no",  WithinTrial(lambda con, size: not (con == "con" and size == "big"), [con_factor, size]))
+    ])
+
+    assert FullyCrossBlock([color, text, size, con_factor, big_con],
+                           [[text, size]],
+                           [Exclude(big_con, get_level_from_name(big_con, "yes"))],
+                           require_complete_crossing=False).crossing_size() == 6
+    assert FullyCrossBlock([color, text, size, con_factor, big_con],
+                           [[text, con_factor, size]],
+                           [Exclude(big_con, get_level_from_name(big_con, "yes"))],
+                           require_complete_crossing=False).crossing_size() == 12
+
+
+def test_fully_cross_block_is_excluded():
+    block = FullyCrossBlock([color, text, size, con_factor],
+                            [[color, text]],
+                            [Exclude(con_factor, con_level)],
+                            require_complete_crossing=False)
+
+    # Variables 1-4 are color and text, 5-7 are size.
+    assert block.is_excluded((1, 3), (5,))
+    assert block.is_excluded((2, 4), (7,))
+    assert not block.is_excluded((1, 4), (5,))
+    # Variables from later trials are mapped back onto the first trial.
+    assert block.is_excluded((10, 12), (14,))
+    assert not block.is_excluded((11, 12), (14,))
+
+    # Exclusions added later are picked up.
+    block.excluded_derived.append({color: red_color, text: blue_text})
+    assert block.is_excluded((1, 4), (5,))
+    assert not block.is_excluded((2, 3), (5,))
+
+
+def test_fully_cross_block_filter_excluded_derived_levels():
+    block = FullyCrossBlock([color, text, size, con_factor],
+                            [[color, text]],
+                            [Exclude(con_factor, con_level)],
+                            require_complete_crossing=False)
+
+    assert block.filter_excluded_derived_levels([
+        [[(1, 3), (5,), (6,)], [(1, 4), (5,), (6,)]],
+        [[(2, 4), (7,)]]
+    ]) == [[[(1, 4), (5,), (6,)]]]
+
+
 def test_fully_cross_block_should_copy_input_lists():
     # FullyCrossBlock should copy the input lists, so as not to break if the
     # user modifies the original list.
@@ -416,3 +477,78 @@ def test_build_variable_list_for_three_derived_levels():
     assert block.build_variable_list((changed, get_level_from_name(changed, "0"))) == [17, 20, 23]
     assert block.build_variable_list((changed, get_level_from_name(changed, "1"))) == [18, 21, 24]
     assert block.build_variable_list((changed, get_level_from_name(changed, "2"))) == [19, 22, 25]
+
+
+def test_independent_support():
+    block = fully_cross_block([color, text, size, con_factor], [color, text], [])
+
+    # Only the first level(s) of each basic factor in each trial are needed.
+    assert block.independent_support() == [1, 3, 5, 6, 10, 12, 14, 15, 19, 21, 23, 24, 28, 30, 32, 33]
+
+
+def test_expand_support():
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], [])
+    block.build_backend_request()
+
+    assert block.independent_support() == [1, 3, 7, 9, 13, 15, 19, 21]
+
+    # Trials are red/red, red/blue, blue/red and blue/blue. The value given
+    # for variable 2 is outside of the support, so it is ignored.
+    [solution] = block.expand_support([[1, 2, 3, 7, -9, -13, 15, -19, -21]])
+
+    assert solution == [1, -2, 3, -4, 5, -6,
+                        7, -8, -9, 10, -11, 12,
+                        -13, 14, 15, -16, -17, 18,
+                        -19, 20, -21, 22, 23, -24,
+                        25, -26, -27, 28, 29, -30]
+    assert SamplingStrategy.decode(block, solution) == {
+        'color':           ['red', 'red', 'blue', 'blue'],
+        'text':            ['red', 'blue', 'red', 'blue'],
+        'congruent?':      ['con', 'inc', 'inc', 'con'],
+        'repeated color?': ['', 'yes', 'no', 'yes']
+    }
+
+
+def test_solution_count():
+    block = fully_cross_block([color, text, size], [color, text], [])
+    assert block.solution_count() == 24 * 3**4
+
+    # Congruent trials cannot follow each other.
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text],
+                              [AtMostKInARow(1, (con_factor, con_level))])
+    assert block.solution_count() == 12
+
+    # The block's errors are reported rather than counted as no solutions.
+    block = fully_cross_block([color, text, con_factor], [color, text], [Exclude(color, red_color)])
+    with pytest.raises(ValueError, match="Complete crossing is not possible"):
+        block.solution_count()
+    with pytest.raises(ValueError, match="Complete crossing is not possible"):
+        block.sample_at(0)
+
+    # Changing the constraints gives a new count.
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], [])
+    assert block.solution_count() == 24
+    block.constraints.append(AtMostKInARow(1, (con_factor, con_level)))
+    assert block.solution_count() == 12
+
+
+def test_solution_count_rejects_uncountable_designs():
+    block = fully_cross_block([color, text, congruent_bookend], [color, text], [])
+    with pytest.raises(ValueError):
+        block.solution_count()
+
+
+def test_sample_at():
+    block = fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], [])
+    count = block.solution_count()
+
+    samples = block.samples_at(range(count))
+    assert len(set(str(s) for s in samples)) == count
+    assert block.sample_at(5) == samples[5]
+    assert fully_cross_block([color, text, con_factor, color_repeats_factor], [color, text], []).sample_at(5) == samples[5]
+    assert block.samples_at([]) == []
+    for s in samples:
+        assert s['repeated color?'] == [''] + ['yes' if a == b else 'no' for a, b in zip(s['color'], s['color'][1:])]
+
+    with pytest.raises(ValueError):
+        block.sample_at(count)
@@ -1,8 +1,13 @@
 import pytest
+import random
 
 from math import factorial
 
-from sweetpea.combinatorics import extract_components, compute_jth_inversion_sequence, construct_permutation, compute_jth_combination
+from sweetpea import combinatorics
+
+from sweetpea.combinatorics import (
+    extract_components, compute_jth_inversion_sequence, construct_permutation, construct_permutations,
+    compute_jth_combination, choose_distinct)
 
 
 @pytest.mark.parametrize('sizes, n, expected', [
@@ -100,6 +105,25 @@ def test_construct_permutation(inversion_sequence, expected_permutation):
     assert construct_permutation(inversion_sequence) == expected_permutation
 
 
+def test_construct_permutation_with_fenwick_tree(monkeypatch):
+    inversion_sequences = [compute_jth_inversion_sequence(7, j) for j in range(0, 5040, 7)]
+    expected = [construct_permutation(s) for s in inversion_sequences]
+
+    monkeypatch.setattr(combinatorics, 'FENWICK_PERMUTATION_LENGTH', 0)
+    assert [construct_permutation(s) for s in inversion_sequences] == expected
+
+
+def test_construct_permutations():
+    n = 6
+    inversion_sequences = [compute_jth_inversion_sequence(n, j) for j in range(720)]
+    permutations = construct_permutations(inversion_sequences)
+
+    assert permutations == [construct_permutation(s) for s in inversion_sequences]
+    assert len(set(map(tuple, permutations))) == 720
+    assert construct_permutations([]) == []
+    assert construct_permutations([[0]]) == [[0]]
+
+
 @pytest.mark.parametrize('l, n, j, expected_combination', [
     [4, 2, 0,  [0, 0, 0, 0]],
     [4, 2, 1,  [0, 0, 0, 1]],
@@ -130,3 +154,27 @@ def test_construct_permutation(inversion_sequence, expected_permutation):
 ])
 def test_compute_jth_combination(l, n, j, expected_combination):
     assert compute_jth_combination(l, n, j) == expected_combination
+
+
+@pytest.mark.parametrize('n, count', [
+    [10, 0],
+    [10, 3],
+    [10, 10],
+    [10 ** 30, 5],
+])
+def test_choose_distinct(n, count):
+    numbers = choose_distinct(n, count)
+
+    assert len(numbers) == count
+    assert len(set(numbers)) == count
+    assert all(0 <= x < n for x in numbers)
+
+
+@pytest.mark.parametrize('n, count', [[10, 8], [10 ** 30, 5]])
+def test_choose_distinct_with_rng(n, count):
+    assert choose_distinct(n, count, random.Random(3)) == choose_distinct(n, count, random.Random(3))
+
+
+def test_choose_distinct_rejects_too_many():
+    with pytest.raises(ValueError):
+        choose_distinct(3, 4)
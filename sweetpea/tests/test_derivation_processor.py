@@ -1,6 +1,8 @@
 import operator as op
 import pytest
 
+import numpy as np
+
 from itertools import permutations
 
 from sweetpea.primitives import Factor, DerivedLevel, WithinTrial, Transition, Window
@@ -182,3 +184,11 @@ def test_shift_window():
     assert DerivationProcessor.shift_window([[0, 2, 4], [1, 3, 5]], Window(lambda x: x, [color], 2, 3), 6) == [[0, 8, 16], [1, 9, 17]]
     assert DerivationProcessor.shift_window([[1, 1, 1, 1], [2, 2, 2, 2]], Window(lambda x: x, [color], 2, 4), 10) == \
         [[1, 11, 21, 31], [2, 12, 22, 32]]
+
+
+def test_shift_window_with_arrays():
+    assert DerivationProcessor.shift_window(np.array([[0, 0], [1, 1]]), WithinTrial(lambda x: x, [color]), 0) == \
+        [[0, 0], [1, 1]]
+    assert DerivationProcessor.shift_window(np.array([[0, 0, 2, 3]]), Transition(lambda x: x, [color, text]), 4) == \
+        [[0, 4, 2, 7]]
+    assert DerivationProcessor.shift_window(np.empty((0, 2), dtype=int), Transition(lambda x: x, [color]), 4) == []
@@ -1,7 +1,7 @@
 import operator as op
 import pytest
 
-from sweetpea import fully_cross_block
+from sweetpea import fully_cross_block, multiple_cross_block
 from sweetpea.primitives import Factor, DerivedLevel, WithinTrial
 from sweetpea.design_partitions import DesignPartitions
 
@@ -52,3 +52,16 @@ def test_get_uncrossed_derived_factors():
     assert partitions.get_uncrossed_derived_factors() == [color_red]
 
 
+
+
+def test_multiple_crossings():
+    mix = Factor("mix", ["red", "blue"])
+    size = Factor("size", ["big", "small"])
+    block = multiple_cross_block([color, text, mix, size, congruency],
+                                 [[color], [color, text], [text, mix], [mix], [mix, text]],
+                                 [])
+    partitions = DesignPartitions(block)
+
+    assert partitions.get_crossed_factors() == [color, text]
+    assert partitions.get_secondary_crossings() == [[text, mix]]
+    assert partitions.get_uncrossed_factors() == [size, congruency]
@@ -1,4 +1,10 @@
-from sweetpea.logic import If, Iff, And, Or, Not, to_cnf_naive, to_cnf_switching, to_cnf_tseitin, cnf_to_json
+import numpy as np
+from itertools import product
+from typing import cast
+
+from sweetpea.logic import (
+    If, Iff, And, Or, Not, Formula, ClauseSink, to_cnf_naive, to_cnf_switching, to_cnf_tseitin,
+    to_cnf_plaisted_greenbaum, cnf_to_json, compile_cnf, replicate_cnf, replicate_cnf_into)
 
 
 def test_to_cnf_naive():
@@ -69,6 +75,83 @@ def test_to_cnf_tseitin():
     ]), 6)
 
 
+def test_to_cnf_plaisted_greenbaum():
+    # The top-level Or becomes a clause, and the And only needs to be implied
+    # by its variable.
+    assert to_cnf_plaisted_greenbaum(Or([1, And([2, 3])]), 4) == (And([
+        # 4 => (2 ^ 3)
+        Or([2, Not(4)]),
+        Or([3, Not(4)]),
+
+        # 1 v 4
+        Or([1, 4])
+    ]), 5)
+
+    # An equivalence with a variable defines the formula with that variable,
+    # and negations negate the literal of their subformula.
+    assert to_cnf_plaisted_greenbaum(And([Iff(1, And([2, Not(3)])), Not(And([1, 2]))]), 4) == (And([
+        # 1 <=> (2 ^ ~3)
+        Or([2, Not(1)]),
+        Or([Not(3), Not(1)]),
+        Or([Not(2), 3, 1]),
+
+        # (1 ^ 2) => 4
+        Or([Not(1), Not(2), 4]),
+
+        # ~4
+        Or([Not(4)])
+    ]), 5)
+
+    # The premise of an implication occurs negatively, and the consequent
+    # positively.
+    assert to_cnf_plaisted_greenbaum(If(Or([1, 2]), Iff(3, 4)), 5) == (And([
+        # (1 v 2) => 5
+        Or([Not(1), 5]),
+        Or([Not(2), 5]),
+
+        # 6 => (3 <=> 4)
+        Or([3, Not(4), Not(6)]),
+        Or([Not(3), 4, Not(6)]),
+
+        # 5 => 6
+        Or([Not(5), 6])
+    ]), 7)
+
+
+def test_to_cnf_plaisted_greenbaum_is_equisatisfiable():
+    def holds(f, assignment):
+        if isinstance(f, int):
+            return assignment[f]
+        elif isinstance(f, Not):
+            return not holds(f.c, assignment)
+        elif isinstance(f, And):
+            return all(holds(c, assignment) for c in f.input_list)
+        elif isinstance(f, Or):
+            return any(holds(c, assignment) for c in f.input_list)
+        elif isinstance(f, If):
+            return not holds(f.p, assignment) or holds(f.q, assignment)
+        else:
+            return holds(f.p, assignment) == holds(f.q, assignment)
+
+    formulas = [
+        Iff(1, Or([And([2, Not(3)]), Not(Iff(2, 3))])),
+        If(And([Not(1), 2]), And([3, Or([1, Not(2)])])),
+        Not(Or([If(1, 2), And([Not(Iff(1, 3)), 1])])),
+        And([Or([Not(And([1, 2])), 3]), Iff(Not(3), Or([1, Not(2)]))]),
+    ]
+    for f in formulas:
+        (cnf, fresh) = to_cnf_plaisted_greenbaum(f, 4)
+        clauses = cnf_to_json([cnf])
+        for values in product([False, True], repeat=3):
+            assignment = dict(zip([1, 2, 3], values))
+            # The formula holds exactly when some assignment of the fresh
+            # variables satisfies the clauses.
+            satisfiable = any(all(any(extended[abs(l)] == (l > 0) for l in clause) for clause in clauses)
+                              for extended in ({**assignment, **dict(zip(range(4, fresh), fresh_values))}
+                                               for fresh_values in product([False, True], repeat=fresh - 4)))
+            assert satisfiable == holds(f, assignment)
+
+
 def test_cnf_to_json():
     assert cnf_to_json([And([1])]) == [[1]]
 
@@ -346,3 +429,121 @@ def test_tseitin_cache():
     assert c.get('x') == 5
 
     assert c.get_next_variable() == 8
+
+
+def test_replicate_cnf():
+    trial_size = 6
+    copy = lambda n: [Iff(5 + n * trial_size, Or([And([1 + n * trial_size, 3 + n * trial_size]),
+                                                  And([2 + n * trial_size, 4 + n * trial_size]),
+                                                  6 + n * trial_size]))]
+    conjunction = And([c for n in range(4) for c in copy(n)])
+
+    assert replicate_cnf(to_cnf_tseitin, copy, 4, 25) == to_cnf_tseitin(conjunction, 25)
+    assert replicate_cnf(to_cnf_tseitin, copy, 1, 25) == to_cnf_tseitin(And(copy(0)), 25)
+    assert replicate_cnf(to_cnf_plaisted_greenbaum, copy, 4, 25) == to_cnf_plaisted_greenbaum(conjunction, 25)
+
+    # Other conversions are applied to the whole conjunction.
+    clause_copy = lambda n: [Or([1 + n * trial_size, Not(2 + n * trial_size)])]
+    assert replicate_cnf(to_cnf_naive, clause_copy, 4, 25) == to_cnf_naive(And([c for n in range(4) for c in clause_copy(n)]), 25)
+
+
+def test_replicate_cnf_with_several_conjuncts_and_strides():
+    # The first variable of each copy moves by 1, the others by 4.
+    copy = lambda n: [Iff(1 + n, And([5 + 4 * n, 6 + 4 * n])),
+                      Iff(2 + 4 * n + 20, Or([Not(5 + 4 * n), 7 + 4 * n]))]
+    conjunction = And([c for n in range(3) for c in copy(n)])
+
+    assert replicate_cnf(to_cnf_tseitin, copy, 3, 40) == to_cnf_tseitin(conjunction, 40)
+    assert replicate_cnf(to_cnf_plaisted_greenbaum, copy, 3, 40) == to_cnf_plaisted_greenbaum(conjunction, 40)
+
+
+def test_replicate_cnf_with_nonlinear_copies():
+    # The first two copies look one trial apart, but the later ones are not.
+    copy = lambda n: [Iff(1 + n * n * 3, And([2 + n * n * 3, Not(3 + n * n * 3)]))]
+    conjunction = And([c for n in range(4) for c in copy(n)])
+
+    assert replicate_cnf(to_cnf_tseitin, copy, 4, 60) == to_cnf_tseitin(conjunction, 60)
+    assert replicate_cnf(to_cnf_plaisted_greenbaum, copy, 4, 60) == to_cnf_plaisted_greenbaum(conjunction, 60)
+
+
+def test_replicate_cnf_with_overlapping_copies():
+    # Copies sharing variables also share Tseitin variables, so these can't be
+    # replicated from a template.
+    copy = lambda n: [Iff(1 + n, And([Not(2 + n), 3 + n]))]
+    conjunction = And([c for n in range(5) for c in copy(n)])
+
+    assert replicate_cnf(to_cnf_tseitin, copy, 5, 10) == to_cnf_tseitin(conjunction, 10)
+
+
+def test_clause_sink():
+    sink = ClauseSink([And([Or([1, Not(2)]), 3])])
+    sink.add_clause([-4, 5])
+    sink.add_clauses(np.array([6, 7, -8, 9]), np.array([1, 3]))
+    sink += [And([Or([Not(10)])])]
+
+    assert sink.clauses() == [[1, -2], [3], [-4, 5], [6], [7, -8, 9], [-10]]
+    assert len(sink) == 6
+    assert sink == [And([Or([1, Not(2)]), 3, Or([-4, 5]), 6, Or([7, -8, 9]), Or([Not(10)])])]
+    assert sink != [And([1])]
+
+
+def test_compile_cnf():
+    formula = And([Iff(1, Or([And([2, 3]), Not(4)])), If(5, 1)])
+    (expected, expected_fresh) = to_cnf_tseitin(formula, 6)
+    sink = ClauseSink([And([Or([1, 2])])])
+    assert compile_cnf(to_cnf_tseitin, formula, 6, sink) == expected_fresh
+    assert sink.clauses() == [[1, 2]] + cnf_to_json([expected])
+
+    formula = Or([1, And([2, 3]), And([4, 5])])
+    sink = ClauseSink()
+    (expected, expected_fresh) = to_cnf_switching(formula, 6)
+    assert compile_cnf(to_cnf_switching, formula, 6, sink) == expected_fresh
+    assert sink == [expected]
+
+
+def test_replicate_cnf_into():
+    trial_size = 6
+    copy = lambda n: [Iff(5 + n * trial_size, Or([And([1 + n * trial_size, 3 + n * trial_size]),
+                                                  And([2 + n * trial_size, 4 + n * trial_size]),
+                                                  6 + n * trial_size]))]
+    (expected, expected_fresh) = to_cnf_tseitin(And([c for n in range(4) for c in copy(n)]), 25)
+
+    sink = ClauseSink()
+    assert replicate_cnf_into(to_cnf_tseitin, copy, 4, 25, sink) == expected_fresh
+    assert sink == [expected]
+
+    (expected, expected_fresh) = to_cnf_plaisted_greenbaum(And([c for n in range(4) for c in copy(n)]), 25)
+    sink = ClauseSink()
+    assert replicate_cnf_into(to_cnf_plaisted_greenbaum, copy, 4, 25, sink) == expected_fresh
+    assert sink == [expected]
+
+
+def test_transformations_of_large_formulas():
+    # Each of these formulas has more than 10^5 nodes, and most of them are
+    # nested far deeper than the recursion limit.
+    size = 100_001
+
+    # A chain of Ands and Ors, each introducing one Tseitin variable with
+    # three clauses.
+    chain = cast(Formula, size)
+    for v in range(size - 1, 0, -1):
+        chain = (And if v % 2 else Or)([v, chain])
+    sink = ClauseSink()
+    assert compile_cnf(to_cnf_tseitin, chain, size + 1, sink) == 2 * size
+    assert len(sink) == 3 * (size - 1) + 1
+    assert sink.clauses()[-1] == [2 * size - 1]
+
+    # A formula under an even number of negations is unchanged by them.
+    base = Not(And([Or([1, 2]), Or([3, 4])]))
+    negated = cast(Formula, base)
+    for _ in range(size // 2):
+        negated = Not(Not(negated))
+    assert to_cnf_naive(negated, 5) == to_cnf_naive(base, 5)
+    assert to_cnf_switching(negated, 5) == to_cnf_switching(base, 5)
+
+    # A wide conjunction of many small formulas.
+    conjuncts = [If(v, Or([v + 1, And([v + 2, Not(v + 3)])])) for v in range(1, 4 * 12_500, 4)]
+    (naive, _) = to_cnf_naive(And(conjuncts), 4 * 12_500)
+    (switching, fresh) = to_cnf_switching(And(conjuncts), 4 * 12_500)
+    assert len(naive.input_list) == len(switching.input_list) == 2 * len(conjuncts)
+    assert fresh == 4 * 12_500
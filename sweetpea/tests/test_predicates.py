@@ -0,0 +1,149 @@
+import pytest
+
+import numpy as np
+
+from itertools import product
+from math import factorial
+
+from sweetpea.primitives import Factor, DerivedLevel, ElseLevel, WithinTrial, Transition, Window
+from sweetpea.predicates import (
+    Argument, Negation, Predicate, arg, eq, ne, is_in, is_enumerable, satisfying_assignments)
+from sweetpea.derivation_processor import DerivationProcessor
+from sweetpea import fully_cross_block
+from sweetpea.constraints import Exclude
+from sweetpea.sampling_strategies.uniform_combinatoric import UCSolutionEnumerator
+
+
+color = Factor("color", ["red", "blue", "green"])
+text  = Factor("text",  ["red", "blue", "green"])
+shape = Factor("shape", ["circle", "square"])
+
+
+def test_predicates_behave_like_functions():
+    con = eq(arg(0), arg(1))
+    assert con("red", "red")
+    assert not con("red", "blue")
+    assert (~con)("red", "blue")
+    assert (con | is_in(arg(0), ["blue"]))("blue", "green")
+    assert not (con & ne(arg(0), "red"))("red", "red")
+
+    repeat = eq(arg(0, 0), arg(0, 1))
+    assert repeat(["red", "red"])
+    assert not repeat(["red", "blue"])
+
+    with pytest.raises(TypeError):
+        Predicate()
+
+
+def test_argument_slot():
+    assert Argument(1).slot(1) == 1
+    assert Argument(1, 2).slot(3) == 5
+
+    with pytest.raises(ValueError):
+        Argument(1, 0).slot(1)
+    with pytest.raises(ValueError):
+        Argument(1).slot(2)
+    with pytest.raises(ValueError):
+        Argument(1, 2).slot(2)
+
+    # Level lookups check the width of the window in the same way.
+    assert Argument(1).value(["red", "blue"]) == "blue"
+    assert Argument(1, 0).value([["red", "blue"], ["green", "red"]]) == "green"
+    with pytest.raises(ValueError):
+        Argument(1, 0).value(["red", "blue"])
+    with pytest.raises(ValueError):
+        Argument(1).value([["red", "blue"], ["green", "red"]])
+
+
+def test_large_normal_forms_are_not_enumerated():
+    # Each negated conjunction doubles the size of the disjunctive normal form.
+    predicate = eq(arg(0, 0), arg(0, 0))
+    for t in range(13):
+        predicate = predicate & ~(eq(arg(0, t % 2), "red") & eq(arg(1, t % 2), "blue"))
+    assert not is_enumerable(predicate)
+    assert is_enumerable(eq(arg(0, 0), arg(1, 1)))
+    assert not is_enumerable(lambda c, t: c == t)
+    with pytest.raises(ValueError):
+        satisfying_assignments(predicate, [color, color, text, text], 2)
+
+    # Derivations with such predicates go through the derivation table instead.
+    factor = Factor("pattern", [DerivedLevel("yes", Transition(predicate, [color, text])), ElseLevel("no")])
+    block = fully_cross_block([color, text, factor], [color, text], [])
+    assert len(DerivationProcessor.generate_derivations(block)) == 2
+
+
+@pytest.mark.parametrize('predicate', [
+    eq(arg(0, 0), arg(1, 1)),
+    ne(arg(0, 0), arg(0, 1)) & is_in(arg(2, 1), ["square"]),
+    eq(arg(0, 1), "blue") | ~is_in(arg(1, 0), ["red", "green"]),
+    ~(eq(arg(0, 0), arg(1, 0)) & ne(arg(0, 1), arg(1, 1))),
+    ne(arg(0, 0), arg(1, 0)) & ne(arg(1, 0), arg(0, 1)) & ne(arg(0, 0), arg(0, 1)),
+    eq(arg(0, 0), arg(2, 0)),
+    ne("red", "red") | eq(arg(2, 0), "circle"),
+])
+def test_satisfying_assignments_match_cross_product(predicate):
+    factors = [color, color, text, text, shape, shape]
+    expected = [indices for indices in product(*(range(len(f.levels)) for f in factors))
+                if predicate(*[[factors[n * 2 + t].levels[indices[n * 2 + t]].name for t in range(2)]
+                               for n in range(3)])]
+    assert satisfying_assignments(predicate, factors, 2) == expected
+
+
+def test_structured_derivations_match_function_derivations():
+    def make_factor(structured):
+        if structured:
+            one = eq(arg(0, 0), arg(0, 2)) & ne(arg(1, 1), arg(1, 2))
+            two = (eq(arg(0, 1), arg(1, 1)) | ~is_in(arg(2, 2), ["circle"])) & ~one
+        else:
+            one = lambda c, t, s: c[0] == c[2] and t[1] != t[2]
+            two = lambda c, t, s: (c[1] == t[1] or s[2] not in ["circle"]) and not one(c, t, s)
+        return Factor("pattern", [DerivedLevel("one", Window(one, [color, text, shape], 3, 1)),
+                                  DerivedLevel("two", Window(two, [color, text, shape], 3, 1)),
+                                  ElseLevel("other")])
+
+    derivations = []
+    for structured in (False, True):
+        factor = make_factor(structured)
+        block = fully_cross_block([color, text, shape, factor], [color, text], [])
+        derivations.append([(d.derived_idx, d.dependent_idxs)
+                            for d in DerivationProcessor.generate_derivations(block)])
+    assert derivations[0] == derivations[1]
+
+
+def test_structured_else_level():
+    con = DerivedLevel("con", WithinTrial(eq(arg(0), arg(1)), [color, text]))
+    other = ElseLevel("other")
+    factor = Factor("congruent?", [con, other])
+
+    assert isinstance(factor.levels[1].window.predicate, Negation)
+    assert np.array_equal(factor.derivation_table(),
+                          np.array([[0, 1, 1], [1, 0, 1], [1, 1, 0]]))
+
+
+def test_structured_derivations_reject_overlaps():
+    con = DerivedLevel("con", WithinTrial(eq(arg(0), arg(1)), [color, text]))
+    red = DerivedLevel("red", WithinTrial(eq(arg(0), "red"), [color, text]))
+    factor = Factor("overlapping", [con, red])
+
+    with pytest.raises(ValueError):
+        fully_cross_block([color, text, factor], [color, text], [])
+
+
+def test_structured_lookups_skip_the_derivation_table():
+    def make_factor(structured):
+        if structured:
+            con = eq(arg(0), arg(1))
+        else:
+            con = lambda c, t: c == t
+        return Factor("congruent?", [DerivedLevel("con", WithinTrial(con, [color, text])), ElseLevel("inc")])
+
+    counts = []
+    for structured in (False, True):
+        factor = make_factor(structured)
+        block = fully_cross_block([color, text, factor], [color, text],
+                                  [Exclude(factor, factor.levels[0])], require_complete_crossing=False)
+        counts.append(UCSolutionEnumerator(block).solution_count())
+        assert [factor.get_derived_level([c, t]).name for c in color.levels for t in text.levels] == \
+            ["con" if c.name == t.name else "inc" for c in color.levels for t in text.levels]
+        assert (factor._derivation_table is None) == structured
+    assert counts == [factorial(6), factorial(6)]
@@ -1,6 +1,8 @@
 import operator as op
 import pytest
 
+from copy import deepcopy
+
 from sweetpea.primitives import Factor, DerivedLevel, ElseLevel, WithinTrial, Transition, Window
 
 color = Factor("color", ["red", "blue"])
@@ -108,6 +110,26 @@ def test_factor_applies_to_trial():
     assert color3.applies_to_trial(1) == True
 
 
+def test_factor_applicable_trials():
+    assert color.trial_pattern == (1, 1)
+    assert color.applicable_trials(3).tolist() == [True, True, True]
+    assert color_repeats_factor.trial_pattern == (2, 1)
+    assert color_repeats_factor.applicable_trials(3).tolist() == [False, True, True]
+
+    f = Factor('f', [DerivedLevel('l', Window(op.eq, [color], 3, 2))])
+    assert f.trial_pattern == (3, 2)
+    assert f.applicable_trials(8).tolist() == [f.applies_to_trial(t) for t in range(1, 9)] == \
+        [False, False, True, False, True, False, True, False]
+    assert f.applicable_trial_count(8) == 3
+    assert f.applicable_trial_count(2) == 0
+    assert f.trials_required(3) == 7
+    assert f.trials_required(0) == 0
+
+    h = Factor('h', [DerivedLevel('l', Window(lambda x: True, [color], 3, 1))])
+    g = Factor('g', [DerivedLevel('l', Window(lambda x: True, [h], 2, 1))])
+    assert g.trial_pattern == (4, 1)
+
+
 def test_derived_level_validation():
     DerivedLevel(42, WithinTrial(op.eq, [color, text]))
     DerivedLevel("name", WithinTrial(lambda x: x, [color]))
@@ -167,6 +189,22 @@ def test_derived_level_get_dependent_cross_product():
 def test_derived_level_equality():
     assert con_level == con_level
 
+
+def test_ids():
+    red = Factor("color", ["red", "blue"]).levels[0]
+    other_red = Factor("color", ["red", "blue"]).levels[0]
+    assert red.id != other_red.id
+    assert red != other_red
+    assert len({red, other_red}) == 2
+    assert red.factor != other_red.factor
+
+    copied = deepcopy(red.factor)
+    assert copied.id == red.factor.id
+    assert copied == red.factor
+    assert hash(copied) == hash(red.factor)
+    assert copied.levels[0] == red
+    assert copied.levels[0].internal_name == red.internal_name
+
 def test_else_level():
     color = Factor("color", ["red", "blue"])
     text  = Factor("text",  ["red", "blue"])
@@ -210,6 +248,83 @@ def test_derived_level_get_dependent_cross_product_with_nesting():
         (('response', 'right'), ('response', 'right'))
     ]
 
+def test_derived_factor_derivation_table():
+    assert con_factor.derivation_table().tolist() == [[0, 1], [1, 0]]
+
+    color3_repeats_table = color3_repeats_factor.derivation_table()
+    assert color3_repeats_table.shape == (3, 3, 3)
+    assert color3_repeats_table[1, 1, 1] == 0
+    assert color3_repeats_table[1, 1, 2] == 1
+
+    response_transition = __get_response_transition()
+    assert response_transition.derivation_table().tolist() == [[0, 1], [1, 0]]
+
+
+def test_derived_factor_derivation_table_with_else_level():
+    def is_red(color, text):
+        return color == "red"
+
+    def is_blue(color, text):
+        return False
+
+    def never_called(color, text):
+        raise AssertionError("Predicates of else levels shouldn't be called.")
+
+    factor = Factor("which?", [DerivedLevel("red", WithinTrial(is_red, [color, text])),
+                               DerivedLevel("blue", WithinTrial(is_blue, [color, text])),
+                               ElseLevel("other")])
+    factor.levels[2].window.predicate = never_called
+
+    assert factor.derivation_table().tolist() == [[0, 0], [2, 2]]
+
+
+def test_derived_factor_derivation_table_validation():
+    with pytest.raises(ValueError):
+        Factor("bad", [DerivedLevel("a", WithinTrial(lambda c, t: 1, [color, text])),
+                       DerivedLevel("b", WithinTrial(lambda c, t: 0, [color, text]))]).derivation_table()
+
+    with pytest.raises(ValueError):
+        Factor("ambiguous", [DerivedLevel("a", WithinTrial(lambda c, t: c == t, [color, text])),
+                             DerivedLevel("b", WithinTrial(lambda c, t: c == "red", [color, text]))]).derivation_table()
+
+
+def test_derived_factor_derivation_table_in_parallel_chunks(monkeypatch, capsys):
+    import sweetpea.primitives as primitives
+
+    def make_factor():
+        return Factor("color3 pattern", [
+            DerivedLevel("same", Window(lambda c: c[0] == c[2], [color3], 4, 1)),
+            DerivedLevel("up",   Window(lambda c: c[0] < c[2], [color3], 4, 1)),
+            ElseLevel("down")
+        ])
+
+    expected = make_factor().derivation_table()
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setattr(primitives, "_DERIVATION_CHUNK_SIZE", 7)
+    monkeypatch.setattr(primitives, "_PARALLEL_DERIVATION_THRESHOLD", 20)
+    monkeypatch.setattr(primitives.multiprocessing, "cpu_count", lambda: 2)
+    table = make_factor().derivation_table()
+    assert (table == expected).all()
+    assert "81/81" in capsys.readouterr().out
+
+    # Processes are only forked on Linux.
+    monkeypatch.setattr(primitives.sys, "platform", "darwin")
+    assert (make_factor().derivation_table() == expected).all()
+
+    with pytest.raises(ValueError):
+        Factor("ambiguous", [DerivedLevel("a", Window(lambda c: c[0] == c[2], [color3], 4, 1)),
+                             DerivedLevel("b", Window(lambda c: c[3] == "red", [color3], 4, 1))]).derivation_table()
+
+
+def test_derived_factor_get_derived_level():
+    assert con_factor.get_derived_level([color.levels[0], text.levels[0]]) == con_level
+    assert con_factor.get_derived_level([color.levels[0], text.levels[1]]) == inc_level
+
+    partial = Factor("partial", [DerivedLevel("red", WithinTrial(lambda c, t: c == t == "red", [color, text]))])
+    assert partial.get_derived_level([color.levels[1], text.levels[1]]) is None
+
+
 def test_base_window_validation():
     # Nonfactor argument
     with pytest.raises(TypeError):
@@ -0,0 +1,37 @@
+import pytest
+
+from sweetpea.core import CNF, SolverSession, Var
+
+
+def test_solver_session_dimacs_string():
+    session = SolverSession(CNF([[1, 2], [-1, 3]]), use_bindings=False)
+    assert session.as_dimacs_string() == "p cnf 3 2\n\n-1 3 0\n1 2 0\n"
+
+    session.commit([Var(-3)])
+    session.commit([2])
+    assert session.committed == [-3, 2]
+    assert session.as_dimacs_string() == "p cnf 3 4\n\n-1 3 0\n1 2 0\n-3 0\n2 0\n"
+
+    # Assumptions are only added for the one rendering, and may introduce new variables.
+    assert session.as_dimacs_string([Var(4), -1]) == "p cnf 4 6\n\n-1 3 0\n1 2 0\n-3 0\n2 0\n4 0\n-1 0\n"
+    assert session.as_dimacs_string() == "p cnf 3 4\n\n-1 3 0\n1 2 0\n-3 0\n2 0\n"
+
+
+def test_solver_session_with_bindings():
+    pytest.importorskip("pycryptosat")
+    session = SolverSession(CNF([[1, 2], [-1, 3]]), use_bindings=True)
+    assert session.is_satisfiable()
+    assert session.is_satisfiable([1])
+    assert not session.is_satisfiable([Var(1), Var(-3)])
+
+    # Committed units are kept for every later check, assumptions are not.
+    session.commit([Var(-3)])
+    assert not session.is_satisfiable([1])
+    assert session.is_satisfiable([2])
+    assert not session.is_satisfiable([-2])
+    session.commit([2])
+    assert session.committed == [-3, 2]
+    assert session.is_satisfiable()
+
+    with pytest.raises(RuntimeError):
+        session.as_dimacs_string()